@@ -21,6 +21,42 @@ app.config.from_object(config['development'])
 # Inicializace databáze
 db.init_app(app)
 
+# Profilování SQL dotazů po endpointech
+from core.profiling import sql_profiler
+sql_profiler.init_app(app)
+
+# Strukturovaný log událostí (zapisuje vlákno na pozadí)
+from core.event_log import event_log
+event_log.init_app(app)
+
+# Cache sekcí system promptu AI asistenta (zneplatňuje se zápisy do podkladových tabulek)
+from modules.ai.context_cache import prompt_context_cache
+prompt_context_cache.init_app(app)
+
+# Součty rozpočtů jedním SQL dotazem, pamatované po dobu požadavku
+from modules.budget.totals import budget_totals
+budget_totals.init_app(app)
+
+# Cache odpovědí AI asistenta na opakované čtecí dotazy
+from modules.ai.response_cache import response_cache
+response_cache.init_app(app)
+
+# Fronta zpráv AI asistenta zpracovávaných na pozadí (pool se spustí s prvním požadavkem)
+from modules.ai.jobs import job_queue
+job_queue.init_app(app)
+
+# Evidence spotřeby tokenů AI asistenta a denní limity
+from modules.ai.usage import usage_ledger
+usage_ledger.init_app(app)
+
+# Zahazování cache kalendáře služeb po zápisu do služeb a zaměstnanců
+from modules.services.cache import kalendar_cache
+kalendar_cache.init_app(app)
+
+# Roční snímky rozpočtu
+from modules.budget.snapshots import snapshot_store
+snapshot_store.init_app(app)
+
 # Custom Jinja2 filtry
 def nl2br_filter(value):
     """Převádí nové řádky na HTML <br> tagy"""
@@ -31,25 +67,13 @@ def nl2br_filter(value):
 app.jinja_env.filters['nl2br'] = nl2br_filter
 
 # Import a registrace modulů
-import json
-from datetime import datetime as dt
-
-# #region agent log
-with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"app.py:24","message":"Before importing blueprints","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-# #endregion
+event_log.debug('app', "Before importing blueprints")
 
 try:
     from modules.budget.routes import budget_bp
-    # #region agent log
-    with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-        f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"app.py:29","message":"budget_bp imported","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-    # #endregion
+    event_log.debug('app', "budget_bp imported")
 except Exception as e:
-    # #region agent log
-    with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-        f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"app.py:32","message":"budget_bp import failed","data":{"error":str(e)},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-    # #endregion
+    event_log.error('app', "budget_bp import failed", {"error":str(e)})
     raise
 
 from modules.projects.routes import project_bp
@@ -59,10 +83,7 @@ from modules.services.routes import services_bp
 from modules.docs.routes import docs_bp
 
 # Registrace blueprintů
-# #region agent log
-with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"app.py:42","message":"Before registering blueprints","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-# #endregion
+event_log.debug('app', "Before registering blueprints")
 
 app.register_blueprint(budget_bp)
 app.register_blueprint(project_bp)
@@ -71,19 +92,13 @@ app.register_blueprint(ai_bp)
 app.register_blueprint(services_bp)
 app.register_blueprint(docs_bp)
 
-# #region agent log
-with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"app.py:50","message":"Main blueprints registered","data":{"blueprints":list(app.blueprints.keys())},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-# #endregion
+event_log.debug('app', "Main blueprints registered", {"blueprints":list(app.blueprints.keys())})
 
 # Import a registrace modulu users
 from modules.users.routes import users_bp
 app.register_blueprint(users_bp)
 
-# #region agent log
-with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"app.py:56","message":"All blueprints registered","data":{"blueprints":list(app.blueprints.keys())},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-# #endregion
+event_log.debug('app', "All blueprints registered", {"blueprints":list(app.blueprints.keys())})
 
 # Kontextové procesory
 @app.context_processor
@@ -173,11 +188,7 @@ def index():
 def osobni_dashboard():
     """Osobní dashboard uživatele - zobrazí všechny jeho informace z databází"""
     from flask import session, redirect, url_for, flash
-    from modules.projects.models import Projekt
-    from modules.projects.executor import ProjectExecutor
-    from modules.services.executor import ServicesExecutor
-    from modules.services.models import SluzbaVynimka, SluzbaVymena
-    from modules.budget.executor import BudgetExecutor
+    from core.dashboard import DashboardExecutor
     
     # Získej aktuálního uživatele
     current_user_id = session.get('current_user_id')
@@ -191,145 +202,10 @@ def osobni_dashboard():
         flash('Uživatel neexistuje', 'danger')
         return redirect(url_for('index'))
     
-    # Načti projekty uživatele
-    try:
-        all_projekty = Projekt.query.filter(
-            Projekt.status.in_(['planovani', 'rozpracovani'])
-        ).order_by(Projekt.datum_vytvoreni.desc()).all()
-        
-        # Filtruj projekty podle přístupu
-        accessible_projects = []
-        for projekt in all_projekty:
-            access = ProjectExecutor.can_user_access_project(current_user_id, projekt.id)
-            if access.get('can_access', False):
-                accessible_projects.append(projekt)
-        
-        projekty = accessible_projects
-        celkem_projektu = len(projekty)
-        celkem_rozpocet = sum(p.rozpocet_float for p in projekty)
-        celkem_vydaje = sum(p.celkove_vydaje for p in projekty)
-        projekty_planovani = [p for p in projekty if p.status == 'planovani']
-        projekty_rozpracovani = [p for p in projekty if p.status == 'rozpracovani']
-    except Exception as e:
-        projekty = []
-        celkem_projektu = 0
-        celkem_rozpocet = 0
-        celkem_vydaje = 0
-        projekty_planovani = []
-        projekty_rozpracovani = []
-    
-    # Načti služby uživatele (pokud má personální záznam)
-    statistiky_sluzeb = None
-    sluzby = []
-    vynimky = []
-    vymeny = []
-    if user.personnel_id:
-        try:
-            from datetime import date
-            dnes = date.today()
-            aktualni_rok = dnes.year
-            nasledujici_rok = aktualni_rok + 1
-            
-            # Načti statistiky služeb pro aktuální rok i následující rok a sečti je
-            statistiky_aktualni = ServicesExecutor.get_statistiky_zamestnance(user.personnel_id, aktualni_rok)
-            statistiky_nasledujici = ServicesExecutor.get_statistiky_zamestnance(user.personnel_id, nasledujici_rok)
-            
-            # Slouč statistiky z obou let
-            if statistiky_aktualni and statistiky_nasledujici:
-                statistiky_sluzeb = {
-                    'fixni': {
-                        'tyden': statistiky_aktualni.get('fixni', {}).get('tyden', 0) + statistiky_nasledujici.get('fixni', {}).get('tyden', 0),
-                        'mesic': statistiky_aktualni.get('fixni', {}).get('mesic', 0) + statistiky_nasledujici.get('fixni', {}).get('mesic', 0),
-                        'rok': statistiky_aktualni.get('fixni', {}).get('rok', 0) + statistiky_nasledujici.get('fixni', {}).get('rok', 0)
-                    },
-                    'rotujici': {
-                        'tyden': statistiky_aktualni.get('rotujici', {}).get('tyden', 0) + statistiky_nasledujici.get('rotujici', {}).get('tyden', 0),
-                        'mesic': statistiky_aktualni.get('rotujici', {}).get('mesic', 0) + statistiky_nasledujici.get('rotujici', {}).get('mesic', 0),
-                        'rok': statistiky_aktualni.get('rotujici', {}).get('rok', 0) + statistiky_nasledujici.get('rotujici', {}).get('rok', 0)
-                    },
-                    'nedele': {
-                        'tyden': statistiky_aktualni.get('nedele', {}).get('tyden', 0) + statistiky_nasledujici.get('nedele', {}).get('tyden', 0),
-                        'mesic': statistiky_aktualni.get('nedele', {}).get('mesic', 0) + statistiky_nasledujici.get('nedele', {}).get('mesic', 0),
-                        'rok': statistiky_aktualni.get('nedele', {}).get('rok', 0) + statistiky_nasledujici.get('nedele', {}).get('rok', 0)
-                    },
-                    'celkem': {
-                        'tyden': statistiky_aktualni.get('celkem', {}).get('tyden', 0) + statistiky_nasledujici.get('celkem', {}).get('tyden', 0),
-                        'mesic': statistiky_aktualni.get('celkem', {}).get('mesic', 0) + statistiky_nasledujici.get('celkem', {}).get('mesic', 0),
-                        'rok': statistiky_aktualni.get('celkem', {}).get('rok', 0) + statistiky_nasledujici.get('celkem', {}).get('rok', 0)
-                    }
-                }
-            elif statistiky_aktualni:
-                statistiky_sluzeb = statistiky_aktualni
-            elif statistiky_nasledujici:
-                statistiky_sluzeb = statistiky_nasledujici
-            
-            # Načti služby zaměstnance pro aktuální rok i následující rok
-            vsechny_sluzby = []
-            vsechny_sluzby.extend(ServicesExecutor.get_sluzby_pro_zamestnance(user.personnel_id, aktualni_rok))
-            vsechny_sluzby.extend(ServicesExecutor.get_sluzby_pro_zamestnance(user.personnel_id, nasledujici_rok))
-            
-            # Filtruj pouze budoucí služby a seřaď podle data
-            sluzby = []
-            for s in vsechny_sluzby:
-                if isinstance(s, dict):
-                    datum_str = s.get('datum', '')
-                    if datum_str and datum_str >= dnes.isoformat():
-                        sluzby.append(s)
-            sluzby.sort(key=lambda x: x.get('datum', ''))
-            
-            # Načti výjimky a výměny vytvořené uživatelem
-            vynimky = SluzbaVynimka.query.filter_by(
-                vytvoril_user_id=current_user_id,
-                aktivni=True
-            ).order_by(SluzbaVynimka.datum.desc()).limit(10).all()
-            vymeny = SluzbaVymena.query.filter_by(
-                vytvoril_user_id=current_user_id,
-                aktivni=True
-            ).order_by(SluzbaVymena.datum_vytvoreni.desc()).limit(10).all()
-        except Exception as e:
-            # Log chybu pro debugging
-            import traceback
-            print(f"Chyba při načítání služeb: {e}")
-            traceback.print_exc()
-            pass
-    
-    # Načti přehled rozpočtu (pokud je admin)
-    budget_overview = None
-    if user.role == 'admin':
-        try:
-            hlavni_rozpocet = BudgetExecutor.get_or_create_main_budget()
-            overview = BudgetExecutor.get_budget_overview(hlavni_rozpocet.id)
-            budget_overview = {
-                'success': True,
-                'budget': {
-                    'nazev': hlavni_rozpocet.nazev,
-                    'rok': hlavni_rozpocet.rok,
-                    'castka_celkem': hlavni_rozpocet.castka_celkem_float,
-                    'celkove_vydaje': hlavni_rozpocet.celkove_vydaje,
-                    'celkove_vynosy': hlavni_rozpocet.celkove_vynosy,
-                    'bilance': hlavni_rozpocet.bilance,
-                    'zbytek': hlavni_rozpocet.zbytek,
-                    'procento_vycerpano': hlavni_rozpocet.procento_vycerpano
-                }
-            }
-        except:
-            pass
+    data = DashboardExecutor.get_osobni_dashboard(user)
+    data['sluzby'] = data['sluzby'][:10]  # Nejbližších 10 služeb
     
-    return render_template(
-        'osobni_dashboard.html',
-        user=user,
-        projekty=projekty,
-        celkem_projektu=celkem_projektu,
-        celkem_rozpocet=celkem_rozpocet,
-        celkem_vydaje=celkem_vydaje,
-        projekty_planovani=projekty_planovani,
-        projekty_rozpracovani=projekty_rozpracovani,
-        statistiky_sluzeb=statistiky_sluzeb,
-        sluzby=sluzby[:10],  # Posledních 10 služeb
-        vynimky=vynimky,
-        vymeny=vymeny,
-        budget_overview=budget_overview
-    )
+    return render_template('osobni_dashboard.html', user=user, **data)
 
 
 @app.route('/switch-user', methods=['POST'])
@@ -502,10 +378,10 @@ def make_shell_context():
 if __name__ == '__main__':
     with app.app_context():
         # Importuj všechny modely a vytvoř tabulky
-        from modules.budget.models import UctovaSkupina, RozpoctovaPolozka, Vydaj, Budget, BudgetCategory, BudgetItem, Expense, Revenue, MonthlyBudgetItem
+        from modules.budget.models import UctovaSkupina, RozpoctovaPolozka, Vydaj, Budget, BudgetCategory, BudgetItem, Expense, Revenue, MonthlyBudgetItem, BudgetItemTotal, RevenueSchedule
         from modules.projects.models import Projekt, BudgetProjektu, VydajProjektu, Termin, Zprava, Znalost
         from modules.personnel.models import ZamestnanecAOON
-        from modules.ai.models import Employee, AISession, Message, KnowledgeEntry, ServiceRecord, AssistantMemory
+        from modules.ai.models import Employee, AISession, Message, KnowledgeEntry, ServiceRecord, AssistantMemory, AIJob, AIUsage, AIUsageDaily
         from modules.users.models import User, UserProject, UserConnection, SharedChat, UserMessage, UserNotification
         
         db.create_all()
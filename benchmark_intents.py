@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Mikro-benchmark rozpoznání záměrů - seznamy klíčových slov vs. zkompilovaný matcher
+
+Porovná původní postup (lower() a postupné `any(k in msg)` přes seznamy
+klíčových slov + re.findall pro čísla) se zkompilovaným IntentMatcher
+na korpusu typických dotazů a ukáže, kde se výsledné záměry liší.
+
+Použití:
+    $ python benchmark_intents.py
+    $ python benchmark_intents.py --opakovani 20000
+"""
+
+import argparse
+import re
+import time
+
+from modules.ai.intents import matcher_asistenta
+
+KORPUS = [
+    "Jaké účty máme v rozpočtu?",
+    "Ukaž mi výnosové účty",
+    "Kolik zbývá v rozpočtu na mzdy?",
+    "Jaký je stav rozpočtu?",
+    "Ukaž kategorie rozpočtu",
+    "Seznam výdajů za březen",
+    "Jaké máme výnosy za rok 2026?",
+    "Ukaž projekty",
+    "Měsíční přehled čerpání",
+    "Kolik jsme letos vydali?",
+    "Kteří zaměstnanci jsou aktivní?",
+    "Přidej výdaj 5 000 Kč do kategorie 3 za knihy",
+    "Přidej položku Tonery 12000 Kč kategorie 7",
+    "Přidej kategorii Drobný majetek",
+    "Kdo má službu v neděli?",
+    "Děkuji, to je vše",
+    "Jaká je bilance nákladů a výnosů?",
+    "Kolik stojí položka ID 12?",
+]
+
+# Původní seznamy z _detect_and_execute_commands, v pořadí větví
+PUVODNI = [
+    ('ucty', ['účty', 'ucty', 'účet', 'ucet', 'položky rozpočtu', 'polozky rozpoctu', 'jaké účty', 'jake ucty']),
+    ('kategorie', ['kategorie', 'kategorii', 'kategorií', 'kategorii rozpočtu']),
+    ('vydaje', ['výdaje', 'vydaje', 'výdajů', 'vydaju', 'výdaj', 'vydaj']),
+    ('vynosy', ['výnosy', 'vynosy', 'výnosů', 'vynosu', 'výnos', 'vynos']),
+    ('projekty', ['projekty', 'projektů', 'projektu', 'projekt']),
+    ('mesicni', ['měsíční', 'mesicni', 'měsíc', 'mesic', 'měsíce', 'mesice', 'měsíční přehled', 'mesicni prehled']),
+    ('stav', ['stav', 'jak je', 'kolik', 'zbývá', 'zbyva', 'bilance', 'vydali', 'spálili', 'spali', 'vydaje']),
+    ('dotaz', ['rozpočet', 'polozka', 'položka', 'seznam', 'ukaž', 'ukaz', 'jaký', 'jaky', 'kolik', 'jak']),
+    ('zamestnanci', ['zaměstnanec', 'zamestnanec', 'osoba', 'pracovník', 'pracovnic', 'pracovníka', 'lidé', 'lide']),
+    ('pridej', ['přidej', 'pridej']),
+]
+
+
+def puvodni_rozpoznani(zprava: str):
+    """Původní postup: první větev, jejíž seznam obsahuje podřetězec zprávy"""
+    lower_msg = zprava.lower()
+    re.findall(r'\d+(?:,\d+)?', zprava)
+    for nazev, slova in PUVODNI:
+        if any(k in lower_msg for k in slova):
+            return nazev
+    return None
+
+
+def puvodni_vsechny(zprava: str):
+    """Původní seznamy, ale všechny záměry (bez předčasného ukončení) - srovnatelný výstup"""
+    lower_msg = zprava.lower()
+    re.findall(r'\d+(?:,\d+)?', zprava)
+    return [nazev for nazev, slova in PUVODNI if any(k in lower_msg for k in slova)]
+
+
+def zmer(funkce, opakovani: int) -> float:
+    start = time.perf_counter()
+    for _ in range(opakovani):
+        for zprava in KORPUS:
+            funkce(zprava)
+    return (time.perf_counter() - start) / (opakovani * len(KORPUS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mikro-benchmark rozpoznání záměrů")
+    parser.add_argument('--opakovani', type=int, default=5000, help="počet průchodů korpusem")
+    args = parser.parse_args()
+    
+    puvodni = zmer(puvodni_rozpoznani, args.opakovani)
+    vsechny = zmer(puvodni_vsechny, args.opakovani)
+    novy = zmer(matcher_asistenta.rozpoznej, args.opakovani)
+    
+    print(f"Dotazů v korpusu: {len(KORPUS)}, průchodů: {args.opakovani}")
+    print(f"Seznamy klíčových slov:  {puvodni * 1e6:>7.2f} µs / dotaz (jen záměr)")
+    print(f"Seznamy, všechny záměry: {vsechny * 1e6:>7.2f} µs / dotaz")
+    print(f"IntentMatcher:           {novy * 1e6:>7.2f} µs / dotaz (záměry + parametry)")
+    print()
+    print(f"{'dotaz':<48} {'původně':<12} {'matcher':<12} parametry")
+    for zprava in KORPUS:
+        shoda = matcher_asistenta.rozpoznej(zprava)
+        parametry = {k: v for k, v in shoda.parametry.items() if v}
+        print(f"{zprava[:48]:<48} {puvodni_rozpoznani(zprava) or '-':<12} {shoda.hlavni or '-':<12} {parametry}")
+
+
+if __name__ == '__main__':
+    main()
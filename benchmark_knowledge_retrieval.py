@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark výběru znalostí do promptu - celá databáze vs. BM25 top-k
+
+Porovná velikost znalostní sekce system promptu před (celá znalostní
+databáze) a po (jen nejrelevantnější záznamy v rozpočtu tokenů) a změří
+dobu sestavení indexu a vyhledávání.
+
+Použití:
+    $ python benchmark_knowledge_retrieval.py              # data z databáze
+    $ python benchmark_knowledge_retrieval.py --synteticke 500
+    $ python benchmark_knowledge_retrieval.py --top-k 5 --budget 1500
+"""
+
+import argparse
+import random
+import time
+
+from modules.ai.retrieval import KnowledgeIndex, formatuj_znalost, odhad_tokenu
+
+DOTAZY = [
+    "Kdo má službu v neděli?",
+    "Kolik zbývá v rozpočtu na mzdy?",
+    "Jak se účtují výdaje na knihy?",
+    "Jaký je postup při ztrátě čtenářského průkazu?",
+    "Kdy končí projekt letní čtení?",
+    "Ukaž kontakty na dodavatele",
+]
+
+TEMATA = [
+    ("Služby", "služba směna neděle víkend rozpis výměna zástup otevírací doba"),
+    ("Rozpočet", "rozpočet výdaj výnos účet položka čerpání mzdy náklady faktura"),
+    ("Výpůjčky", "výpůjčka čtenář průkaz kniha rezervace upomínka poplatek ztráta"),
+    ("Projekty", "projekt termín grant žádost vyúčtování letní čtení akce"),
+    ("Kontakty", "dodavatel kontakt telefon email objednávka distributor smlouva"),
+]
+
+
+def synteticke_zaznamy(pocet: int):
+    """Vygeneruje zkušební záznamy o typické délce (~150-400 slov)"""
+    nahoda = random.Random(42)
+    vypln = "knihovna oddělení pravidlo postup informace poznámka čtenáři zaměstnanci".split()
+    for i in range(pocet):
+        tema, slova = TEMATA[i % len(TEMATA)]
+        slova = slova.split()
+        obsah = ' '.join(nahoda.choice(slova if nahoda.random() < 0.3 else vypln)
+                         for _ in range(nahoda.randint(150, 400)))
+        yield (('ai', i), f"{tema} {i}", obsah, tema, None)
+
+
+def zaznamy_z_databaze():
+    """Načte veřejné záznamy ai_knowledge a projektové znalosti"""
+    from app import app
+    from core import db
+    from modules.ai.models import KnowledgeEntry
+    from modules.projects.models import Znalost
+    
+    with app.app_context():
+        for e in KnowledgeEntry.query.filter_by(is_public=True).all():
+            yield (('ai', e.id), e.title, e.content, e.category, e.tags)
+        for z in db.session.query(Znalost).all():
+            yield (('projekt', z.id), z.nazev, z.obsah, z.kategorie, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark výběru znalostí do promptu")
+    parser.add_argument('--synteticke', type=int, default=0, help="počet syntetických záznamů místo databáze")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--budget', type=int, default=1500, help="rozpočet tokenů pro znalostní sekci")
+    args = parser.parse_args()
+    
+    zaznamy = list(synteticke_zaznamy(args.synteticke) if args.synteticke else zaznamy_z_databaze())
+    if not zaznamy:
+        print("Znalostní databáze je prázdná - použij --synteticke N")
+        return
+    
+    # Před: celá databáze v každém promptu
+    cela = ''.join(formatuj_znalost(t, o, k, tg) for _, t, o, k, tg in zaznamy)
+    
+    # Po: index + top-k
+    index = KnowledgeIndex()
+    start = time.perf_counter()
+    for klic, titulek, obsah, kategorie, tags in zaznamy:
+        index.pridej(klic, f"{titulek} {kategorie or ''} {tags or ''}", obsah,
+                     formatuj_znalost(titulek, obsah, kategorie, tags))
+    cas_indexu = time.perf_counter() - start
+    
+    print(f"Záznamů: {len(zaznamy)}, sestavení indexu: {cas_indexu * 1000:.1f} ms")
+    print(f"Před (celá databáze): {len(cela):>9,} znaků  ~{odhad_tokenu(cela):>7,} tokenů")
+    print()
+    print(f"{'dotaz':<50} {'záznamů':>8} {'znaků':>9} {'tokenů':>8} {'úspora':>7} {'čas':>8}")
+    
+    for dotaz in DOTAZY:
+        start = time.perf_counter()
+        vybrane = index.vyber_kontext(dotaz, top_k=args.top_k, token_budget=args.budget)
+        cas = time.perf_counter() - start
+        text = ''.join(vybrane)
+        uspora = (1 - len(text) / len(cela)) * 100 if cela else 0
+        print(f"{dotaz[:50]:<50} {len(vybrane):>8} {len(text):>9,} {odhad_tokenu(text):>8,} "
+              f"{uspora:>6.1f}% {cas * 1000:>6.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,53 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = 'dev-secret-key-zmenit-na-produkcni'
     
+    # Profilování SQL dotazů po endpointech (viz core/profiling.py, /dokumentace/profilovani)
+    # Ve výchozím stavu vypnuté - zapíná se PROFILING_ENABLED=1, měří se vzorek požadavků
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0.05'))
+    
+    # Strukturovaný log událostí (viz core/event_log.py)
+    EVENT_LOG_ENABLED = os.environ.get('EVENT_LOG_ENABLED', '0') == '1'
+    EVENT_LOG_PATH = os.environ.get('EVENT_LOG_PATH', os.path.join(rootdir, 'logs', 'events.log'))
+    EVENT_LOG_LEVEL = os.environ.get('EVENT_LOG_LEVEL', 'info')
+    EVENT_LOG_LEVELS = {}
+    EVENT_LOG_MAX_BYTES = 5 * 1024 * 1024
+    EVENT_LOG_BACKUP_COUNT = 3
+    
+    # Výběr znalostí do promptu AI asistenta (viz modules/ai/retrieval.py)
+    AI_KNOWLEDGE_TOP_K = int(os.environ.get('AI_KNOWLEDGE_TOP_K', '5'))
+    AI_KNOWLEDGE_TOKEN_BUDGET = int(os.environ.get('AI_KNOWLEDGE_TOKEN_BUDGET', '1500'))
+    # Čtecí záměry, pro které se provádějí příkazy (viz modules/ai/intents.py)
+    AI_INTENT_MAX_READS = int(os.environ.get('AI_INTENT_MAX_READS', '1'))
+    # Okno historie konverzace (viz modules/ai/conversation.py)
+    AI_HISTORY_TURNS = int(os.environ.get('AI_HISTORY_TURNS', '6'))
+    AI_HISTORY_TOKEN_BUDGET = int(os.environ.get('AI_HISTORY_TOKEN_BUDGET', '6000'))
+    AI_SUMMARY_MAX_TOKENS = int(os.environ.get('AI_SUMMARY_MAX_TOKENS', '800'))
+    # HTTP klient Claude API (viz modules/ai/client.py)
+    AI_API_URL = os.environ.get('ANTHROPIC_API_URL', 'https://api.anthropic.com')
+    AI_API_CONNECT_TIMEOUT = float(os.environ.get('AI_API_CONNECT_TIMEOUT', '5'))
+    AI_API_READ_TIMEOUT = float(os.environ.get('AI_API_READ_TIMEOUT', '60'))
+    AI_API_MAX_RETRIES = int(os.environ.get('AI_API_MAX_RETRIES', '3'))
+    AI_API_BREAKER_THRESHOLD = 5
+    AI_API_BREAKER_RESET = 30
+    # Cache odpovědí na opakované čtecí dotazy (viz modules/ai/response_cache.py)
+    AI_RESPONSE_CACHE_ENABLED = os.environ.get('AI_RESPONSE_CACHE_ENABLED', '1') == '1'
+    AI_RESPONSE_CACHE_TTL = int(os.environ.get('AI_RESPONSE_CACHE_TTL', '300'))
+    AI_RESPONSE_CACHE_SIZE = 200
+    # Fronta zpráv AI asistenta zpracovávaných na pozadí (viz modules/ai/jobs.py)
+    AI_JOB_WORKERS = int(os.environ.get('AI_JOB_WORKERS', '4'))
+    AI_JOB_MAX_QUEUE = 100
+    # Denní limity tokenů AI asistenta, 0 = bez limitu (viz modules/ai/usage.py)
+    # měkký limit zmenší požadavek, tvrdý volání API odmítne
+    AI_TOKEN_BUDGET_EMPLOYEE_SOFT = int(os.environ.get('AI_TOKEN_BUDGET_EMPLOYEE_SOFT', '200000'))
+    AI_TOKEN_BUDGET_EMPLOYEE_HARD = int(os.environ.get('AI_TOKEN_BUDGET_EMPLOYEE_HARD', '500000'))
+    AI_TOKEN_BUDGET_SESSION_SOFT = int(os.environ.get('AI_TOKEN_BUDGET_SESSION_SOFT', '0'))
+    AI_TOKEN_BUDGET_SESSION_HARD = int(os.environ.get('AI_TOKEN_BUDGET_SESSION_HARD', '0'))
+    AI_TOKEN_BUDGET_PROJECT_SOFT = int(os.environ.get('AI_TOKEN_BUDGET_PROJECT_SOFT', '100000'))
+    AI_TOKEN_BUDGET_PROJECT_HARD = int(os.environ.get('AI_TOKEN_BUDGET_PROJECT_HARD', '250000'))
+    # Roční snímky rozpočtu pro meziroční porovnání (viz modules/budget/snapshots.py)
+    BUDGET_SNAPSHOT_DIR = os.environ.get('BUDGET_SNAPSHOT_DIR', os.path.join(rootdir, 'snapshots'))
+    
 class DevelopmentConfig(Config):
     """Vývojová konfigurace"""
     DEBUG = True
@@ -20,6 +67,9 @@ class TestingConfig(Config):
     """Testovací konfigurace"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    PROFILING_ENABLED = False
+    EVENT_LOG_ENABLED = False
+    AI_RESPONSE_CACHE_ENABLED = False
 
 class ProductionConfig(Config):
     """Produkční konfigurace"""
@@ -0,0 +1,192 @@
+"""
+Dashboard Executor - Sestavení dat osobního dashboardu
+
+Data se načítají po doménách (projekty, služby, rozpočet) s pevným počtem
+dotazů nezávislým na počtu projektů či služeb. Výsledkem je jeden slovník,
+který route jen předá šabloně.
+"""
+
+from datetime import date, datetime
+from typing import Dict, List
+
+from core import db
+
+
+class DashboardExecutor:
+    """Třída pro sestavení osobního dashboardu"""
+    
+    # ========================================================================
+    # PROJEKTY
+    # ========================================================================
+    
+    @staticmethod
+    def get_projekty_uzivatele(user_id: int, statusy: List[str] = None) -> List[Dict]:
+        """
+        Vrátí projekty, ke kterým má uživatel přístup (vlastník nebo aktivní sdílení),
+        včetně výdajů k dnešku - dvěma dotazy bez ohledu na počet projektů
+        """
+        from sqlalchemy import and_, or_, func
+        from modules.projects.models import Projekt, ProjectShare, VydajProjektu
+        
+        statusy = statusy or ['planovani', 'rozpracovani']
+        
+        # Přístupné projekty - jeden dotaz s joinem na sdílení (sdílení je unikátní na projekt a uživatele)
+        projekty = Projekt.query.outerjoin(
+            ProjectShare,
+            and_(
+                ProjectShare.projekt_id == Projekt.id,
+                ProjectShare.shared_with_user_id == user_id,
+                ProjectShare.aktivni == True
+            )
+        ).filter(
+            Projekt.status.in_(statusy),
+            or_(Projekt.created_by_user_id == user_id, ProjectShare.id.isnot(None))
+        ).order_by(Projekt.datum_vytvoreni.desc()).all()
+        
+        if not projekty:
+            return []
+        
+        # Výdaje projektů do aktuálního data - jeden seskupený dotaz
+        vydaje = dict(db.session.query(
+            VydajProjektu.projekt_id, func.sum(VydajProjektu.castka)
+        ).filter(
+            VydajProjektu.projekt_id.in_([p.id for p in projekty]),
+            VydajProjektu.datum <= datetime.utcnow()
+        ).group_by(VydajProjektu.projekt_id).all())
+        
+        result = []
+        for p in projekty:
+            rozpocet = p.rozpocet_float
+            celkove_vydaje = float(vydaje.get(p.id) or 0.0)
+            result.append({
+                "id": p.id,
+                "nazev": p.nazev,
+                "status": p.status,
+                "rozpocet_float": rozpocet,
+                "celkove_vydaje": celkove_vydaje,
+                "zbytek": rozpocet - celkove_vydaje,
+                "procento_vycerpano": min(100, (celkove_vydaje / rozpocet) * 100) if rozpocet else 0
+            })
+        return result
+    
+    # ========================================================================
+    # SLUŽBY
+    # ========================================================================
+    
+    @staticmethod
+    def get_sluzby_uzivatele(user_id: int, personnel_id: int) -> Dict:
+        """Vrátí statistiky a nadcházející služby zaměstnance za letošní a příští rok"""
+        from modules.services.executor import ServicesExecutor
+        from modules.services.models import SluzbaVynimka, SluzbaVymena
+        
+        dnes = date.today()
+        aktualni_rok = dnes.year
+        nasledujici_rok = aktualni_rok + 1
+        
+        statistiky = ServicesExecutor.get_statistiky_zamestnance(
+            personnel_id, aktualni_rok, do_roku=nasledujici_rok
+        )
+        
+        # Pouze budoucí služby, seřazené podle data
+        dnes_str = dnes.isoformat()
+        sluzby = [
+            s for s in ServicesExecutor.get_sluzby_pro_zamestnance(
+                personnel_id, aktualni_rok, do_roku=nasledujici_rok
+            )
+            if s.get('datum') and s['datum'] >= dnes_str
+        ]
+        
+        # Výjimky a výměny vytvořené uživatelem
+        vynimky = SluzbaVynimka.query.filter_by(
+            vytvoril_user_id=user_id,
+            aktivni=True
+        ).order_by(SluzbaVynimka.datum.desc()).limit(10).all()
+        vymeny = SluzbaVymena.query.filter_by(
+            vytvoril_user_id=user_id,
+            aktivni=True
+        ).order_by(SluzbaVymena.datum_vytvoreni.desc()).limit(10).all()
+        
+        return {
+            "statistiky_sluzeb": statistiky,
+            "sluzby": sluzby,
+            "vynimky": vynimky,
+            "vymeny": vymeny
+        }
+    
+    # ========================================================================
+    # ROZPOČET
+    # ========================================================================
+    
+    @staticmethod
+    def get_prehled_rozpoctu() -> Dict:
+        """Vrátí souhrn hlavního rozpočtu pro dashboard administrátora"""
+        from modules.budget.executor import BudgetExecutor
+        
+        hlavni_rozpocet = BudgetExecutor.get_or_create_main_budget()
+        return {
+            'success': True,
+            'budget': {
+                'nazev': hlavni_rozpocet.nazev,
+                'rok': hlavni_rozpocet.rok,
+                'castka_celkem': hlavni_rozpocet.castka_celkem_float,
+                'celkove_vydaje': hlavni_rozpocet.celkove_vydaje,
+                'celkove_vynosy': hlavni_rozpocet.celkove_vynosy,
+                'bilance': hlavni_rozpocet.bilance,
+                'zbytek': hlavni_rozpocet.zbytek,
+                'procento_vycerpano': hlavni_rozpocet.procento_vycerpano
+            }
+        }
+    
+    # ========================================================================
+    # DASHBOARD
+    # ========================================================================
+    
+    @staticmethod
+    def get_osobni_dashboard(user) -> Dict:
+        """Sestaví všechna data osobního dashboardu uživatele"""
+        data = {
+            "projekty": [],
+            "celkem_projektu": 0,
+            "celkem_rozpocet": 0,
+            "celkem_vydaje": 0,
+            "projekty_planovani": [],
+            "projekty_rozpracovani": [],
+            "statistiky_sluzeb": None,
+            "sluzby": [],
+            "vynimky": [],
+            "vymeny": [],
+            "budget_overview": None
+        }
+        
+        # Projekty uživatele
+        try:
+            projekty = DashboardExecutor.get_projekty_uzivatele(user.id)
+            data.update({
+                "projekty": projekty,
+                "celkem_projektu": len(projekty),
+                "celkem_rozpocet": sum(p['rozpocet_float'] for p in projekty),
+                "celkem_vydaje": sum(p['celkove_vydaje'] for p in projekty),
+                "projekty_planovani": [p for p in projekty if p['status'] == 'planovani'],
+                "projekty_rozpracovani": [p for p in projekty if p['status'] == 'rozpracovani']
+            })
+        except Exception as e:
+            print(f"Chyba při načítání projektů: {e}")
+        
+        # Služby uživatele (pokud má personální záznam)
+        if user.personnel_id:
+            try:
+                data.update(DashboardExecutor.get_sluzby_uzivatele(user.id, user.personnel_id))
+            except Exception as e:
+                # Log chybu pro debugging
+                import traceback
+                print(f"Chyba při načítání služeb: {e}")
+                traceback.print_exc()
+        
+        # Přehled rozpočtu (pokud je admin)
+        if user.role == 'admin':
+            try:
+                data["budget_overview"] = DashboardExecutor.get_prehled_rozpoctu()
+            except Exception as e:
+                print(f"Chyba při načítání rozpočtu: {e}")
+        
+        return data
@@ -0,0 +1,168 @@
+"""
+Event Log - Strukturované logování událostí (JSON lines)
+
+Události se zařadí do paměťové fronty a zapisuje je vlákno na pozadí,
+takže volání v požadavku nikdy nečeká na soubor. Úroveň lze nastavit
+pro každý modul zvlášť; vypnutý log i vypnutá úroveň jsou jen jedno
+porovnání bez alokací.
+
+Konfigurace (app.config):
+    EVENT_LOG_ENABLED       - zapnutí logu (výchozí False)
+    EVENT_LOG_PATH          - cesta k souboru (výchozí logs/events.log)
+    EVENT_LOG_LEVEL         - výchozí úroveň ('debug', 'info', 'warning', 'error')
+    EVENT_LOG_LEVELS        - úrovně pro jednotlivé moduly, např. {'budget': 'debug'}
+    EVENT_LOG_MAX_BYTES     - velikost souboru, po které se rotuje
+    EVENT_LOG_BACKUP_COUNT  - počet uchovávaných rotovaných souborů
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+# Úroveň, která nepropustí nic - používá se pro vypnutý log
+_VYPNUTO = 100
+
+
+class EventLogger:
+    """Strukturovaný logger s frontou a zapisovacím vláknem na pozadí"""
+    
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.max_bytes = 5 * 1024 * 1024
+        self.backup_count = 3
+        self._uroven = _VYPNUTO
+        self._urovne_modulu: Dict[str, int] = {}
+        self._fronta: queue.Queue = queue.Queue(maxsize=10000)
+        self._vlakno: Optional[threading.Thread] = None
+        self.zahozeno = 0
+    
+    def init_app(self, app):
+        """Nastaví logger podle konfigurace aplikace a spustí zapisovací vlákno"""
+        app.extensions['event_log'] = self
+        
+        if not app.config.get('EVENT_LOG_ENABLED', False):
+            self._uroven = _VYPNUTO
+            self._urovne_modulu = {}
+            return
+        
+        self.path = app.config.get('EVENT_LOG_PATH') or os.path.join(app.root_path, 'logs', 'events.log')
+        self.max_bytes = app.config.get('EVENT_LOG_MAX_BYTES', self.max_bytes)
+        self.backup_count = app.config.get('EVENT_LOG_BACKUP_COUNT', self.backup_count)
+        self._uroven = LEVELS.get(app.config.get('EVENT_LOG_LEVEL', 'info'), LEVELS['info'])
+        self._urovne_modulu = {
+            modul: LEVELS.get(uroven, self._uroven)
+            for modul, uroven in (app.config.get('EVENT_LOG_LEVELS') or {}).items()
+        }
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self._vlakno is None or not self._vlakno.is_alive():
+            self._vlakno = threading.Thread(target=self._zapisovac, name='event-log-writer', daemon=True)
+            self._vlakno.start()
+            atexit.register(self.flush)
+    
+    # ------------------------------------------------------------------------
+    # Zápis událostí
+    # ------------------------------------------------------------------------
+    
+    def enabled_for(self, modul: str, uroven: str = 'debug') -> bool:
+        """Projde událost daného modulu a úrovně filtrem?"""
+        return LEVELS[uroven] >= self._urovne_modulu.get(modul, self._uroven)
+    
+    def log(self, uroven: str, modul: str, zprava: str, data: Dict = None):
+        """Zařadí událost do fronty (neblokuje - při plné frontě se událost zahodí)"""
+        if LEVELS[uroven] < self._urovne_modulu.get(modul, self._uroven):
+            return
+        udalost = {
+            "ts": datetime.utcnow().isoformat(),
+            "level": uroven,
+            "module": modul,
+            "message": zprava,
+            "data": data or {}
+        }
+        try:
+            self._fronta.put_nowait(udalost)
+        except queue.Full:
+            self.zahozeno += 1
+    
+    def debug(self, modul: str, zprava: str, data: Dict = None):
+        self.log('debug', modul, zprava, data)
+    
+    def info(self, modul: str, zprava: str, data: Dict = None):
+        self.log('info', modul, zprava, data)
+    
+    def warning(self, modul: str, zprava: str, data: Dict = None):
+        self.log('warning', modul, zprava, data)
+    
+    def error(self, modul: str, zprava: str, data: Dict = None):
+        self.log('error', modul, zprava, data)
+    
+    def flush(self, timeout: float = 2.0):
+        """Počká, až zapisovací vlákno vyprázdní frontu"""
+        if self._vlakno is None or not self._vlakno.is_alive():
+            return
+        hotovo = threading.Event()
+        try:
+            self._fronta.put(hotovo, timeout=timeout)
+        except queue.Full:
+            return
+        hotovo.wait(timeout)
+    
+    # ------------------------------------------------------------------------
+    # Zapisovací vlákno
+    # ------------------------------------------------------------------------
+    
+    def _zapisovac(self):
+        """Vyprazdňuje frontu do souboru - dávkově, jedno otevření souboru na dávku"""
+        while True:
+            davka = [self._fronta.get()]
+            try:
+                while len(davka) < 500:
+                    davka.append(self._fronta.get_nowait())
+            except queue.Empty:
+                pass
+            
+            radky = []
+            udalosti_flush = []
+            for polozka in davka:
+                if isinstance(polozka, threading.Event):
+                    udalosti_flush.append(polozka)
+                else:
+                    radky.append(json.dumps(polozka, ensure_ascii=False, default=str))
+            
+            if radky:
+                try:
+                    self._rotuj_pokud_treba()
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write('\n'.join(radky) + '\n')
+                except OSError:
+                    self.zahozeno += len(radky)
+            
+            for udalost in udalosti_flush:
+                udalost.set()
+    
+    def _rotuj_pokud_treba(self):
+        """Rotace podle velikosti: events.log -> events.log.1 -> ... -> events.log.N"""
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        
+        for i in range(self.backup_count - 1, 0, -1):
+            zdroj = f'{self.path}.{i}'
+            if os.path.exists(zdroj):
+                os.replace(zdroj, f'{self.path}.{i + 1}')
+        if self.backup_count > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+
+# Sdílená instance - konfiguruje se v app.py
+event_log = EventLogger()
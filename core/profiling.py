@@ -0,0 +1,194 @@
+"""
+Profiling - Měření počtu SQL dotazů a doby zpracování požadavků
+
+Napojí se na SQLAlchemy (before/after_cursor_execute) a na životní cyklus
+Flask požadavku a po endpointech sbírá počet dotazů, čas strávený v SQL,
+nejpomalejší dotazy a opakované dotazy (vzor N+1). Vzorkování
+(PROFILING_SAMPLE_RATE) umožňuje nechat měření zapnuté i v produkci.
+"""
+
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class EndpointStats:
+    """Souhrnné statistiky jednoho endpointu"""
+    
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.pozadavku = 0
+        self.dotazu = 0
+        self.max_dotazu = 0
+        self.sql_cas = 0.0
+        self.celkovy_cas = 0.0
+        self.max_cas = 0.0
+        self.nejpomalejsi: List[Dict] = []
+        self.n_plus_1: Counter = Counter()
+    
+    def to_dict(self) -> Dict:
+        return {
+            "endpoint": self.endpoint,
+            "pozadavku": self.pozadavku,
+            "dotazu_celkem": self.dotazu,
+            "dotazu_prumer": self.dotazu / self.pozadavku if self.pozadavku else 0,
+            "dotazu_max": self.max_dotazu,
+            "sql_cas_ms": self.sql_cas * 1000,
+            "sql_cas_prumer_ms": (self.sql_cas / self.pozadavku * 1000) if self.pozadavku else 0,
+            "cas_prumer_ms": (self.celkovy_cas / self.pozadavku * 1000) if self.pozadavku else 0,
+            "cas_max_ms": self.max_cas * 1000,
+            "nejpomalejsi": self.nejpomalejsi,
+            "n_plus_1": [
+                {"dotaz": dotaz, "vyskytu": pocet}
+                for dotaz, pocet in self.n_plus_1.most_common(10)
+            ]
+        }
+
+
+class SQLProfiler:
+    """Sběr statistik SQL dotazů po endpointech"""
+    
+    # Stejný text dotazu opakovaný alespoň tolikrát v jednom požadavku = podezření na N+1
+    N_PLUS_1_PRAH = 5
+    # Počet nejpomalejších dotazů uchovávaných pro každý endpoint
+    NEJPOMALEJSI_POCET = 5
+    
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = Lock()
+        self._od = datetime.utcnow()
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Zaregistruje háčky do Flasku a SQLAlchemy podle konfigurace aplikace"""
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.sample_rate = float(app.config.get('PROFILING_SAMPLE_RATE', 1.0))
+        app.extensions['sql_profiler'] = self
+        
+        if not self.enabled:
+            return
+        
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+    
+    # ------------------------------------------------------------------------
+    # Háčky
+    # ------------------------------------------------------------------------
+    
+    def _before_request(self):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        g._profil = {
+            "start": time.perf_counter(),
+            "dotazu": 0,
+            "sql_cas": 0.0,
+            "dotazy": Counter(),
+            "nejpomalejsi": []
+        }
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_profil_start', []).append(time.perf_counter())
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starty = conn.info.get('_profil_start')
+        if not starty:
+            return
+        trvani = time.perf_counter() - starty.pop()
+        
+        try:
+            profil = g.get('_profil')
+        except RuntimeError:
+            # Dotaz mimo kontext aplikace (skripty, vlákna na pozadí)
+            return
+        if profil is None:
+            return
+        
+        text = self._normalizuj(statement)
+        profil["dotazu"] += 1
+        profil["sql_cas"] += trvani
+        profil["dotazy"][text] += 1
+        profil["nejpomalejsi"].append((trvani, text))
+    
+    def _handle_error(self, exception_context):
+        # Dotaz skončil výjimkou - after_cursor_execute se nezavolá, start se musí odebrat
+        conn = exception_context.connection
+        if conn is None:
+            return
+        starty = conn.info.get('_profil_start')
+        if starty:
+            starty.pop()
+    
+    def _teardown_request(self, exc=None):
+        profil = g.pop('_profil', None)
+        if profil is None or request.endpoint is None:
+            return
+        
+        celkovy_cas = time.perf_counter() - profil["start"]
+        nejpomalejsi = sorted(profil["nejpomalejsi"], reverse=True)[:self.NEJPOMALEJSI_POCET]
+        
+        with self._lock:
+            stats = self._stats.get(request.endpoint)
+            if stats is None:
+                stats = self._stats[request.endpoint] = EndpointStats(request.endpoint)
+            
+            stats.pozadavku += 1
+            stats.dotazu += profil["dotazu"]
+            stats.max_dotazu = max(stats.max_dotazu, profil["dotazu"])
+            stats.sql_cas += profil["sql_cas"]
+            stats.celkovy_cas += celkovy_cas
+            stats.max_cas = max(stats.max_cas, celkovy_cas)
+            
+            for trvani, text in nejpomalejsi:
+                stats.nejpomalejsi.append({"dotaz": text, "cas_ms": trvani * 1000})
+            stats.nejpomalejsi.sort(key=lambda d: d["cas_ms"], reverse=True)
+            del stats.nejpomalejsi[self.NEJPOMALEJSI_POCET:]
+            
+            for text, pocet in profil["dotazy"].items():
+                if pocet >= self.N_PLUS_1_PRAH:
+                    stats.n_plus_1[text] += pocet
+    
+    # ------------------------------------------------------------------------
+    # Výstup
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def _normalizuj(statement: str) -> str:
+        """Sjednotí text dotazu (mezery, seznamy parametrů IN) pro porovnání opakování"""
+        text = re.sub(r'\s+', ' ', statement).strip()
+        return re.sub(r'\((\?(, )?)+\)', '(?)', text)
+    
+    def get_stats(self) -> Dict:
+        """Vrátí statistiky všech endpointů seřazené podle průměrného počtu dotazů"""
+        with self._lock:
+            endpointy = [s.to_dict() for s in self._stats.values()]
+        endpointy.sort(key=lambda s: s["dotazu_prumer"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "od": self._od.isoformat(),
+            "endpointy": endpointy
+        }
+    
+    def reset(self):
+        """Vynuluje nasbírané statistiky"""
+        with self._lock:
+            self._stats.clear()
+            self._od = datetime.utcnow()
+
+
+# Sdílená instance - registruje se v app.py
+sql_profiler = SQLProfiler()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+"""
+Migrace: Vytvoření tabulky ai_job pro frontu zpráv AI asistenta
+
+Do tabulky se ukládají zprávy odeslané s "async": true, než je zpracuje
+vlákno na pozadí (viz modules/ai/jobs.py). Skript lze spustit opakovaně.
+"""
+
+from app import app
+from core import db
+from modules.ai.models import AIJob
+
+
+def migrate():
+    """Vytvoří tabulku ai_job (pokud chybí)"""
+    with app.app_context():
+        AIJob.__table__.create(db.engine, checkfirst=True)
+        print("✓ Tabulka 'ai_job' je připravena")
+
+
+if __name__ == '__main__':
+    print("Spouštím migraci: Fronta zpráv AI asistenta...")
+    migrate()
+    print("Migrace dokončena.")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Migrace: Přidání sloupců pro průběžné shrnutí konverzace do tabulky ai_session
+"""
+import sqlite3
+import os
+
+DB_PATH = 'library_budget.db'
+
+SLOUPCE = [
+    ('souhrn', 'TEXT'),
+    ('souhrn_do_zpravy_id', 'INTEGER'),
+    ('tokenu_shrnuto', 'INTEGER NOT NULL DEFAULT 0'),
+    ('usetreno_tokenu', 'INTEGER NOT NULL DEFAULT 0'),
+]
+
+def migrate():
+    """Přidá chybějící sloupce do tabulky ai_session"""
+    if not os.path.exists(DB_PATH):
+        print(f"Databáze {DB_PATH} neexistuje!")
+        return
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("PRAGMA table_info(ai_session)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        pridano = 0
+        for nazev, typ in SLOUPCE:
+            if nazev in columns:
+                print(f"Sloupec '{nazev}' již existuje.")
+                continue
+            cursor.execute(f"ALTER TABLE ai_session ADD COLUMN {nazev} {typ}")
+            print(f"✓ Sloupec '{nazev}' byl přidán do tabulky 'ai_session'")
+            pridano += 1
+        
+        conn.commit()
+        if not pridano:
+            print("Migrace není nutná.")
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Chyba při migraci: {e}")
+        import traceback
+        traceback.print_exc()
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    print("Spouštím migraci: Shrnutí konverzace v ai_session...")
+    migrate()
+    print("Migrace dokončena.")
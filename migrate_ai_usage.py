@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""
+Migrace: Vytvoření tabulek ai_usage a ai_usage_daily pro evidenci spotřeby tokenů
+
+ai_usage drží jednotlivá volání Claude API, ai_usage_daily denní souhrny
+po zaměstnanci, relaci a projektu (viz modules/ai/usage.py). Skript lze
+spustit opakovaně.
+"""
+
+from app import app
+from core import db
+from modules.ai.models import AIUsage, AIUsageDaily
+
+
+def migrate():
+    """Vytvoří tabulky ai_usage a ai_usage_daily (pokud chybí)"""
+    with app.app_context():
+        AIUsage.__table__.create(db.engine, checkfirst=True)
+        print("✓ Tabulka 'ai_usage' je připravena")
+        AIUsageDaily.__table__.create(db.engine, checkfirst=True)
+        print("✓ Tabulka 'ai_usage_daily' je připravena")
+
+
+if __name__ == '__main__':
+    print("Spouštím migraci: Evidence spotřeby tokenů AI...")
+    migrate()
+    print("Migrace dokončena.")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Migrace: Složené indexy pro výdaje, výnosy a měsíční stavy položek
+
+Přidá indexy, podle kterých filtrují BudgetExecutor a routy:
+- expense (budget_id, rok) - výdaje rozpočtu za rok, součty rozpočtu
+- expense (budget_item_id, datum) - výdaje položky v rozsahu dat (souhrny, statistiky)
+- revenue (budget_item_id, rok, skutecne_prijato) - přijaté výnosy položky za rok
+- monthly_budget_item (budget_item_id, rok, mesic) - unikátní, jeden stav na měsíc
+
+Před vytvořením unikátního indexu sloučí duplicitní měsíční stavy: ponechá
+první záznam (ten dosud platil pro aktuální stav) a přičte do něj souhrnné
+výdaje ostatních, takže souhrny položek zůstanou stejné.
+
+Na konci (nebo samostatně s --kontrola) spustí EXPLAIN QUERY PLAN nad
+hlavními dotazy a ověří, že SQLite indexy opravdu používá.
+
+Použití:
+    $ python migrate_budget_indexes.py
+    $ python migrate_budget_indexes.py --kontrola
+"""
+
+import argparse
+
+from sqlalchemy import func, text
+
+from app import app
+from core import db
+from modules.budget.models import Expense, Revenue, MonthlyBudgetItem
+
+# Hlavní dotazy (zjednodušené na tvar, který vidí SQLite) a index, který mají použít
+KONTROLY = [
+    (
+        "Výdaje rozpočtu za rok (get_monthly_expenses)",
+        "SELECT mesic, castka FROM expense WHERE budget_id = :budget_id AND rok = :rok",
+        'ix_expense_budget_rok'
+    ),
+    (
+        "Výdaje položek za měsíc (prepocitat_souhrny_mesice)",
+        "SELECT budget_item_id, sum(castka) FROM expense "
+        "WHERE budget_item_id IN (1, 2, 3) AND datum >= :od AND datum < :do "
+        "GROUP BY budget_item_id",
+        'ix_expense_item_datum'
+    ),
+    (
+        "Přijaté výnosy položky za rok",
+        "SELECT sum(castka) FROM revenue "
+        "WHERE budget_item_id = :budget_item_id AND rok = :rok AND skutecne_prijato = 1",
+        'ix_revenue_item_rok_prijato'
+    ),
+    (
+        "Měsíční stavy položek (prepocitat_souhrny_mesice)",
+        "SELECT * FROM monthly_budget_item "
+        "WHERE budget_item_id IN (1, 2, 3) AND mesic = :mesic AND rok = :rok",
+        'unique_monthly_budget_item'
+    ),
+]
+
+PARAMETRY = {'budget_id': 1, 'budget_item_id': 1, 'rok': 2026, 'mesic': 1,
+             'od': '2026-01-01 00:00:00', 'do': '2026-02-01 00:00:00'}
+
+
+def sloucit_duplicitni_stavy() -> int:
+    """Sloučí duplicitní měsíční stavy (stejná položka, rok a měsíc) do prvního záznamu"""
+    duplicity = db.session.query(
+        MonthlyBudgetItem.budget_item_id, MonthlyBudgetItem.rok, MonthlyBudgetItem.mesic
+    ).group_by(
+        MonthlyBudgetItem.budget_item_id, MonthlyBudgetItem.rok, MonthlyBudgetItem.mesic
+    ).having(func.count(MonthlyBudgetItem.id) > 1).all()
+    
+    smazano = 0
+    for budget_item_id, rok, mesic in duplicity:
+        stavy = MonthlyBudgetItem.query.filter_by(
+            budget_item_id=budget_item_id, rok=rok, mesic=mesic
+        ).order_by(MonthlyBudgetItem.id).all()
+        prvni = stavy[0]
+        for stav in stavy[1:]:
+            prvni.souhrnne_vydaje = (prvni.souhrnne_vydaje or 0) + (stav.souhrnne_vydaje or 0)
+            db.session.delete(stav)
+            smazano += 1
+    db.session.commit()
+    return smazano
+
+
+def kontrola() -> bool:
+    """Spustí EXPLAIN QUERY PLAN nad hlavními dotazy; vrací True, pokud všechny používají index"""
+    vse_ok = True
+    for nazev, sql, index in KONTROLY:
+        plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"), PARAMETRY).fetchall()
+        detaily = [radek[-1] for radek in plan]
+        # SEARCH = vyhledání v indexu; SCAN ... USING INDEX by znamenal průchod celým indexem
+        ok = any(detail.startswith('SEARCH') and f"INDEX {index} " in detail for detail in detaily)
+        vse_ok = vse_ok and ok
+        print(f"{'✓' if ok else '✗'} {nazev} - očekávaný index {index}")
+        for detail in detaily:
+            print(f"    {detail}")
+    return vse_ok
+
+
+def migrate():
+    """Sloučí duplicitní měsíční stavy, vytvoří chybějící indexy a zkontroluje plány dotazů"""
+    with app.app_context():
+        smazano = sloucit_duplicitni_stavy()
+        print(f"✓ Sloučeno duplicitních měsíčních stavů: {smazano}")
+        
+        for model in (Expense, Revenue, MonthlyBudgetItem):
+            for index in model.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+                print(f"✓ Index '{index.name}' na tabulce '{model.__tablename__}' je připraven")
+        
+        # Statistiky pro plánovač SQLite
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+        
+        if not kontrola():
+            print("✗ Některý dotaz index nepoužívá")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Složené indexy rozpočtu a kontrola plánů dotazů")
+    parser.add_argument('--kontrola', action='store_true', help="jen spustit EXPLAIN QUERY PLAN")
+    args = parser.parse_args()
+    
+    if args.kontrola:
+        with app.app_context():
+            if not kontrola():
+                raise SystemExit(1)
+    else:
+        print("Spouštím migraci: Indexy výdajů, výnosů a měsíčních stavů...")
+        migrate()
+        print("Migrace dokončena.")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+"""
+Migrace: Vytvoření tabulky budget_item_total a přepočet souhrnů položek
+
+Tabulka drží průběžné součty výdajů a měsíčních stavů po položkách a měsících,
+ze kterých čte BudgetItem.aktualni_plneni. Skript lze spustit opakovaně -
+souhrny vždy znovu sestaví ze zdrojových dat.
+"""
+
+from app import app
+from core import db
+from modules.budget.models import BudgetItemTotal
+from modules.budget.executor import BudgetExecutor
+
+
+def migrate():
+    """Vytvoří tabulku budget_item_total (pokud chybí) a přepočítá souhrny"""
+    with app.app_context():
+        BudgetItemTotal.__table__.create(db.engine, checkfirst=True)
+        print("✓ Tabulka 'budget_item_total' je připravena")
+        
+        result = BudgetExecutor.prebudovat_souhrny()
+        if result['success']:
+            print(f"✓ {result['message']}")
+        else:
+            print(f"✗ Chyba při přepočtu: {result['error']}")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    print("Spouštím migraci: Souhrny položek rozpočtu...")
+    migrate()
+    print("Migrace dokončena.")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+"""
+Migrace: Vytvoření tabulky revenue_schedule a rozpis existujících výnosů
+
+Tabulka drží rozpis výnosů do měsíců (předpočítaný get_planned_months),
+ze kterého se počítají měsíční součty výnosů jedním GROUP BY. Skript lze
+spustit opakovaně - rozpis vždy znovu sestaví ze zdrojových dat.
+"""
+
+from app import app
+from core import db
+from modules.budget.models import RevenueSchedule
+from modules.budget.executor import BudgetExecutor
+
+
+def migrate():
+    """Vytvoří tabulku revenue_schedule (pokud chybí) a rozepíše výnosy"""
+    with app.app_context():
+        RevenueSchedule.__table__.create(db.engine, checkfirst=True)
+        print("✓ Tabulka 'revenue_schedule' je připravena")
+        
+        result = BudgetExecutor.prebudovat_rozpis_vynosu()
+        if result['success']:
+            print(f"✓ {result['message']}")
+        else:
+            print(f"✗ Chyba při rozpisu: {result['error']}")
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    print("Spouštím migraci: Rozpis výnosů do měsíců...")
+    migrate()
+    print("Migrace dokončena.")
@@ -0,0 +1,306 @@
+"""
+AI Client - Sdílený HTTP klient pro Claude API
+
+Jeden requests.Session s poolem spojení (keep-alive) pro všechna volání,
+oddělené timeouty pro navázání spojení a čtení odpovědi, opakování při
+429/5xx s exponenciálním čekáním a náhodným rozptylem (respektuje hlavičku
+retry-after) a jistič, který při výpadku API odmítá volání okamžitě,
+místo aby každý požadavek čekal na timeout.
+
+Adresu API lze přesměrovat (AI_API_URL / ANTHROPIC_API_URL), takže klient
+jde vyzkoušet proti lokálnímu stub serveru.
+"""
+
+import json
+import random
+import time
+from threading import Lock
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Stavové kódy, u kterých má smysl požadavek zopakovat
+OPAKOVATELNE_KODY = {429, 500, 502, 503, 504, 529}
+
+
+class ClaudeAPIError(Exception):
+    """Chyba volání Claude API"""
+    
+    def __init__(self, zprava: str, status_code: Optional[int] = None, detail: str = ''):
+        super().__init__(zprava)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class CircuitOpenError(ClaudeAPIError):
+    """Jistič je rozpojený - API je považováno za nedostupné"""
+
+
+class CircuitBreaker:
+    """
+    Jistič: po `prah` po sobě jdoucích selháních se rozpojí a `doba_rozpojeni`
+    sekund volání rovnou odmítá. Pak pustí jedno zkušební volání (half-open);
+    úspěch jistič sepne, neúspěch ho znovu rozpojí.
+    """
+    
+    def __init__(self, prah: int = 5, doba_rozpojeni: float = 30.0):
+        self.prah = prah
+        self.doba_rozpojeni = doba_rozpojeni
+        self._selhani = 0
+        self._rozpojeno_od: Optional[float] = None
+        self._zkouska_bezi = False
+        self._lock = Lock()
+    
+    @property
+    def stav(self) -> str:
+        with self._lock:
+            if self._rozpojeno_od is None:
+                return 'closed'
+            if time.monotonic() - self._rozpojeno_od >= self.doba_rozpojeni:
+                return 'half-open'
+            return 'open'
+    
+    def povol(self) -> bool:
+        """Smí volání proběhnout?"""
+        with self._lock:
+            if self._rozpojeno_od is None:
+                return True
+            if time.monotonic() - self._rozpojeno_od < self.doba_rozpojeni or self._zkouska_bezi:
+                return False
+            self._zkouska_bezi = True
+            return True
+    
+    def uspech(self):
+        with self._lock:
+            self._selhani = 0
+            self._rozpojeno_od = None
+            self._zkouska_bezi = False
+    
+    def selhani(self):
+        with self._lock:
+            self._selhani += 1
+            self._zkouska_bezi = False
+            if self._rozpojeno_od is not None or self._selhani >= self.prah:
+                self._rozpojeno_od = time.monotonic()
+
+
+class ClaudeClient:
+    """HTTP klient pro Claude Messages API"""
+    
+    API_VERSION = '2023-06-01'
+    
+    def __init__(self, base_url: str = 'https://api.anthropic.com', connect_timeout: float = 5.0,
+                 read_timeout: float = 60.0, max_retries: int = 3, backoff_zaklad: float = 0.5,
+                 backoff_max: float = 20.0, pool_size: int = 10, breaker: CircuitBreaker = None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_zaklad = backoff_zaklad
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        # Čekání mezi pokusy - lze nahradit (např. při zkoušení proti stub serveru)
+        self.spanek = time.sleep
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+    
+    # ------------------------------------------------------------------------
+    # Volání
+    # ------------------------------------------------------------------------
+    
+    def messages(self, payload: Dict, api_key: str) -> Dict:
+        """
+        Zavolá POST /v1/messages a vrátí JSON odpověď
+        
+        Raises:
+            CircuitOpenError: jistič je rozpojený
+            ClaudeAPIError: chyba API (status_code je None u chyb spojení)
+        """
+        response = self._odesli(payload, api_key)
+        try:
+            return response.json()
+        except ValueError:
+            raise ClaudeAPIError(
+                "Neplatná odpověď Claude API (tělo není JSON)",
+                status_code=response.status_code,
+                detail=response.text[:200]
+            )
+    
+    def messages_stream(self, payload: Dict, api_key: str) -> Iterator[Dict]:
+        """
+        Zavolá /v1/messages ve streamovacím režimu a vrací události (slovníky z `data:`)
+        
+        Opakování a jistič platí jen pro navázání spojení - po první přijaté
+        události se už neopakuje (část odpovědi už mohla odejít ke klientovi).
+        Uzavření generátoru (např. odpojený prohlížeč) zavře i spojení s API.
+        
+        Raises:
+            CircuitOpenError, ClaudeAPIError - i uprostřed streamu (událost 'error')
+        """
+        response = self._odesli(dict(payload, stream=True), api_key, stream=True)
+        try:
+            for udalost in self._cti_sse(response):
+                if udalost.get('type') == 'error':
+                    chyba = udalost.get('error', {})
+                    raise ClaudeAPIError(
+                        f"Chyba ve streamu Claude API: {chyba.get('type', 'error')}",
+                        detail=chyba.get('message', '')
+                    )
+                yield udalost
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise ClaudeAPIError(f"Spojení s Claude API se přerušilo: {e}")
+        finally:
+            response.close()
+    
+    @staticmethod
+    def _cti_sse(response) -> Iterator[Dict]:
+        """Rozparsuje server-sent events odpovědi na slovníky z řádků `data:`"""
+        data = []
+        for radek in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if radek is None:
+                continue
+            if radek == '':
+                # Prázdný řádek ukončuje událost
+                if data:
+                    try:
+                        yield json.loads('\n'.join(data))
+                    except ValueError:
+                        pass
+                    data = []
+            elif radek.startswith('data:'):
+                data.append(radek[5:].lstrip())
+        if data:
+            try:
+                yield json.loads('\n'.join(data))
+            except ValueError:
+                pass
+    
+    def _odesli(self, payload: Dict, api_key: str, stream: bool = False):
+        """Odešle požadavek s opakováním a jističem; vrací úspěšnou (200) odpověď"""
+        if not self.breaker.povol():
+            raise CircuitOpenError("Claude API je dočasně nedostupné (jistič rozpojen), zkus to za chvíli")
+        
+        headers = {
+            "x-api-key": api_key,
+            "anthropic-version": self.API_VERSION,
+            "content-type": "application/json"
+        }
+        
+        posledni_chyba = None
+        for pokus in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/v1/messages", json=payload, headers=headers,
+                    timeout=self.timeout, stream=stream
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                posledni_chyba = ClaudeAPIError(f"Chyba spojení s Claude API: {e}")
+            except requests.exceptions.RequestException as e:
+                # Ostatní chyby požadavku (neplatná hlavička, přesměrování, přerušený přenos)
+                # se neopakují - selhání ale uvolní i zkušební volání polorozpojeného jističe
+                self.breaker.selhani()
+                raise ClaudeAPIError(f"Chyba požadavku na Claude API: {e}")
+            else:
+                if response.status_code == 200:
+                    self.breaker.uspech()
+                    return response
+                
+                chyba = ClaudeAPIError(
+                    f"Chyba při komunikaci s Claude API (HTTP {response.status_code})",
+                    status_code=response.status_code,
+                    detail=self._detail_chyby(response)
+                )
+                response.close()
+                if response.status_code not in OPAKOVATELNE_KODY:
+                    # Chyba požadavku (400, 401, 404...) - API samo funguje
+                    self.breaker.uspech()
+                    raise chyba
+                posledni_chyba = chyba
+                retry_after = self._retry_after(response)
+            
+            if pokus < self.max_retries:
+                self.spanek(self._cekani(pokus, retry_after))
+        
+        self.breaker.selhani()
+        raise posledni_chyba
+    
+    def _cekani(self, pokus: int, retry_after: Optional[float]) -> float:
+        """Doba čekání před dalším pokusem - retry-after, jinak exponenciálně s rozptylem"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_zaklad * (2 ** pokus)))
+    
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        hodnota = response.headers.get('retry-after')
+        if not hodnota:
+            return None
+        try:
+            return max(0.0, float(hodnota))
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _detail_chyby(response) -> str:
+        try:
+            chyba = response.json().get('error', {})
+            if isinstance(chyba, dict):
+                return chyba.get('message', '')
+            return str(chyba)
+        except ValueError:
+            return response.text[:200]
+    
+    def stats(self) -> Dict:
+        return {
+            "base_url": self.base_url,
+            "timeout": list(self.timeout),
+            "max_retries": self.max_retries,
+            "jistic": self.breaker.stav
+        }
+
+
+def extrahuj_text(result: Dict) -> str:
+    """Vytáhne text odpovědi z JSON odpovědi Messages API (obsah může být text nebo pole)"""
+    obsah = result.get('content')
+    if isinstance(obsah, list) and len(obsah) > 0:
+        if isinstance(obsah[0], dict) and 'text' in obsah[0]:
+            return obsah[0]['text']
+        return str(obsah[0])
+    if isinstance(obsah, str):
+        return obsah
+    return str(result.get('content', 'Žádná odpověď'))
+
+
+# ============================================================================
+# SDÍLENÁ INSTANCE
+# ============================================================================
+
+_klient: Optional[ClaudeClient] = None
+_klient_lock = Lock()
+
+
+def get_client() -> ClaudeClient:
+    """Vrátí sdíleného klienta nastaveného podle konfigurace aplikace"""
+    global _klient
+    if _klient is not None:
+        return _klient
+    
+    from flask import current_app
+    config = current_app.config
+    with _klient_lock:
+        if _klient is None:
+            _klient = ClaudeClient(
+                base_url=config.get('AI_API_URL', 'https://api.anthropic.com'),
+                connect_timeout=config.get('AI_API_CONNECT_TIMEOUT', 5.0),
+                read_timeout=config.get('AI_API_READ_TIMEOUT', 60.0),
+                max_retries=config.get('AI_API_MAX_RETRIES', 3),
+                breaker=CircuitBreaker(
+                    prah=config.get('AI_API_BREAKER_THRESHOLD', 5),
+                    doba_rozpojeni=config.get('AI_API_BREAKER_RESET', 30.0)
+                )
+            )
+    return _klient
@@ -0,0 +1,184 @@
+"""
+AI Context Cache - Cache sekcí kontextu system promptu AI asistenta
+
+System prompt se skládá ze sekcí (znalostní databáze, paměť zaměstnance,
+stav rozpočtu, aktuální projekt). Každá sekce se drží v paměti spolu
+s razítkem verze; verze se zvyšuje po commitu, který zapsal do tabulek,
+ze kterých sekce vychází. Při dalším dotazu se tak znovu sestaví jen
+sekce, jejichž data se opravdu změnila.
+"""
+
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Tabulka -> (sekce, atribut s klíčem sekce); bez atributu se zneplatní celá sekce
+TABULKY_SEKCI: Dict[str, Tuple[str, Optional[str]]] = {
+    'ai_knowledge': ('znalosti', None),
+    'znalost': ('znalosti', None),
+    'ai_memory': ('pamet', 'employee_id'),
+    'budget': ('rozpocet', None),
+    'budget_category': ('rozpocet', None),
+    'budget_subcategory': ('rozpocet', None),
+    'budget_item': ('rozpocet', None),
+    'budget_item_total': ('rozpocet', None),
+    'monthly_budget_item': ('rozpocet', None),
+    'expense': ('rozpocet', None),
+    'revenue': ('rozpocet', None),
+    'revenue_schedule': ('rozpocet', None),
+    'projekt': ('projekt', 'id'),
+    'budget_projektu': ('projekt', 'projekt_id'),
+    'vydaj_projektu': ('projekt', 'projekt_id'),
+    'termin': ('projekt', 'projekt_id'),
+    'zprava': ('projekt', 'projekt_id'),
+    'uctova_skupina': ('rozpocet_stary', None),
+    'rozpoctova_polozka': ('rozpocet_stary', None),
+    'vydaj': ('rozpocet_stary', None),
+    'zamestnanec_oon': ('zamestnanci', None),
+}
+
+# Klíč v session.info se změnami čekajícími na commit
+_ZMENY = '_ai_kontext_zmeny'
+
+
+class PromptContextCache:
+    """Cache sekcí promptu s verzemi podle zápisů do podkladových tabulek"""
+    
+    def __init__(self):
+        self._verze: Dict[Hashable, int] = {}
+        # Počet všech zápisů do sekce (celé i po klíčích) - pro otisky dat
+        self._zmeny: Dict[str, int] = {}
+        self._data: Dict[Tuple[str, Hashable], Tuple[Tuple[int, int], float, Any]] = {}
+        self._lock = Lock()
+        self._registrovano = False
+        self.hits = 0
+        self.misses = 0
+    
+    def init_app(self, app):
+        """Napojí sledování zápisů na SQLAlchemy session (jen jednou)"""
+        app.extensions['ai_context_cache'] = self
+        if self._registrovano:
+            return
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(Session, 'do_orm_execute', self._do_orm_execute)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+        self._registrovano = True
+    
+    # ------------------------------------------------------------------------
+    # Čtení
+    # ------------------------------------------------------------------------
+    
+    def _aktualni_verze(self, sekce: str, klic: Hashable) -> Tuple[int, int]:
+        # Verze celé sekce a verze konkrétního klíče (např. zaměstnance)
+        return self._verze.get(sekce, 0), self._verze.get((sekce, klic), 0)
+    
+    def get_or_build(self, sekce: str, klic: Hashable, sestav: Callable[[], Any],
+                     max_vek: Optional[float] = None) -> Any:
+        """
+        Vrátí sekci z cache, nebo ji sestaví funkcí `sestav` a uloží
+        
+        Args:
+            sekce: Název sekce ('znalosti', 'pamet', 'rozpocet', 'projekt')
+            klic: Klíč v rámci sekce (ID zaměstnance, projektu; None pro celou sekci)
+            max_vek: Nejvyšší stáří v sekundách (pro data závislá na čase), None = bez omezení
+        """
+        with self._lock:
+            verze = self._aktualni_verze(sekce, klic)
+            zaznam = self._data.get((sekce, klic))
+            if zaznam is not None and zaznam[0] == verze and (
+                max_vek is None or time.monotonic() - zaznam[1] < max_vek
+            ):
+                self.hits += 1
+                return zaznam[2]
+            self.misses += 1
+        
+        hodnota = sestav()
+        
+        with self._lock:
+            # Během sestavení mohl proběhnout zápis - pak hodnotu neukládej
+            if self._aktualni_verze(sekce, klic) == verze:
+                self._data[(sekce, klic)] = (verze, time.monotonic(), hodnota)
+        return hodnota
+    
+    def verze(self, sekce: str) -> int:
+        """Vrátí aktuální verzi celé sekce"""
+        with self._lock:
+            return self._verze.get(sekce, 0)
+    
+    def otisk(self, *sekce: str) -> Tuple[int, ...]:
+        """Otisk stavu dat sekcí - změní se po jakémkoli zápisu do kterékoli z nich"""
+        with self._lock:
+            return tuple(self._zmeny.get(jmeno, 0) for jmeno in sekce)
+    
+    # ------------------------------------------------------------------------
+    # Zneplatnění
+    # ------------------------------------------------------------------------
+    
+    def bump(self, sekce: str, klic: Hashable = None):
+        """Zvýší verzi sekce (klic=None) nebo jednoho klíče sekce"""
+        with self._lock:
+            verze_klic = sekce if klic is None else (sekce, klic)
+            self._verze[verze_klic] = self._verze.get(verze_klic, 0) + 1
+            self._zmeny[sekce] = self._zmeny.get(sekce, 0) + 1
+    
+    def invalidate(self):
+        """Zahodí všechny uložené sekce"""
+        with self._lock:
+            self._data.clear()
+            for verze_klic in list(self._verze):
+                self._verze[verze_klic] += 1
+            for sekce in list(self._zmeny):
+                self._zmeny[sekce] += 1
+    
+    def stats(self) -> Dict:
+        """Vrátí počítadla cache"""
+        with self._lock:
+            dotazy = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / dotazy * 100) if dotazy else 0.0,
+                "sekci": len(self._data),
+                "verze": {str(k): v for k, v in self._verze.items()}
+            }
+    
+    # ------------------------------------------------------------------------
+    # Háčky SQLAlchemy
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def _zaznamenej(session, sekce: str, klic: Hashable = None):
+        session.info.setdefault(_ZMENY, set()).add((sekce, klic))
+    
+    def _after_flush(self, session, flush_context):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            tabulka = getattr(obj, '__tablename__', None)
+            mapovani = TABULKY_SEKCI.get(tabulka)
+            if mapovani is None:
+                continue
+            sekce, atribut = mapovani
+            self._zaznamenej(session, sekce, getattr(obj, atribut, None) if atribut else None)
+    
+    def _do_orm_execute(self, orm_execute_state):
+        # Hromadné insert/update/delete mimo unit of work - zneplatní celou sekci
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        tabulka = getattr(orm_execute_state.statement, 'table', None)
+        mapovani = TABULKY_SEKCI.get(getattr(tabulka, 'name', None))
+        if mapovani is not None:
+            self._zaznamenej(orm_execute_state.session, mapovani[0])
+    
+    def _after_commit(self, session):
+        for sekce, klic in session.info.pop(_ZMENY, ()):
+            self.bump(sekce, klic)
+    
+    def _after_rollback(self, session):
+        session.info.pop(_ZMENY, None)
+
+
+# Sdílená instance - napojuje se v app.py
+prompt_context_cache = PromptContextCache()
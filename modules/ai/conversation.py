@@ -0,0 +1,174 @@
+"""
+AI Conversation - Okno historie konverzace s průběžným shrnutím
+
+Do API se neposílá celá historie relace. Posledních N výměn jde doslovně,
+starší zprávy se přeloží do průběžného shrnutí uloženého na AISession
+(souhrn + ID poslední shrnuté zprávy), které se přidává do system promptu.
+Celý požadavek se navíc vejde do rozpočtu tokenů - pokud ne, shrnou se
+i nejstarší zprávy z okna.
+
+Shrnutí je lokální (extrakce první věty každé zprávy), nestojí tedy žádné
+další volání API. Tokeny se počítají přibližně, bez tokenizéru modelu.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from core import db
+from .models import AISession, Message
+
+_KUS = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+_VETA = re.compile(r'(?<=[.!?])\s+')
+
+
+def pocet_tokenu(text: Optional[str]) -> int:
+    """
+    Přibližný počet tokenů textu
+    
+    Slovo ~ 1 token na každé 4 znaky, interpunkce 1 token; slova s diakritikou
+    se tokenizují hůř, počítá se jim token navíc.
+    """
+    if not text:
+        return 0
+    tokeny = 0
+    for kus in _KUS.findall(text):
+        tokeny += 1 + (len(kus) - 1) // 4
+        if not kus.isascii():
+            tokeny += 1
+    return tokeny
+
+
+def _zkrat(text: str, max_znaku: int) -> str:
+    """První věta textu zkrácená na max_znaku"""
+    veta = _VETA.split(text.strip(), maxsplit=1)[0].replace('\n', ' ')
+    return veta if len(veta) <= max_znaku else veta[:max_znaku - 1].rstrip() + '…'
+
+
+class ConversationWindow:
+    """Sestavení historie pro API: shrnutí starších zpráv + posledních N výměn"""
+    
+    def __init__(self, posledni_vymeny: int = 6, token_budget: int = 6000,
+                 max_tokenu_souhrnu: int = 800, max_znaku_zpravy: int = 200):
+        self.posledni_vymeny = posledni_vymeny
+        self.token_budget = token_budget
+        self.max_tokenu_souhrnu = max_tokenu_souhrnu
+        self.max_znaku_zpravy = max_znaku_zpravy
+    
+    @classmethod
+    def z_konfigurace(cls, config) -> 'ConversationWindow':
+        return cls(
+            posledni_vymeny=config.get('AI_HISTORY_TURNS', 6),
+            token_budget=config.get('AI_HISTORY_TOKEN_BUDGET', 6000),
+            max_tokenu_souhrnu=config.get('AI_SUMMARY_MAX_TOKENS', 800)
+        )
+    
+    # ------------------------------------------------------------------------
+    # Shrnutí
+    # ------------------------------------------------------------------------
+    
+    def _radek_souhrnu(self, zprava: Message) -> str:
+        kdo = "Uživatel" if zprava.role == 'user' else "Asistent"
+        return f"- {kdo}: {_zkrat(zprava.content, self.max_znaku_zpravy)}"
+    
+    def _prida_do_souhrnu(self, session: AISession, zpravy: List[Message]):
+        """Přeloží zprávy do průběžného shrnutí; shrnutí drží pod max_tokenu_souhrnu"""
+        if not zpravy:
+            return
+        radky = (session.souhrn or '').splitlines()
+        radky.extend(self._radek_souhrnu(z) for z in zpravy)
+        
+        # Nejstarší řádky shrnutí vypadávají jako první
+        while len(radky) > 1 and pocet_tokenu('\n'.join(radky)) > self.max_tokenu_souhrnu:
+            radky.pop(0)
+        
+        session.souhrn = '\n'.join(radky)
+        session.souhrn_do_zpravy_id = zpravy[-1].id
+        session.tokenu_shrnuto = (session.tokenu_shrnuto or 0) + sum(pocet_tokenu(z.content) for z in zpravy)
+    
+    # ------------------------------------------------------------------------
+    # Okno
+    # ------------------------------------------------------------------------
+    
+    def sestav(self, session: AISession, nova_zprava: str, system_prompt: str) -> Tuple[List[Dict], Dict]:
+        """
+        Vrátí (zprávy pro API, info) a případně posune průběžné shrnutí relace
+        
+        info obsahuje 'souhrn' (text pro system prompt), 'tokenu' (odhad odeslaného
+        vstupu) a 'tokenu_bez_okna' (odhad vstupu při poslání celé historie).
+        """
+        query = Message.query.filter_by(session_id=session.id)
+        if session.souhrn_do_zpravy_id:
+            query = query.filter(Message.id > session.souhrn_do_zpravy_id)
+        zpravy = query.order_by(Message.created_at, Message.id).all()
+        
+        k_shrnuti = []
+        if len(zpravy) > self.posledni_vymeny * 2:
+            k_shrnuti = zpravy[:-self.posledni_vymeny * 2]
+            zpravy = zpravy[-self.posledni_vymeny * 2:]
+        
+        # API vyžaduje, aby historie začínala zprávou uživatele
+        while zpravy and zpravy[0].role != 'user':
+            k_shrnuti.append(zpravy.pop(0))
+        
+        zaklad = pocet_tokenu(system_prompt) + pocet_tokenu(nova_zprava)
+        tokeny_zprav = [pocet_tokenu(z.content) for z in zpravy]
+        
+        # Rozpočet tokenů - nejstarší výměny z okna přesuň do shrnutí
+        while zpravy and zaklad + pocet_tokenu(session.souhrn) + sum(tokeny_zprav) > self.token_budget:
+            k_shrnuti.append(zpravy.pop(0))
+            tokeny_zprav.pop(0)
+            while zpravy and zpravy[0].role != 'user':
+                k_shrnuti.append(zpravy.pop(0))
+                tokeny_zprav.pop(0)
+        
+        if k_shrnuti:
+            self._prida_do_souhrnu(session, k_shrnuti)
+            db.session.commit()
+        
+        historie = [{"role": z.role, "content": z.content} for z in zpravy]
+        historie.append({"role": "user", "content": nova_zprava})
+        
+        # Celá historie = okno + všechny dosud shrnuté zprávy
+        tokenu_okna = zaklad + sum(tokeny_zprav)
+        return historie, {
+            "souhrn": session.souhrn or '',
+            "tokenu": tokenu_okna + pocet_tokenu(session.souhrn),
+            "tokenu_bez_okna": tokenu_okna + (session.tokenu_shrnuto or 0)
+        }
+    
+    @staticmethod
+    def zapis_usporu(session: AISession, info: Dict):
+        """Připočte k relaci odhad ušetřených tokenů (commit provede volající)"""
+        session.usetreno_tokenu = (session.usetreno_tokenu or 0) + max(0, info["tokenu_bez_okna"] - info["tokenu"])
+    
+    # ------------------------------------------------------------------------
+    # Úspora
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def get_uspora(session_id: int) -> Dict:
+        """
+        Přehled tokenů relace: skutečně spotřebované (Message.tokens_used)
+        a odhad ušetřených tokenů oproti posílání celé historie
+        """
+        from sqlalchemy import func
+        
+        session = AISession.query.get(session_id)
+        if not session:
+            return {"success": False, "error": f"Relace ID {session_id} neexistuje"}
+        
+        spotrebovano = db.session.query(
+            func.coalesce(func.sum(Message.tokens_used), 0)
+        ).filter(Message.session_id == session_id).scalar()
+        usetreno = session.usetreno_tokenu or 0
+        bez_okna = spotrebovano + usetreno
+        
+        return {
+            "success": True,
+            "session_id": session_id,
+            "tokens_used": int(spotrebovano),
+            "usetreno_odhad": usetreno,
+            "bez_okna_odhad": bez_okna,
+            "uspora_procent": (usetreno / bez_okna * 100) if bez_okna else 0.0,
+            "souhrn_do_zpravy_id": session.souhrn_do_zpravy_id
+        }
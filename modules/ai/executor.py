@@ -23,15 +23,16 @@ Aktuálně podporované modely:
 - AI: Employee, AISession, Message, KnowledgeEntry, ServiceRecord, AssistantMemory
 """
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 import json
 
 from core import db
 from ..budget.models import UctovaSkupina, RozpoctovaPolozka, Vydaj
 from ..budget.models import Budget, BudgetCategory, BudgetSubCategory, BudgetItem, Expense, Revenue, MonthlyBudgetItem
 from ..budget.executor import BudgetExecutor
+from ..budget.totals import budget_totals
 from ..personnel.models import ZamestnanecAOON
 from ..projects.models import Projekt, BudgetProjektu, VydajProjektu, Termin, Zprava, Znalost, ProjectShare
 from ..services.models import SluzbaTemplate, Sluzba, SluzbaVynimka, SluzbaVymena
@@ -473,10 +474,103 @@ class AIExecutor:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    # ========================================================================
+    # STRÁNKOVANÉ ČTENÍ - jen potřebné sloupce, kompaktní tabulka do promptu
+    # ========================================================================
+    
+    VYCHOZI_LIMIT = 50
+    MAX_LIMIT = 500
+    
+    @staticmethod
+    def _hodnota(hodnota: Any) -> Any:
+        if isinstance(hodnota, (datetime, date)):
+            return hodnota.isoformat()
+        if isinstance(hodnota, Decimal):
+            return float(hodnota)
+        return hodnota
+    
+    @staticmethod
+    def _cti_tabulku(query, sloupce: Dict[str, Any], limit: Optional[int] = None, offset: int = 0,
+                     pole=None, filtry: Optional[Dict] = None, datum_sloupec=None,
+                     od=None, do=None, format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """
+        Provede stránkovaný dotaz, který načte jen vybrané sloupce (bez ORM objektů)
+        
+        Args:
+            query: dotaz s filtry, joiny a řazením - vybírané sloupce se dosadí přes with_entities
+            sloupce: název pole -> sloupcový výraz (pořadí = pořadí ve výstupu)
+            limit, offset: stránka (limit max. MAX_LIMIT)
+            pole: podmnožina polí (seznam nebo "a,b,c")
+            filtry: {pole: hodnota} - rovnost na libovolném poli ze `sloupce`
+            datum_sloupec, od, do: rozsah dat (ISO datum/čas, `do` bez času včetně celého dne)
+            format: 'tabulka' = {"sloupce", "radky", "offset", "limit", "dalsi"},
+                    'zaznamy' = seznam slovníků (dřívější tvar)
+        
+        Raises:
+            ValueError: neznámé pole nebo neplatné datum
+        """
+        if pole:
+            if isinstance(pole, str):
+                pole = [p.strip() for p in pole.split(',') if p.strip()]
+            nezname = [p for p in pole if p not in sloupce]
+            if nezname:
+                raise ValueError(f"Neznámá pole: {', '.join(nezname)} (dostupná: {', '.join(sloupce)})")
+            vybrane = list(pole)
+        else:
+            vybrane = list(sloupce)
+        
+        for nazev, hodnota in (filtry or {}).items():
+            if nazev not in sloupce:
+                raise ValueError(f"Nelze filtrovat podle pole '{nazev}'")
+            query = query.filter(sloupce[nazev] == hodnota)
+        
+        if datum_sloupec is not None:
+            from sqlalchemy import Date
+            
+            # Sloupec typu Date ukládá SQLite jako 'YYYY-MM-DD' - porovnání s datetime
+            # ('... 00:00:00.000000') by jako řetězce vynechalo první den rozsahu
+            jen_datum = isinstance(getattr(datum_sloupec, 'type', None), Date)
+            if od:
+                zacatek = datetime.fromisoformat(str(od).replace('Z', '+00:00'))
+                query = query.filter(datum_sloupec >= (zacatek.date() if jen_datum else zacatek))
+            if do:
+                konec = datetime.fromisoformat(str(do).replace('Z', '+00:00'))
+                if jen_datum:
+                    query = query.filter(datum_sloupec < konec.date() + timedelta(days=1))
+                elif len(str(do)) == 10:
+                    query = query.filter(datum_sloupec < konec + timedelta(days=1))
+                else:
+                    query = query.filter(datum_sloupec <= konec)
+        
+        limit = max(1, min(int(limit or AIExecutor.VYCHOZI_LIMIT), AIExecutor.MAX_LIMIT))
+        offset = max(0, int(offset or 0))
+        
+        # O řádek víc - pozná se, jestli existuje další stránka, bez COUNT(*)
+        radky = query.with_entities(*[sloupce[n].label(n) for n in vybrane]) \
+            .offset(offset).limit(limit + 1).all()
+        dalsi = len(radky) > limit
+        radky = [[AIExecutor._hodnota(v) for v in radek] for radek in radky[:limit]]
+        
+        if format == 'zaznamy':
+            return [dict(zip(vybrane, radek)) for radek in radky]
+        return {
+            "sloupce": vybrane,
+            "radky": radky,
+            "offset": offset,
+            "limit": limit,
+            "dalsi": dalsi
+        }
+    
     # ========================================================================
     # ČTENÍ DAT Z DATABÁZE - pro AI asistenta
     # ========================================================================
     
+    @staticmethod
+    def count_budget_items_new() -> int:
+        """Vrátí počet aktivních položek (účtů) hlavního rozpočtu"""
+        hlavni = BudgetExecutor.get_or_create_main_budget()
+        return BudgetItem.query.filter_by(budget_id=hlavni.id, aktivni=True).count()
+    
     @staticmethod
     def get_all_budget_items_new(typ: Optional[str] = None) -> List[Dict]:
         """Vrátí všechny položky rozpočtu (účty) z nového systému"""
@@ -545,194 +639,175 @@ class AIExecutor:
             return []
     
     @staticmethod
-    def get_all_expenses(limit: int = 100) -> List[Dict]:
-        """Vrátí všechny výdaje z rozpočtu"""
-        try:
-            hlavni = BudgetExecutor.get_or_create_main_budget()
-            expenses = Expense.query.filter_by(
-                budget_id=hlavni.id
-            ).order_by(Expense.datum.desc()).limit(limit).all()
-            
-            return [
-                {
-                    "id": e.id,
-                    "popis": e.popis,
-                    "castka": float(e.castka),
-                    "datum": e.datum.isoformat() if e.datum else None,
-                    "mesic": e.mesic,
-                    "rok": e.rok,
-                    "typ": e.typ,
-                    "kategorie": e.category.nazev if e.category else None,
-                    "projekt": e.projekt.nazev if e.projekt else None,
-                    "cis_faktury": e.cis_faktury,
-                    "dodavatel": e.dodavatel
-                }
-                for e in expenses
-            ]
-        except Exception as e:
-            return []
+    def get_all_expenses(limit: Optional[int] = None, offset: int = 0,
+                         pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                         format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí výdaje z rozpočtu (nejnovější první, stránkovaně)"""
+        hlavni = BudgetExecutor.get_or_create_main_budget()
+        query = Expense.query.filter(Expense.budget_id == hlavni.id) \
+            .outerjoin(BudgetCategory, Expense.category_id == BudgetCategory.id) \
+            .order_by(Expense.datum.desc())
+        sloupce = {
+            "id": Expense.id,
+            "popis": Expense.popis,
+            "castka": Expense.castka,
+            "datum": Expense.datum,
+            "mesic": Expense.mesic,
+            "rok": Expense.rok,
+            "typ": Expense.typ,
+            "kategorie": BudgetCategory.nazev,
+            "cis_faktury": Expense.cis_faktury,
+            "dodavatel": Expense.dodavatel
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=Expense.datum, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_revenues() -> List[Dict]:
-        """Vrátí všechny výnosy z rozpočtu"""
-        try:
-            hlavni = BudgetExecutor.get_or_create_main_budget()
-            revenues = Revenue.query.filter_by(budget_id=hlavni.id).all()
-            
-            return [
-                {
-                    "id": r.id,
-                    "nazev": r.nazev,
-                    "popis": r.popis,
-                    "castka": float(r.castka),
-                    "typ": r.typ,
-                    "datum": r.datum.isoformat() if r.datum else None,
-                    "mesic": r.mesic,
-                    "rok": r.rok,
-                    "naplanovano": r.naplanovano,
-                    "skutecne_prijato": r.skutecne_prijato,
-                    "frekvence": r.frekvence,
-                    "mesice": r.mesice,
-                    "odberatel": r.odberatel
-                }
-                for r in revenues
-            ]
-        except Exception as e:
-            return []
+    def get_all_revenues(limit: Optional[int] = None, offset: int = 0,
+                         pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                         format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí výnosy z rozpočtu (stránkovaně)"""
+        hlavni = BudgetExecutor.get_or_create_main_budget()
+        query = Revenue.query.filter(Revenue.budget_id == hlavni.id) \
+            .order_by(Revenue.rok.desc(), Revenue.mesic.desc(), Revenue.id.desc())
+        sloupce = {
+            "id": Revenue.id,
+            "nazev": Revenue.nazev,
+            "popis": Revenue.popis,
+            "castka": Revenue.castka,
+            "typ": Revenue.typ,
+            "datum": Revenue.datum,
+            "mesic": Revenue.mesic,
+            "rok": Revenue.rok,
+            "naplanovano": Revenue.naplanovano,
+            "skutecne_prijato": Revenue.skutecne_prijato,
+            "frekvence": Revenue.frekvence,
+            "mesice": Revenue.mesice,
+            "odberatel": Revenue.odberatel
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=Revenue.datum, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_project_expenses(projekt_id: int = None) -> List[Dict]:
-        """Vrátí všechny výdaje projektů"""
-        try:
-            query = VydajProjektu.query
-            if projekt_id:
-                query = query.filter_by(projekt_id=projekt_id)
-            
-            expenses = query.order_by(VydajProjektu.datum.desc()).all()
-            
-            return [
-                {
-                    "id": e.id,
-                    "projekt_id": e.projekt_id,
-                    "projekt_nazev": e.projekt.nazev if e.projekt else None,
-                    "popis": e.popis,
-                    "castka": float(e.castka),
-                    "datum": e.datum.isoformat() if e.datum else None,
-                    "cis_faktury": e.cis_faktury,
-                    "dodavatel": e.dodavatel,
-                    "poznamka": e.poznamka,
-                    "created_by_initials": e.created_by_initials
-                }
-                for e in expenses
-            ]
-        except Exception as e:
-            return []
+    def get_all_project_expenses(projekt_id: int = None, limit: Optional[int] = None, offset: int = 0,
+                                 pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                                 format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí výdaje projektů (stránkovaně, s názvem projektu z jednoho dotazu)"""
+        query = VydajProjektu.query.outerjoin(Projekt, VydajProjektu.projekt_id == Projekt.id)
+        if projekt_id:
+            query = query.filter(VydajProjektu.projekt_id == projekt_id)
+        query = query.order_by(VydajProjektu.datum.desc())
+        sloupce = {
+            "id": VydajProjektu.id,
+            "projekt_id": VydajProjektu.projekt_id,
+            "projekt_nazev": Projekt.nazev,
+            "popis": VydajProjektu.popis,
+            "castka": VydajProjektu.castka,
+            "datum": VydajProjektu.datum,
+            "cis_faktury": VydajProjektu.cis_faktury,
+            "dodavatel": VydajProjektu.dodavatel,
+            "poznamka": VydajProjektu.poznamka,
+            "created_by_initials": VydajProjektu.created_by_initials
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=VydajProjektu.datum, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_project_milestones(projekt_id: int = None) -> List[Dict]:
-        """Vrátí všechny termíny/milestones projektů"""
-        try:
-            query = Termin.query
-            if projekt_id:
-                query = query.filter_by(projekt_id=projekt_id)
-            
-            milestones = query.order_by(Termin.datum_planovane).all()
-            
-            return [
-                {
-                    "id": m.id,
-                    "projekt_id": m.projekt_id,
-                    "projekt_nazev": m.projekt.nazev if m.projekt else None,
-                    "nazev": m.nazev,
-                    "datum_planovane": m.datum_planovane.isoformat() if m.datum_planovane else None,
-                    "datum_skutecne": m.datum_skutecne.isoformat() if m.datum_skutecne else None,
-                    "status": m.status,
-                    "zodpovedny": m.zodpovedny,
-                    "popis": m.popis,
-                    "created_by_initials": m.created_by_initials
-                }
-                for m in milestones
-            ]
-        except Exception as e:
-            return []
+    def get_all_project_milestones(projekt_id: int = None, limit: Optional[int] = None, offset: int = 0,
+                                   pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                                   format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí termíny/milestones projektů (stránkovaně)"""
+        query = Termin.query.outerjoin(Projekt, Termin.projekt_id == Projekt.id)
+        if projekt_id:
+            query = query.filter(Termin.projekt_id == projekt_id)
+        query = query.order_by(Termin.datum_planovane)
+        sloupce = {
+            "id": Termin.id,
+            "projekt_id": Termin.projekt_id,
+            "projekt_nazev": Projekt.nazev,
+            "nazev": Termin.nazev,
+            "datum_planovane": Termin.datum_planovane,
+            "datum_skutecne": Termin.datum_skutecne,
+            "status": Termin.status,
+            "zodpovedny": Termin.zodpovedny,
+            "popis": Termin.popis,
+            "created_by_initials": Termin.created_by_initials
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=Termin.datum_planovane, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_project_messages(projekt_id: int = None) -> List[Dict]:
-        """Vrátí všechny zprávy v projektech"""
-        try:
-            query = Zprava.query
-            if projekt_id:
-                query = query.filter_by(projekt_id=projekt_id)
-            
-            messages = query.order_by(Zprava.datum.desc()).all()
-            
-            return [
-                {
-                    "id": m.id,
-                    "projekt_id": m.projekt_id,
-                    "projekt_nazev": m.projekt.nazev if m.projekt else None,
-                    "autor": m.autor,
-                    "obsah": m.obsah,
-                    "datum": m.datum.isoformat() if m.datum else None,
-                    "typ": m.typ,
-                    "created_by_initials": m.created_by_initials,
-                    "to_user_id": m.to_user_id
-                }
-                for m in messages
-            ]
-        except Exception as e:
-            return []
+    def get_all_project_messages(projekt_id: int = None, limit: Optional[int] = None, offset: int = 0,
+                                 pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                                 format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí zprávy v projektech (nejnovější první, stránkovaně)"""
+        query = Zprava.query.outerjoin(Projekt, Zprava.projekt_id == Projekt.id)
+        if projekt_id:
+            query = query.filter(Zprava.projekt_id == projekt_id)
+        query = query.order_by(Zprava.datum.desc())
+        sloupce = {
+            "id": Zprava.id,
+            "projekt_id": Zprava.projekt_id,
+            "projekt_nazev": Projekt.nazev,
+            "autor": Zprava.autor,
+            "obsah": Zprava.obsah,
+            "datum": Zprava.datum,
+            "typ": Zprava.typ,
+            "created_by_initials": Zprava.created_by_initials,
+            "to_user_id": Zprava.to_user_id
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=Zprava.datum, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_project_knowledge(projekt_id: int = None) -> List[Dict]:
-        """Vrátí všechny znalosti v projektech"""
-        try:
-            query = Znalost.query
-            if projekt_id:
-                query = query.filter_by(projekt_id=projekt_id)
-            
-            knowledge = query.order_by(Znalost.datum_vytvoreni.desc()).all()
-            
-            return [
-                {
-                    "id": k.id,
-                    "projekt_id": k.projekt_id,
-                    "projekt_nazev": k.projekt.nazev if k.projekt else None,
-                    "nazev": k.nazev,
-                    "obsah": k.obsah,
-                    "kategorie": k.kategorie,
-                    "datum_vytvoreni": k.datum_vytvoreni.isoformat() if k.datum_vytvoreni else None,
-                    "autor": k.autor,
-                    "created_by_initials": k.created_by_initials
-                }
-                for k in knowledge
-            ]
-        except Exception as e:
-            return []
+    def get_all_project_knowledge(projekt_id: int = None, limit: Optional[int] = None, offset: int = 0,
+                                  pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                                  format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí znalosti v projektech (stránkovaně)"""
+        query = Znalost.query.outerjoin(Projekt, Znalost.projekt_id == Projekt.id)
+        if projekt_id:
+            query = query.filter(Znalost.projekt_id == projekt_id)
+        query = query.order_by(Znalost.datum_vytvoreni.desc())
+        sloupce = {
+            "id": Znalost.id,
+            "projekt_id": Znalost.projekt_id,
+            "projekt_nazev": Projekt.nazev,
+            "nazev": Znalost.nazev,
+            "obsah": Znalost.obsah,
+            "kategorie": Znalost.kategorie,
+            "datum_vytvoreni": Znalost.datum_vytvoreni,
+            "autor": Znalost.autor,
+            "created_by_initials": Znalost.created_by_initials
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=Znalost.datum_vytvoreni, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_services() -> List[Dict]:
-        """Vrátí všechny služby"""
-        try:
-            services = Sluzba.query.order_by(Sluzba.datum.desc()).all()
-            
-            return [
-                {
-                    "id": s.id,
-                    "template_id": s.template_id,
-                    "template_nazev": s.template.nazev if s.template else None,
-                    "datum": s.datum.isoformat() if s.datum else None,
-                    "zamestnanec_id": s.zamestnanec_id,
-                    "zamestnanec_jmeno": s.zamestnanec.jmeno_plne if s.zamestnanec else None,
-                    "hodina_od": s.hodina_od,
-                    "hodina_do": s.hodina_do,
-                    "je_vynimka": s.je_vynimka,
-                    "je_vymena": s.je_vymena
-                }
-                for s in services
-            ]
-        except Exception as e:
-            return []
+    def get_all_services(zamestnanec_id: int = None, limit: Optional[int] = None, offset: int = 0,
+                         pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                         format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí služby (nejnovější první, stránkovaně) - jméno zaměstnance a šablony z jednoho dotazu"""
+        query = Sluzba.query \
+            .outerjoin(SluzbaTemplate, Sluzba.template_id == SluzbaTemplate.id) \
+            .outerjoin(ZamestnanecAOON, Sluzba.zamestnanec_id == ZamestnanecAOON.id)
+        if zamestnanec_id:
+            query = query.filter(Sluzba.zamestnanec_id == zamestnanec_id)
+        query = query.order_by(Sluzba.datum.desc(), Sluzba.hodina_od)
+        sloupce = {
+            "id": Sluzba.id,
+            "template_id": Sluzba.template_id,
+            "template_nazev": SluzbaTemplate.nazev,
+            "datum": Sluzba.datum,
+            "oddeleni": Sluzba.oddeleni,
+            "zamestnanec_id": Sluzba.zamestnanec_id,
+            "zamestnanec_jmeno": (ZamestnanecAOON.jmeno + ' ' + ZamestnanecAOON.prijmeni),
+            "hodina_od": Sluzba.hodina_od,
+            "hodina_do": Sluzba.hodina_do,
+            "je_vynimka": Sluzba.je_vynimka,
+            "je_vymena": Sluzba.je_vymena
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=Sluzba.datum, od=od, do=do, format=format)
     
     @staticmethod
     def get_all_service_templates() -> List[Dict]:
@@ -849,99 +924,101 @@ class AIExecutor:
             return []
     
     @staticmethod
-    def get_all_user_messages() -> List[Dict]:
-        """Vrátí všechny zprávy mezi uživateli"""
-        try:
-            messages = UserMessage.query.order_by(UserMessage.datum_odeslani.desc()).all()
-            
-            return [
-                {
-                    "id": m.id,
-                    "from_user_id": m.from_user_id,
-                    "from_user_username": m.from_user.username if m.from_user else None,
-                    "to_user_id": m.to_user_id,
-                    "to_user_username": m.to_user.username if m.to_user else None,
-                    "subject": m.subject,
-                    "content": m.content,
-                    "typ": m.typ,
-                    "precteno": m.precteno,
-                    "datum_odeslani": m.datum_odeslani.isoformat() if m.datum_odeslani else None,
-                    "datum_precteni": m.datum_precteni.isoformat() if m.datum_precteni else None
-                }
-                for m in messages
-            ]
-        except Exception as e:
-            return []
+    def get_all_user_messages(user_id: int = None, limit: Optional[int] = None, offset: int = 0,
+                              pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                              format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí zprávy mezi uživateli (nejnovější první, stránkovaně)"""
+        from sqlalchemy import or_
+        from sqlalchemy.orm import aliased
+        
+        odesilatel = aliased(User)
+        prijemce = aliased(User)
+        query = UserMessage.query \
+            .outerjoin(odesilatel, UserMessage.from_user_id == odesilatel.id) \
+            .outerjoin(prijemce, UserMessage.to_user_id == prijemce.id)
+        if user_id:
+            query = query.filter(or_(UserMessage.from_user_id == user_id, UserMessage.to_user_id == user_id))
+        query = query.order_by(UserMessage.datum_odeslani.desc())
+        sloupce = {
+            "id": UserMessage.id,
+            "from_user_id": UserMessage.from_user_id,
+            "from_user_username": odesilatel.username,
+            "to_user_id": UserMessage.to_user_id,
+            "to_user_username": prijemce.username,
+            "subject": UserMessage.subject,
+            "content": UserMessage.content,
+            "typ": UserMessage.typ,
+            "precteno": UserMessage.precteno,
+            "datum_odeslani": UserMessage.datum_odeslani,
+            "datum_precteni": UserMessage.datum_precteni
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=UserMessage.datum_odeslani, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_user_notifications() -> List[Dict]:
-        """Vrátí všechny notifikace uživatelů"""
-        try:
-            notifications = UserNotification.query.order_by(UserNotification.datum_vytvoreni.desc()).all()
-            
-            return [
-                {
-                    "id": n.id,
-                    "user_id": n.user_id,
-                    "user_username": n.user.username if n.user else None,
-                    "typ": n.typ,
-                    "title": n.title,
-                    "content": n.content,
-                    "precteno": n.precteno,
-                    "related_id": n.related_id,
-                    "related_type": n.related_type,
-                    "datum_vytvoreni": n.datum_vytvoreni.isoformat() if n.datum_vytvoreni else None
-                }
-                for n in notifications
-            ]
-        except Exception as e:
-            return []
+    def get_all_user_notifications(user_id: int = None, limit: Optional[int] = None, offset: int = 0,
+                                   pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                                   format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí notifikace uživatelů (nejnovější první, stránkovaně)"""
+        query = UserNotification.query.outerjoin(User, UserNotification.user_id == User.id)
+        if user_id:
+            query = query.filter(UserNotification.user_id == user_id)
+        query = query.order_by(UserNotification.datum_vytvoreni.desc())
+        sloupce = {
+            "id": UserNotification.id,
+            "user_id": UserNotification.user_id,
+            "user_username": User.username,
+            "typ": UserNotification.typ,
+            "title": UserNotification.title,
+            "content": UserNotification.content,
+            "precteno": UserNotification.precteno,
+            "related_id": UserNotification.related_id,
+            "related_type": UserNotification.related_type,
+            "datum_vytvoreni": UserNotification.datum_vytvoreni
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=UserNotification.datum_vytvoreni, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_changelogs() -> List[Dict]:
-        """Vrátí všechny záznamy changelogu"""
-        try:
-            changelogs = ChangeLog.query.filter_by(aktivni=True).order_by(ChangeLog.datum.desc()).all()
-            
-            return [
-                {
-                    "id": c.id,
-                    "datum": c.datum.isoformat() if c.datum else None,
-                    "verze": c.verze,
-                    "typ": c.typ,
-                    "modul": c.modul,
-                    "nadpis": c.nadpis,
-                    "popis": c.popis,
-                    "autor": c.autor,
-                    "aktivni": c.aktivni
-                }
-                for c in changelogs
-            ]
-        except Exception as e:
-            return []
+    def get_all_changelogs(limit: Optional[int] = None, offset: int = 0,
+                           pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                           format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí záznamy changelogu (nejnovější první, stránkovaně)"""
+        query = ChangeLog.query.filter(ChangeLog.aktivni == True).order_by(ChangeLog.datum.desc())
+        sloupce = {
+            "id": ChangeLog.id,
+            "datum": ChangeLog.datum,
+            "verze": ChangeLog.verze,
+            "typ": ChangeLog.typ,
+            "modul": ChangeLog.modul,
+            "nadpis": ChangeLog.nadpis,
+            "popis": ChangeLog.popis,
+            "autor": ChangeLog.autor
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=ChangeLog.datum, od=od, do=do, format=format)
     
     @staticmethod
-    def get_all_monthly_budget_items() -> List[Dict]:
-        """Vrátí všechny měsíční stavy položek rozpočtu"""
-        try:
-            monthly_items = MonthlyBudgetItem.query.order_by(MonthlyBudgetItem.rok.desc(), MonthlyBudgetItem.mesic.desc()).all()
-            
-            return [
-                {
-                    "id": m.id,
-                    "budget_item_id": m.budget_item_id,
-                    "budget_item_popis": m.budget_item.popis if m.budget_item else None,
-                    "mesic": m.mesic,
-                    "rok": m.rok,
-                    "souhrnne_vydaje": float(m.souhrnne_vydaje),
-                    "poznamka": m.poznamka,
-                    "aktualizoval": m.aktualizoval,
-                    "datum_aktualizace": m.datum_aktualizace.isoformat() if m.datum_aktualizace else None
-                }
-                for m in monthly_items
-            ]
-        except Exception as e:
-            return []
+    def get_all_monthly_budget_items(limit: Optional[int] = None, offset: int = 0,
+                                     pole=None, filtry: Optional[Dict] = None, od=None, do=None,
+                                     format: str = 'tabulka') -> Union[Dict, List[Dict]]:
+        """Vrátí měsíční stavy položek rozpočtu (nejnovější první, stránkovaně)"""
+        query = MonthlyBudgetItem.query \
+            .outerjoin(BudgetItem, MonthlyBudgetItem.budget_item_id == BudgetItem.id) \
+            .order_by(MonthlyBudgetItem.rok.desc(), MonthlyBudgetItem.mesic.desc())
+        sloupce = {
+            "id": MonthlyBudgetItem.id,
+            "budget_item_id": MonthlyBudgetItem.budget_item_id,
+            "budget_item_popis": BudgetItem.popis,
+            "mesic": MonthlyBudgetItem.mesic,
+            "rok": MonthlyBudgetItem.rok,
+            "souhrnne_vydaje": MonthlyBudgetItem.souhrnne_vydaje,
+            "poznamka": MonthlyBudgetItem.poznamka,
+            "aktualizoval": MonthlyBudgetItem.aktualizoval,
+            "datum_aktualizace": MonthlyBudgetItem.datum_aktualizace
+        }
+        return AIExecutor._cti_tabulku(query, sloupce, limit, offset, pole, filtry,
+                                       datum_sloupec=MonthlyBudgetItem.datum_aktualizace, od=od, do=do, format=format)
     
     @staticmethod
     def get_all_projects() -> List[Dict]:
@@ -973,6 +1050,8 @@ class AIExecutor:
         """Vrátí všechny rozpočty (pro různé roky)"""
         try:
             rozpocty = Budget.query.filter_by(aktivni=True).order_by(Budget.rok.desc()).all()
+            # Součty všech rozpočtů jedním dotazem
+            budget_totals.nacti([r.id for r in rozpocty])
             
             return [
                 {
@@ -1010,6 +1089,11 @@ class AIExecutor:
         - "add_new_budget_item" - přidá rozpočtovou položku (params: category_id, nazev, castka, ...)
         - "add_budget_expense" - přidá výdaj (params: category_id, popis, castka, ...)
         - "get_budget_overview_new" - vrátí přehled nového rozpočtu
+        
+        Stránkované čtecí příkazy (get_all_expenses, get_all_revenues, get_all_project_*,
+        get_all_services, get_all_user_messages, get_all_user_notifications,
+        get_all_changelogs, get_all_monthly_budget_items) přijímají limit, offset,
+        od, do, pole, filtry a format - viz _cti_tabulku.
         """
         params = params or {}
         
@@ -1036,7 +1120,7 @@ class AIExecutor:
             "get_all_budget_items_new": lambda: AIExecutor.get_all_budget_items_new(**params),
             "get_all_budget_categories": lambda: AIExecutor.get_all_budget_categories(),
             "get_all_expenses": lambda: AIExecutor.get_all_expenses(**params),
-            "get_all_revenues": lambda: AIExecutor.get_all_revenues(),
+            "get_all_revenues": lambda: AIExecutor.get_all_revenues(**params),
             "get_all_projects": lambda: AIExecutor.get_all_projects(),
             "get_all_budgets": lambda: AIExecutor.get_all_budgets(),
             "get_monthly_overview": lambda: AIExecutor.get_monthly_overview(),
@@ -1046,19 +1130,19 @@ class AIExecutor:
             "get_all_project_messages": lambda: AIExecutor.get_all_project_messages(**params),
             "get_all_project_knowledge": lambda: AIExecutor.get_all_project_knowledge(**params),
             # Služby
-            "get_all_services": lambda: AIExecutor.get_all_services(),
+            "get_all_services": lambda: AIExecutor.get_all_services(**params),
             "get_all_service_templates": lambda: AIExecutor.get_all_service_templates(),
             "get_all_service_exceptions": lambda: AIExecutor.get_all_service_exceptions(),
             "get_all_service_exchanges": lambda: AIExecutor.get_all_service_exchanges(),
             # Uživatelé
             "get_all_users": lambda: AIExecutor.get_all_users(),
             "get_all_user_projects": lambda: AIExecutor.get_all_user_projects(),
-            "get_all_user_messages": lambda: AIExecutor.get_all_user_messages(),
-            "get_all_user_notifications": lambda: AIExecutor.get_all_user_notifications(),
+            "get_all_user_messages": lambda: AIExecutor.get_all_user_messages(**params),
+            "get_all_user_notifications": lambda: AIExecutor.get_all_user_notifications(**params),
             # Dokumentace
-            "get_all_changelogs": lambda: AIExecutor.get_all_changelogs(),
+            "get_all_changelogs": lambda: AIExecutor.get_all_changelogs(**params),
             # Měsíční stavy
-            "get_all_monthly_budget_items": lambda: AIExecutor.get_all_monthly_budget_items(),
+            "get_all_monthly_budget_items": lambda: AIExecutor.get_all_monthly_budget_items(**params),
             # Zaměstnanci
             "get_employees": lambda: AIExecutor.get_all_employees(),
             "add_employee": lambda: AIExecutor.add_employee(**params),
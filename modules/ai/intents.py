@@ -0,0 +1,250 @@
+"""
+AI Intents - Rozpoznání záměru zprávy jedním průchodem
+
+Místo postupného procházení desítky seznamů klíčových slov (`any(k in msg)`)
+se všechna klíčová slova všech záměrů zkompilují do jednoho regulárního
+výrazu ve tvaru trie (sdílené předpony, nejdelší shoda na každé pozici).
+Zpráva se jednou zbaví diakritiky a převede na malá písmena a jeden průchod
+najde všechny záměry; druhý zkompilovaný výraz z ní vytáhne parametry
+(částky, ID, kategorie, měsíc, rok).
+
+Pořadí záměrů v definici je jejich priorita - odpovídá pořadí větví,
+ve kterém se dřív vyhodnocovaly seznamy klíčových slov.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from .retrieval import odstran_diakritiku
+
+# ============================================================================
+# DEFINICE ZÁMĚRŮ
+# ============================================================================
+
+# Záměry obecného chatu (AIAssistantService) - (název, klíčová slova), pořadí = priorita
+INTENTY_ASISTENTA: List[Tuple[str, List[str]]] = [
+    ('pridej', ['přidej', 'pridej']),
+    ('ucty', ['účty', 'účet', 'položky rozpočtu', 'jaké účty']),
+    ('kategorie', ['kategorie', 'kategorii', 'kategorií', 'kategorii rozpočtu']),
+    ('vydaje', ['výdaje', 'výdajů', 'výdaj']),
+    ('vynosy', ['výnosy', 'výnosů', 'výnos']),
+    ('projekty', ['projekty', 'projektů', 'projektu', 'projekt']),
+    ('mesicni', ['měsíční', 'měsíc', 'měsíce', 'měsíční přehled']),
+    ('stav', ['stav', 'jak je', 'kolik', 'zbývá', 'bilance', 'vydali', 'spálili', 'spali', 'vydaje']),
+    ('dotaz', ['rozpočet', 'polozka', 'položka', 'seznam', 'ukaž', 'jaký', 'kolik', 'jak']),
+    ('zamestnanci', ['zaměstnanec', 'osoba', 'pracovník', 'pracovnic', 'pracovníka', 'lidé']),
+]
+
+# Záměry chatu v projektu
+INTENTY_PROJEKTU: List[Tuple[str, List[str]]] = [
+    ('nastav_rozpocet', ['nastav rozpočet', 'nastavit rozpočet', 'set budget', 'rozpočet na', 'rozpočet je']),
+    ('pridej_rozpocet', ['přidej rozpočet', 'přidej do rozpočtu', 'přidat rozpočet', 'add budget']),
+    ('vydaj', ['přidej výdaj', 'přidej výdaje', 'přidat výdaj', 'add expense',
+               'výdaj', 'vydaj', 'utratil', 'zaplatil', 'zaplaceno', 'zaplatit']),
+    ('uprav_vydaj', ['uprav výdaj', 'upravit výdaj', 'změň výdaj', 'zmen výdaj', 'edit expense']),
+    ('smaz_vydaj', ['smaž výdaj', 'smazat výdaj', 'odstraň výdaj', 'odstran výdaj', 'delete expense']),
+    ('castka', ['kč', 'korun', 'koruny', 'částka']),
+]
+
+# Čtecí záměry -> příkazy AIExecutor (akce, parametry z Shoda.parametry)
+PRIKAZY_INTENTU: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {
+    'ucty': [('get_all_budget_items_new', ('typ',))],
+    'kategorie': [('get_all_budget_categories', ())],
+    'vydaje': [('get_all_expenses', ())],
+    'vynosy': [('get_all_revenues', ())],
+    'projekty': [('get_all_projects', ())],
+    'mesicni': [('get_monthly_overview', ())],
+    'stav': [('get_budget_overview_new', ())],
+    'dotaz': [('list_budget_items', ())],
+    'zamestnanci': [('get_employees', ())],
+}
+
+MESICE = {
+    'leden': 1, 'ledn': 1, 'unor': 2, 'brezen': 3, 'brezn': 3, 'duben': 4, 'dubn': 4,
+    'kveten': 5, 'kvetn': 5, 'cervenec': 7, 'cervenc': 7, 'cerven': 6, 'cervn': 6,
+    'srpen': 8, 'srpn': 8, 'zari': 9, 'rijen': 10, 'rijn': 10, 'listopad': 11,
+    'prosinec': 12, 'prosinc': 12
+}
+
+
+# Převodní tabulka latinky s diakritikou (U+00C0-U+017F) - translate je řádově
+# rychlejší než Unicode normalizace znak po znaku
+_BEZ_DIAKRITIKY = {
+    kod: odstran_diakritiku(chr(kod)) for kod in range(0xC0, 0x180)
+    if odstran_diakritiku(chr(kod)) != chr(kod)
+}
+
+
+def normalizuj(text: str) -> str:
+    """'Přidej Výdaj' -> 'pridej vydaj'"""
+    text = (text or '').lower()
+    return text if text.isascii() else text.translate(_BEZ_DIAKRITIKY)
+
+
+def _trie_vzor(slova: Iterable[str]) -> str:
+    """
+    Regulární výraz z trie slov: sdílené předpony se testují jednou
+    a hladové větve zajistí nejdelší shodu na dané pozici
+    """
+    trie: Dict = {}
+    for slovo in slova:
+        uzel = trie
+        for znak in slovo:
+            uzel = uzel.setdefault(znak, {})
+        uzel[''] = True
+    
+    def vzor(uzel: Dict) -> str:
+        konec = '' in uzel
+        vetve = [re.escape(znak) + vzor(dalsi) for znak, dalsi in sorted(uzel.items()) if znak]
+        if not vetve:
+            return ''
+        telo = vetve[0] if len(vetve) == 1 else '(?:' + '|'.join(vetve) + ')'
+        if konec:
+            return ('(?:' + telo + ')?') if len(vetve) == 1 else telo + '?'
+        return telo
+    
+    return vzor(trie)
+
+
+# Parametry - jeden výraz, pojmenované skupiny se zkouší v tomto pořadí;
+# všechny začínají na hranici slova, uvnitř slov se nic nezkouší
+_PARAMETRY = re.compile(
+    r'\b(?:(?P<castka>\d{1,3}(?:[ \u00a0]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?)\s*(?:kc|korun)'
+    r'|id\s*[:#]?\s*(?P<id>\d+)'
+    r'|kategori[ei]\s+(?P<kategorie_id>\d+)'
+    r'|(?P<rok>20\d\d)\b'
+    r'|(?P<mesic>' + _trie_vzor(MESICE) + r')\w*'
+    r'|(?P<cislo>\d+(?:,\d+)?))'
+)
+
+
+def _cislo(text: str) -> float:
+    return float(text.replace(' ', '').replace('\u00a0', '').replace(',', '.'))
+
+
+def vytahni_parametry(text: str) -> Dict:
+    """Vytáhne parametry z normalizovaného textu jedním průchodem"""
+    parametry: Dict = {'castky': [], 'cisla': []}
+    for m in _PARAMETRY.finditer(text):
+        skupina = m.lastgroup
+        hodnota = m.group(skupina)
+        if skupina == 'castka':
+            parametry['castky'].append(_cislo(hodnota))
+            parametry.setdefault('pozice_castky', m.span())
+        elif skupina == 'cislo':
+            parametry['cisla'].append(_cislo(hodnota))
+            parametry.setdefault('pozice_cisla', m.span())
+        elif skupina == 'mesic':
+            parametry.setdefault('mesic', MESICE[hodnota])
+        else:
+            parametry.setdefault(skupina, int(hodnota))
+    
+    if 'naklad' in text:
+        parametry['typ'] = 'naklad'
+    elif 'vynos' in text:
+        parametry['typ'] = 'vynos'
+    return parametry
+
+
+class Shoda:
+    """Výsledek rozpoznání: záměry seřazené podle priority + parametry"""
+    
+    def __init__(self, text: str, intenty: List[str], zasahy: Dict[str, int], parametry: Dict):
+        self.text = text
+        self.intenty = intenty
+        self.zasahy = zasahy
+        self.parametry = parametry
+    
+    @property
+    def hlavni(self) -> Optional[str]:
+        return self.intenty[0] if self.intenty else None
+    
+    @property
+    def castka(self) -> Optional[float]:
+        """Částka s měnou, jinak první číslo ve zprávě, které není ID ani rok"""
+        castky = self.parametry['castky'] or self.parametry['cisla']
+        return castky[0] if castky else None
+    
+    @property
+    def pozice_castky(self) -> Optional[Tuple[int, int]]:
+        """(začátek, konec) částky v normalizovaném textu - včetně měny, pokud ji má"""
+        if self.parametry['castky']:
+            return self.parametry['pozice_castky']
+        return self.parametry.get('pozice_cisla')
+    
+    def __contains__(self, intent: str) -> bool:
+        return intent in self.zasahy
+    
+    def to_dict(self) -> Dict:
+        return {"intenty": self.intenty, "zasahy": self.zasahy, "parametry": self.parametry}
+
+
+class IntentMatcher:
+    """Zkompilovaná sada záměrů"""
+    
+    def __init__(self, intenty: Sequence[Tuple[str, Iterable[str]]]):
+        self.priorita = {nazev: i for i, (nazev, _) in enumerate(intenty)}
+        
+        slova: Dict[str, set] = {}
+        for nazev, klicova_slova in intenty:
+            for slovo in klicova_slova:
+                slova.setdefault(normalizuj(slovo), set()).add(nazev)
+        
+        # Na jedné pozici se najde jen nejdelší slovo - kratší slova, která
+        # na stejné pozici začínají, jsou jeho předponami, jejich záměry se přičtou
+        self._intenty_slova: Dict[str, FrozenSet[str]] = {
+            slovo: frozenset().union(*(zamery for predpona, zamery in slova.items()
+                                       if slovo.startswith(predpona)))
+            for slovo in slova
+        }
+        self._vzor = re.compile(_trie_vzor(slova))
+    
+    def rozpoznej(self, zprava: str) -> Shoda:
+        """Najde všechny záměry ve zprávě a vytáhne parametry"""
+        text = normalizuj(zprava)
+        zasahy: Counter = Counter()
+        # Hledá se znovu od pozice za začátkem shody, ne za jejím koncem -
+        # slova se mohou překrývat ("jak je" a "je...")
+        pozice = 0
+        while True:
+            m = self._vzor.search(text, pozice)
+            if m is None:
+                break
+            for intent in self._intenty_slova[m.group()]:
+                zasahy[intent] += 1
+            pozice = m.start() + 1
+        intenty = sorted(zasahy, key=lambda i: (self.priorita[i], -zasahy[i]))
+        return Shoda(text, intenty, dict(zasahy), vytahni_parametry(text))
+
+
+def plan_prikazu(shoda: Shoda, max_intentu: int = 1) -> List[Tuple[str, Dict]]:
+    """
+    Příkazy AIExecutor pro nejvýše `max_intentu` nejlepších čtecích záměrů
+    
+    Příkaz se stejnými parametry se do plánu dostane jen jednou, i když
+    na stejná data vede víc záměrů.
+    """
+    plan = []
+    videne = set()
+    pocet = 0
+    for intent in shoda.intenty:
+        if pocet >= max_intentu:
+            break
+        prikazy = PRIKAZY_INTENTU.get(intent)
+        if not prikazy:
+            continue
+        pocet += 1
+        for akce, nazvy_parametru in prikazy:
+            parametry = {n: shoda.parametry[n] for n in nazvy_parametru if n in shoda.parametry}
+            klic = (akce, tuple(sorted(parametry.items())))
+            if klic in videne:
+                continue
+            videne.add(klic)
+            plan.append((akce, parametry))
+    return plan
+
+
+# Sdílené instance - kompilují se jednou při importu
+matcher_asistenta = IntentMatcher(INTENTY_ASISTENTA)
+matcher_projektu = IntentMatcher(INTENTY_PROJEKTU)
@@ -0,0 +1,227 @@
+"""
+AI Jobs - Fronta zpráv AI asistentovi zpracovávaných na pozadí
+
+Požadavek na /ai/send-message s "async": true jen uloží úlohu do tabulky
+ai_job a vrátí její ID; detekci příkazů, čtení dat, volání API i uložení
+zpráv provede vlákno z poolu. Webový worker se tak neblokuje po dobu
+volání API a počet souběžných volání API je omezen velikostí poolu
+(AI_JOB_WORKERS), ne počtem webových workerů.
+
+Úlohy jsou v SQLite, takže přežijí restart: při startu se nedokončené
+úlohy (čekající i ty, které běžely při pádu) zařadí znovu. Zprávy jedné
+relace se zpracovávají postupně v pořadí přijetí, aby se nepomíchala historie
+konverzace: další úloha relace se do poolu odešle až po dokončení předchozí,
+takže čekající zprávy nedrží vlákna poolu a nezablokují ostatní relace.
+
+Pool se spouští až při prvním požadavku - proces reloaderu ve vývojovém
+režimu tak úlohy nezpracovává dvakrát.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Event, Lock
+from typing import Dict, Optional
+
+
+class QueueFullError(Exception):
+    """Fronta je plná - klient má zkusit odeslat zprávu později"""
+
+
+class JobQueue:
+    """Fronta úloh AI asistenta nad thread poolem"""
+    
+    def __init__(self, workers: int = 4, max_fronta: int = 100):
+        self.workers = workers
+        self.max_fronta = max_fronta
+        self.app = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = Lock()
+        self._cekajici = 0
+        self._bezi = 0
+        self._hotovo = 0
+        self._chyby = 0
+        # Doby čekání ve frontě (s) posledních úloh
+        self._cekani = deque(maxlen=200)
+        # Dokončení úlohy - pro long-polling (job_id -> Event)
+        self._udalosti: Dict[int, Event] = {}
+        # Jedna běžící úloha na relaci - další čekají ve frontě relace (session_id -> deque job_id)
+        self._fronty_relaci: Dict[int, deque] = {}
+    
+    def init_app(self, app):
+        """Nastaví frontu podle konfigurace; pool se spustí s prvním požadavkem"""
+        app.extensions['ai_job_queue'] = self
+        self.app = app
+        self.workers = app.config.get('AI_JOB_WORKERS', self.workers)
+        self.max_fronta = app.config.get('AI_JOB_MAX_QUEUE', self.max_fronta)
+        app.before_request(self._spust)
+    
+    def _spust(self):
+        """Vytvoří pool a znovu zařadí nedokončené úlohy (jednou za běh procesu)"""
+        if self._pool is not None:
+            return
+        with self._lock:
+            if self._pool is not None:
+                return
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ai-job')
+        self._obnov()
+    
+    def _obnov(self):
+        """Zařadí úlohy, které zůstaly v databázi nedokončené (restart, pád)"""
+        from core import db
+        from .models import AIJob
+        
+        try:
+            nedokoncene = AIJob.query.filter(AIJob.stav.in_(('cekajici', 'bezi'))) \
+                .order_by(AIJob.id).all()
+        except Exception:
+            # Tabulka ještě neexistuje (migrate_ai_jobs.py neproběhla)
+            db.session.rollback()
+            return
+        
+        for job in nedokoncene:
+            job.stav = 'cekajici'
+            job.zahajeno = None
+        db.session.commit()
+        for job in nedokoncene:
+            self._odesli(job.id, job.session_id)
+    
+    # ------------------------------------------------------------------------
+    # Zařazení a zpracování
+    # ------------------------------------------------------------------------
+    
+    def zarad(self, session_id: int, employee_id: int, zprava: str, bez_cache: bool = False) -> int:
+        """
+        Uloží úlohu a zařadí ji do fronty
+        
+        Returns:
+            int: ID úlohy
+        
+        Raises:
+            QueueFullError: ve frontě čeká max_fronta úloh
+        """
+        from core import db
+        from .models import AIJob
+        
+        if self._cekajici >= self.max_fronta:
+            raise QueueFullError(f"Fronta AI asistenta je plná ({self.max_fronta} zpráv), zkus to za chvíli")
+        
+        job = AIJob(session_id=session_id, employee_id=employee_id, zprava=zprava, bez_cache=bez_cache)
+        db.session.add(job)
+        db.session.commit()
+        self._odesli(job.id, session_id)
+        return job.id
+    
+    def _odesli(self, job_id: int, session_id: int):
+        """Odešle úlohu do poolu, nebo ji zařadí za běžící úlohu stejné relace"""
+        with self._lock:
+            self._cekajici += 1
+            self._udalosti.setdefault(job_id, Event())
+            fronta = self._fronty_relaci.get(session_id)
+            if fronta is not None:
+                fronta.append(job_id)
+                return
+            self._fronty_relaci[session_id] = deque()
+        self._pool.submit(self._zpracuj, job_id, session_id)
+    
+    def _zpracuj(self, job_id: int, session_id: int):
+        """Zpracuje úlohu ve vlákně poolu a pak odešle další úlohu stejné relace"""
+        try:
+            with self.app.app_context():
+                self._proved(job_id)
+        except Exception as e:
+            print(f"Chyba při zpracování úlohy AI asistenta {job_id}: {e}")
+        finally:
+            with self._lock:
+                fronta = self._fronty_relaci.get(session_id)
+                dalsi = fronta.popleft() if fronta else None
+                if dalsi is None:
+                    # Relace nemá další úlohy - záznam se uvolní
+                    self._fronty_relaci.pop(session_id, None)
+            self._dokonci(job_id)
+            if dalsi is not None:
+                self._pool.submit(self._zpracuj, dalsi, session_id)
+    
+    def _proved(self, job_id: int):
+        """Provede úlohu - odešle zprávu, uloží odpověď a stav úlohy"""
+        from core import db
+        from .models import AIJob
+        from .routes import AIAssistantService
+        
+        with self._lock:
+            self._cekajici -= 1
+        job = AIJob.query.get(job_id)
+        if job is None:
+            return
+        
+        with self._lock:
+            self._bezi += 1
+        uspech = False
+        try:
+            job.stav = 'bezi'
+            job.zahajeno = datetime.utcnow()
+            self._cekani.append((job.zahajeno - job.vytvoreno).total_seconds())
+            db.session.commit()
+            
+            try:
+                service = AIAssistantService()
+                odpoved, tokeny = service.send_message(job.employee_id, job.session_id, job.zprava, job.bez_cache)
+                service.save_message_pair(job.session_id, job.zprava, odpoved, tokeny)
+                
+                job.stav = 'hotovo'
+                job.odpoved = odpoved
+                job.tokens_used = tokeny
+                uspech = True
+            except Exception as e:
+                db.session.rollback()
+                job = AIJob.query.get(job_id)
+                job.stav = 'chyba'
+                job.chyba = str(e)
+            
+            job.dokonceno = datetime.utcnow()
+            db.session.commit()
+        finally:
+            db.session.remove()
+            with self._lock:
+                self._bezi -= 1
+                if uspech:
+                    self._hotovo += 1
+                else:
+                    self._chyby += 1
+    
+    def _dokonci(self, job_id: int):
+        with self._lock:
+            udalost = self._udalosti.pop(job_id, None)
+        if udalost is not None:
+            udalost.set()
+    
+    # ------------------------------------------------------------------------
+    # Stav
+    # ------------------------------------------------------------------------
+    
+    def cekej(self, job_id: int, timeout: float) -> bool:
+        """Počká na dokončení úlohy (long-polling); vrací False po vypršení timeoutu"""
+        with self._lock:
+            udalost = self._udalosti.get(job_id)
+        if udalost is None:
+            return True
+        return udalost.wait(timeout)
+    
+    def stats(self) -> Dict:
+        """Vrátí hloubku fronty, doby čekání a počítadla"""
+        with self._lock:
+            cekani = sorted(self._cekani)
+            return {
+                "workers": self.workers,
+                "max_fronta": self.max_fronta,
+                "cekajici": self._cekajici,
+                "bezi": self._bezi,
+                "hotovo": self._hotovo,
+                "chyby": self._chyby,
+                "cekani_prumer_s": (sum(cekani) / len(cekani)) if cekani else 0.0,
+                "cekani_p95_s": cekani[int(len(cekani) * 0.95)] if cekani else 0.0
+            }
+
+
+# Sdílená instance - konfiguruje se v app.py
+job_queue = JobQueue()
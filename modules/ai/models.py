@@ -37,6 +37,12 @@ class AISession(db.Model):
     is_archived = db.Column(db.Boolean, default=False)
     context = db.Column(db.Text, nullable=True)  # Dodatečný kontext pro session
     
+    # Průběžné shrnutí starších zpráv (viz modules/ai/conversation.py)
+    souhrn = db.Column(db.Text, nullable=True)
+    souhrn_do_zpravy_id = db.Column(db.Integer, nullable=True)  # poslední zpráva zahrnutá do shrnutí
+    tokenu_shrnuto = db.Column(db.Integer, nullable=False, default=0)  # odhad tokenů shrnutých zpráv
+    usetreno_tokenu = db.Column(db.Integer, nullable=False, default=0)  # odhad úspory oproti celé historii
+    
     # Relace
     messages = db.relationship('Message', backref='session', lazy=True, cascade='all, delete-orphan')
     service_records = db.relationship('ServiceRecord', backref='session', lazy=True, cascade='all, delete-orphan')
@@ -141,5 +147,76 @@ class AssistantMemory(db.Model):
         return f'<AssistantMemory {self.employee_id} - {self.key}>'
 
 
+class AIJob(db.Model):
+    """Zpráva AI asistentovi zpracovávaná na pozadí (viz modules/ai/jobs.py)"""
+    __tablename__ = 'ai_job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('ai_session.id'), nullable=False, index=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('ai_employee.id'), nullable=False)
+    zprava = db.Column(db.Text, nullable=False)
+    bez_cache = db.Column(db.Boolean, nullable=False, default=False)
+    stav = db.Column(db.String(20), nullable=False, default='cekajici', index=True)  # 'cekajici', 'bezi', 'hotovo', 'chyba'
+    odpoved = db.Column(db.Text, nullable=True)
+    tokens_used = db.Column(db.Integer, nullable=True)
+    chyba = db.Column(db.Text, nullable=True)
+    vytvoreno = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    zahajeno = db.Column(db.DateTime, nullable=True)
+    dokonceno = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<AIJob {self.id} - {self.stav}>'
+    
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'session_id': self.session_id,
+            'stav': self.stav,
+            'assistant_message': self.odpoved,
+            'tokens_used': self.tokens_used,
+            'error': self.chyba,
+            'vytvoreno': self.vytvoreno.isoformat(),
+            'zahajeno': self.zahajeno.isoformat() if self.zahajeno else None,
+            'dokonceno': self.dokonceno.isoformat() if self.dokonceno else None
+        }
+
+
+class AIUsage(db.Model):
+    """Jedno volání Claude API - spotřeba tokenů a latence (viz modules/ai/usage.py)"""
+    __tablename__ = 'ai_usage'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    kanal = db.Column(db.String(20), nullable=False)  # 'chat', 'stream', 'projekt'
+    model = db.Column(db.String(100), nullable=False)
+    # Bez cizích klíčů - evidence zůstane i po smazání relace nebo projektu
+    employee_id = db.Column(db.Integer, nullable=True)
+    session_id = db.Column(db.Integer, nullable=True)
+    projekt_id = db.Column(db.Integer, nullable=True)
+    input_tokens = db.Column(db.Integer, nullable=False, default=0)
+    output_tokens = db.Column(db.Integer, nullable=False, default=0)
+    latence_ms = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<AIUsage {self.id} - {self.kanal} {self.input_tokens}+{self.output_tokens}>'
 
 
+class AIUsageDaily(db.Model):
+    """Denní souhrn spotřeby tokenů - celkem a po zaměstnanci, relaci a projektu"""
+    __tablename__ = 'ai_usage_daily'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    den = db.Column(db.Date, nullable=False)
+    rozmer = db.Column(db.String(20), nullable=False)  # 'celkem', 'zamestnanec', 'relace', 'projekt'
+    klic = db.Column(db.Integer, nullable=False, default=0)  # ID zaměstnance/relace/projektu, 0 pro 'celkem'
+    volani = db.Column(db.Integer, nullable=False, default=0)
+    input_tokens = db.Column(db.Integer, nullable=False, default=0)
+    output_tokens = db.Column(db.Integer, nullable=False, default=0)
+    latence_ms = db.Column(db.Integer, nullable=False, default=0)  # součet latencí volání
+    
+    __table_args__ = (
+        db.UniqueConstraint('den', 'rozmer', 'klic', name='unique_ai_usage_daily'),
+    )
+    
+    def __repr__(self):
+        return f'<AIUsageDaily {self.den} {self.rozmer}:{self.klic}>'
@@ -0,0 +1,132 @@
+"""
+AI Response Cache - Cache odpovědí na opakované dotazy jen pro čtení
+
+Dotazy typu "jaký je stav rozpočtu" nebo "kolik zbývá" se odpovídají ze
+stejných dat přes stejné příkazy AIExecutor. Pokud se zpráva (po normalizaci)
+i data, na kterých odpověď závisí, nezměnila, vrátí se uložená odpověď bez
+volání API. Klíč tvoří normalizovaná zpráva, zaměstnanec a otisk verzí
+sekcí dat z prompt_context_cache. Záznamy mají TTL a nejdéle nepoužité se
+zahazují (LRU).
+
+Do cache jdou jen odpovědi, u kterých proběhly výhradně čtecí příkazy;
+zprávy bez rozpoznaného příkazu nebo se zápisem se cachovat nesmí.
+"""
+
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+
+from .context_cache import prompt_context_cache
+from .retrieval import odstran_diakritiku
+
+# Čtecí příkazy a sekce dat, na kterých jejich výsledek závisí
+ZAVISLOSTI_PRIKAZU: Dict[str, Tuple[str, ...]] = {
+    'get_all_budget_items_new': ('rozpocet',),
+    'get_all_budget_categories': ('rozpocet',),
+    'get_all_expenses': ('rozpocet',),
+    'get_all_revenues': ('rozpocet',),
+    'get_monthly_overview': ('rozpocet',),
+    'get_budget_overview_new': ('rozpocet',),
+    'get_all_projects': ('projekt',),
+    'get_budget_status': ('rozpocet_stary',),
+    'get_budget_summary': ('rozpocet_stary',),
+    'list_budget_items': ('rozpocet_stary',),
+    'get_employees': ('zamestnanci',),
+}
+
+# Sekce, ze kterých se skládá system prompt - na nich závisí každá odpověď
+SEKCE_PROMPTU = ('znalosti', 'rozpocet', 'pamet')
+
+
+def normalizuj_zpravu(zprava: str) -> str:
+    """'Jaký je stav rozpočtu?' -> 'jaky je stav rozpoctu'"""
+    text = odstran_diakritiku(zprava).lower()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+
+class ResponseCache:
+    """LRU cache odpovědí s TTL"""
+    
+    def __init__(self, max_polozek: int = 200, ttl: float = 300.0):
+        self.max_polozek = max_polozek
+        self.ttl = ttl
+        self.enabled = True
+        self._data: 'OrderedDict[Tuple, Tuple[float, str]]' = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def init_app(self, app):
+        """Nastaví cache podle konfigurace aplikace"""
+        app.extensions['ai_response_cache'] = self
+        self.enabled = app.config.get('AI_RESPONSE_CACHE_ENABLED', True)
+        self.max_polozek = app.config.get('AI_RESPONSE_CACHE_SIZE', self.max_polozek)
+        self.ttl = app.config.get('AI_RESPONSE_CACHE_TTL', self.ttl)
+    
+    def klic(self, employee_id: int, zprava: str, akce: Iterable[str]) -> Optional[Tuple]:
+        """
+        Sestaví klíč cache, nebo vrátí None, pokud odpověď cachovat nelze
+        (cache vypnutá, žádný příkaz, nebo příkaz, který není čtecí)
+        """
+        akce = sorted(set(akce))
+        if not self.enabled or not akce or any(a not in ZAVISLOSTI_PRIKAZU for a in akce):
+            return None
+        
+        sekce = set(SEKCE_PROMPTU)
+        for a in akce:
+            sekce.update(ZAVISLOSTI_PRIKAZU[a])
+        sekce = sorted(sekce)
+        
+        return (
+            employee_id,
+            normalizuj_zpravu(zprava),
+            tuple(akce),
+            tuple(sekce),
+            prompt_context_cache.otisk(*sekce)
+        )
+    
+    def get(self, klic: Tuple) -> Optional[str]:
+        """Vrátí uloženou odpověď (platnou podle TTL), nebo None"""
+        with self._lock:
+            zaznam = self._data.get(klic)
+            if zaznam is None or time.monotonic() - zaznam[0] >= self.ttl:
+                if zaznam is not None:
+                    del self._data[klic]
+                self.misses += 1
+                return None
+            self._data.move_to_end(klic)
+            self.hits += 1
+            return zaznam[1]
+    
+    def put(self, klic: Tuple, odpoved: str):
+        """Uloží odpověď; při zaplnění zahodí nejdéle nepoužitý záznam"""
+        with self._lock:
+            self._data[klic] = (time.monotonic(), odpoved)
+            self._data.move_to_end(klic)
+            while len(self._data) > self.max_polozek:
+                self._data.popitem(last=False)
+    
+    def invalidate(self):
+        """Zahodí všechny uložené odpovědi"""
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self) -> Dict:
+        """Vrátí počítadla cache"""
+        with self._lock:
+            dotazy = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / dotazy * 100) if dotazy else 0.0,
+                "polozek": len(self._data),
+                "max_polozek": self.max_polozek,
+                "ttl": self.ttl
+            }
+
+
+# Sdílená instance - konfiguruje se v app.py
+response_cache = ResponseCache()
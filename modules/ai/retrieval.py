@@ -0,0 +1,241 @@
+"""
+AI Retrieval - Výběr relevantních znalostí pro prompt (BM25)
+
+Místo celé znalostní databáze se do promptu posílá jen několik záznamů,
+které nejlépe odpovídají zprávě uživatele. Index je invertovaný, drží se
+v paměti procesu a skóruje se podle BM25. Texty se před indexací zbaví
+diakritiky a převedou na malá písmena, aby "služby" našlo i "sluzby".
+
+Index se synchronizuje líně: jen pokud se od minulého dotazu změnila
+verze sekce 'znalosti' v prompt_context_cache (tj. proběhl commit do
+ai_knowledge nebo znalost). Při synchronizaci se znovu tokenizují jen
+nové a změněné záznamy.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from threading import Lock
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Slova, která nenesou význam pro vyhledávání (bez diakritiky)
+STOP_SLOVA = {
+    'a', 'aby', 'ale', 'ani', 'asi', 'az', 'bez', 'by', 'byl', 'byla', 'bylo', 'byt',
+    'co', 'do', 'i', 'ja', 'jak', 'jaka', 'jake', 'jaky', 'je', 'jeho', 'jsem', 'jsme',
+    'jsou', 'k', 'kde', 'kdo', 'kdy', 'ke', 'ktera', 'ktere', 'ktery', 'mi', 'mne', 'na',
+    'nad', 'nebo', 'o', 'od', 'po', 'pod', 'pro', 'pri', 's', 'se', 'si', 'ta', 'tak',
+    'take', 'to', 'ten', 'tu', 'u', 'uz', 'v', 've', 'z', 'za', 'ze', 'the', 'and', 'of'
+}
+
+# Nejčastější koncovky českých tvarů - odřezávají se od nejdelší (lehký stemming)
+KONCOVKY = (
+    'ech', 'ich', 'ami', 'emi', 'ovi', 'ove', 'ych', 'ymi', 'eho', 'emu', 'ima',
+    'ou', 'em', 'am', 'at', 'it', 'y', 'a', 'e', 'i', 'u', 'o'
+)
+
+_SLOVO = re.compile(r'\w+', re.UNICODE)
+
+
+def odstran_diakritiku(text: str) -> str:
+    """'Služby v Poličce' -> 'Sluzby v Policce'"""
+    rozlozeno = unicodedata.normalize('NFKD', text)
+    return ''.join(znak for znak in rozlozeno if not unicodedata.combining(znak))
+
+
+def tokenizuj(text: str) -> List[str]:
+    """Rozdělí text na normalizované tokeny (bez diakritiky, malá písmena, bez koncovek)"""
+    tokeny = []
+    for slovo in _SLOVO.findall(odstran_diakritiku(text or '').lower()):
+        if slovo in STOP_SLOVA or len(slovo) < 2:
+            continue
+        for koncovka in KONCOVKY:
+            if slovo.endswith(koncovka) and len(slovo) - len(koncovka) >= 3:
+                slovo = slovo[:-len(koncovka)]
+                break
+        tokeny.append(slovo)
+    return tokeny
+
+
+def odhad_tokenu(text: str) -> int:
+    """Hrubý odhad počtu tokenů modelu (~4 znaky na token)"""
+    return len(text) // 4 + 1
+
+
+class KnowledgeIndex:
+    """Invertovaný index s BM25 skórováním"""
+    
+    K1 = 1.5
+    B = 0.75
+    # Slova z titulku se počítají vícekrát - titulek bývá nejvýstižnější
+    VAHA_TITULKU = 2
+    
+    def __init__(self):
+        # klíč dokumentu -> (otisk textu, délka, formátovaný text pro prompt, termy)
+        self._dokumenty: Dict[Hashable, Tuple[int, int, str, Tuple[str, ...]]] = {}
+        # term -> {klíč dokumentu: četnost}
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._celkova_delka = 0
+        self._lock = Lock()
+        self._verze_zdroje = None
+    
+    # ------------------------------------------------------------------------
+    # Údržba indexu
+    # ------------------------------------------------------------------------
+    
+    def pridej(self, klic: Hashable, titulek: str, obsah: str, text_promptu: str):
+        """Přidá nebo nahradí dokument (nezměněný dokument se znovu netokenizuje)"""
+        otisk = hash((titulek, obsah, text_promptu))
+        with self._lock:
+            stavajici = self._dokumenty.get(klic)
+            if stavajici is not None and stavajici[0] == otisk:
+                return
+            if stavajici is not None:
+                self._odeber(klic)
+            
+            cetnosti = Counter(tokenizuj(obsah))
+            for term in tokenizuj(titulek):
+                cetnosti[term] += self.VAHA_TITULKU
+            delka = sum(cetnosti.values())
+            
+            for term, pocet in cetnosti.items():
+                self._postings.setdefault(term, {})[klic] = pocet
+            self._dokumenty[klic] = (otisk, delka, text_promptu, tuple(cetnosti))
+            self._celkova_delka += delka
+    
+    def odeber(self, klic: Hashable):
+        """Odebere dokument z indexu"""
+        with self._lock:
+            self._odeber(klic)
+    
+    def _odeber(self, klic: Hashable):
+        dokument = self._dokumenty.pop(klic, None)
+        if dokument is None:
+            return
+        self._celkova_delka -= dokument[1]
+        for term in dokument[3]:
+            del self._postings[term][klic]
+            if not self._postings[term]:
+                del self._postings[term]
+    
+    def klice(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._dokumenty)
+    
+    def __len__(self):
+        return len(self._dokumenty)
+    
+    # ------------------------------------------------------------------------
+    # Vyhledávání
+    # ------------------------------------------------------------------------
+    
+    def hledej(self, dotaz: str, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        """Vrátí (klíč, skóre) nejrelevantnějších dokumentů seřazené sestupně"""
+        termy = set(tokenizuj(dotaz))
+        if not termy:
+            return []
+        
+        with self._lock:
+            pocet = len(self._dokumenty)
+            if not pocet:
+                return []
+            prumerna_delka = self._celkova_delka / pocet
+            skore: Dict[Hashable, float] = {}
+            
+            for term in termy:
+                dokumenty = self._postings.get(term)
+                if not dokumenty:
+                    continue
+                idf = math.log(1 + (pocet - len(dokumenty) + 0.5) / (len(dokumenty) + 0.5))
+                for klic, tf in dokumenty.items():
+                    delka = self._dokumenty[klic][1]
+                    norma = tf + self.K1 * (1 - self.B + self.B * delka / prumerna_delka)
+                    skore[klic] = skore.get(klic, 0.0) + idf * tf * (self.K1 + 1) / norma
+        
+        return sorted(skore.items(), key=lambda x: x[1], reverse=True)[:limit]
+    
+    def vyber_kontext(self, dotaz: str, top_k: int = 5, token_budget: int = 1500) -> List[str]:
+        """
+        Vybere texty nejrelevantnějších dokumentů, které se vejdou do rozpočtu tokenů
+        
+        Dokument, který by rozpočet přetekl, se přeskočí a zkusí se další (kratší).
+        """
+        vybrane = []
+        zbyva = token_budget
+        for klic, _ in self.hledej(dotaz, limit=top_k * 3):
+            if len(vybrane) >= top_k:
+                break
+            with self._lock:
+                dokument = self._dokumenty.get(klic)
+            if dokument is None:
+                continue
+            tokeny = odhad_tokenu(dokument[2])
+            if tokeny > zbyva:
+                continue
+            vybrane.append(dokument[2])
+            zbyva -= tokeny
+        return vybrane
+    
+    # ------------------------------------------------------------------------
+    # Synchronizace s databází
+    # ------------------------------------------------------------------------
+    
+    def synchronizuj(self, vynutit: bool = False) -> bool:
+        """
+        Srovná index s tabulkami ai_knowledge (veřejné záznamy) a znalost
+        
+        Proběhne jen při změně verze sekce 'znalosti'. Vrací True, pokud se synchronizovalo.
+        """
+        from core import db
+        from modules.projects.models import Znalost
+        from .context_cache import prompt_context_cache
+        from .models import KnowledgeEntry
+        
+        verze = prompt_context_cache.verze('znalosti')
+        if not vynutit and verze == self._verze_zdroje:
+            return False
+        
+        aktualni = set()
+        
+        zaznamy = db.session.query(
+            KnowledgeEntry.id, KnowledgeEntry.title, KnowledgeEntry.content,
+            KnowledgeEntry.category, KnowledgeEntry.tags
+        ).filter(KnowledgeEntry.is_public == True).all()
+        for id_, title, content, category, tags in zaznamy:
+            klic = ('ai', id_)
+            aktualni.add(klic)
+            self.pridej(klic, f"{title} {category or ''} {tags or ''}", content,
+                        formatuj_znalost(title, content, category, tags))
+        
+        znalosti = db.session.query(
+            Znalost.id, Znalost.projekt_id, Znalost.nazev, Znalost.obsah, Znalost.kategorie
+        ).all()
+        for id_, projekt_id, nazev, obsah, kategorie in znalosti:
+            klic = ('projekt', id_)
+            aktualni.add(klic)
+            self.pridej(klic, f"{nazev} {kategorie or ''}", obsah,
+                        formatuj_znalost(nazev, obsah, kategorie, projekt_id=projekt_id))
+        
+        for klic in set(self.klice()) - aktualni:
+            self.odeber(klic)
+        
+        self._verze_zdroje = verze
+        return True
+
+
+def formatuj_znalost(titulek: str, obsah: str, kategorie: Optional[str] = None,
+                     tags: Optional[str] = None, projekt_id: Optional[int] = None) -> str:
+    """Text jednoho záznamu tak, jak se vloží do promptu"""
+    casti = [f"### {titulek}\n"]
+    if projekt_id:
+        casti.append(f"Projekt ID: {projekt_id}\n")
+    casti.append(f"Kategorie: {kategorie or 'Není zadána'}\n")
+    casti.append(f"Obsah:\n{obsah}\n")
+    if tags:
+        casti.append(f"Tags: {tags}\n")
+    casti.append("\n---\n\n")
+    return ''.join(casti)
+
+
+# Sdílená instance pro AI asistenta
+knowledge_index = KnowledgeIndex()
@@ -8,15 +8,24 @@ AI Asistent pro správu projektů
 
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from datetime import datetime
-from typing import List, Optional, Tuple, Dict
+from typing import Iterator, List, Optional, Tuple, Dict
 import json
 import os
 import re
+import time
 from dotenv import load_dotenv
 
 from core import db
-from .models import Employee, AISession, Message, KnowledgeEntry, ServiceRecord, AssistantMemory
+from .models import Employee, AISession, Message, KnowledgeEntry, ServiceRecord, AssistantMemory, AIJob
 from .executor import AIExecutor
+from .context_cache import prompt_context_cache
+from .retrieval import knowledge_index, formatuj_znalost, odhad_tokenu
+from .conversation import ConversationWindow
+from .client import get_client, extrahuj_text, ClaudeAPIError, CircuitOpenError
+from .response_cache import response_cache
+from .intents import matcher_asistenta, matcher_projektu, plan_prikazu, INTENTY_PROJEKTU
+from .jobs import job_queue, QueueFullError
+from .usage import usage_ledger, TokenBudgetExceeded, LIMIT_MEKKY
 from ..projects.executor import ProjectExecutor
 
 # Načti environment variables
@@ -33,114 +42,8 @@ from .models import Employee, AISession, Message, KnowledgeEntry, ServiceRecord,
 # AI ASISTENT SERVICE
 # ============================================================================
 
-class AIAssistantService:
-    """Třída pro komunikaci s Claude API a správu AI asistenta"""
-    
-    def __init__(self):
-        self.api_key = os.getenv('ANTHROPIC_API_KEY')
-        # Použij podporovaný model - zkus nejnovější, pak starší verze
-        # Dostupné modely: claude-sonnet-4-20250514, claude-3-5-sonnet-20241022, claude-3-5-sonnet-20240620
-        self.model = os.getenv('ANTHROPIC_MODEL', 'claude-sonnet-4-20250514')
-        
-        if not self.api_key:
-            raise Exception("ANTHROPIC_API_KEY není nastaven v .env")
-        
-        # Inicializuj Anthropic client - bez httpx
-        try:
-            import anthropic
-            # Přímý request bez httpx wrapper
-            self.client = anthropic
-            self.api_key_value = self.api_key
-        except ImportError:
-            raise Exception("Anthropic SDK není nainstalován. Spusť: pip install anthropic")
-    
-    def get_knowledge_base_context(self) -> str:
-        """Vrátí celou znalostní databázi jako kontext"""
-        entries = KnowledgeEntry.query.filter_by(is_public=True).all()
-        
-        if not entries:
-            return "Znalostní databáze je prázdná."
-        
-        context = "=== ZNALOSTNÍ DATABÁZE ===\n\n"
-        for entry in entries:
-            context += f"### {entry.title}\n"
-            context += f"Kategorie: {entry.category or 'Není zadána'}\n"
-            context += f"Obsah:\n{entry.content}\n"
-            if entry.tags:
-                context += f"Tags: {entry.tags}\n"
-            context += "\n---\n\n"
-        
-        return context
-    
-    def get_employee_memory(self, employee_id: int) -> str:
-        """Vrátí paměť specifického zaměstnance"""
-        memories = AssistantMemory.query.filter_by(employee_id=employee_id).all()
-        
-        if not memories:
-            return ""
-        
-        memory_text = "=== PAMĚŤ O ZAMĚSTNANCI ===\n\n"
-        for memory in memories:
-            memory_text += f"**{memory.key}**: {memory.value}\n"
-        
-        return memory_text
-    
-    def build_system_prompt(self, employee: Employee, session: AISession, projekt_id: Optional[int] = None) -> str:
-        """Vytvoří system prompt s kontextem"""
-        
-        knowledge_context = self.get_knowledge_base_context()
-        employee_memory = self.get_employee_memory(employee.id)
-        
-        # Informace o projektu pokud existuje
-        project_info = ""
-        if projekt_id:
-            project = ProjectExecutor.get_project_detail(projekt_id)
-            if project.get("success"):
-                project_info = f"""
-=== AKTUÁLNÍ PROJEKT ===
-Projekt: {project['nazev']}
-Vedoucí: {project['vedouci'] or 'Není přiřazen'}
-Status: {project['status']}
-Rozpočet: {project['celkovy_rozpocet']} Kč
-Vydaje: {project['celkove_vydaje']} Kč
-Zbývá: {project['zbytek']} Kč
-Termínů: {project['terminy']}
-"""
-        
-        # Aktuální informace o rozpočtu (automaticky načtené)
-        budget_info = ""
-        try:
-            overview = AIExecutor.get_budget_overview_new()
-            if overview.get('success'):
-                budget = overview['budget']
-                budget_info = f"""
-=== AKTUÁLNÍ STAV ROZPOČTU ===
-Rozpočet: {budget['nazev']} (Rok: {budget['rok']})
-Celkový rozpočet: {budget['castka_celkem']:,.2f} Kč
-Celkové výdaje: {budget['celkove_vydaje']:,.2f} Kč
-Celkové výnosy: {budget['celkove_vynosy']:,.2f} Kč
-Bilance: {budget['bilance']:,.2f} Kč
-Zbývá: {budget['zbytek']:,.2f} Kč
-Čerpání: {budget['procento_vycerpano']:.1f}%
-
-Kategorie:
-"""
-                for kat in overview.get('kategorie', [])[:5]:  # Prvních 5 kategorií
-                    budget_info += f"  - {kat['nazev']} ({kat['typ']}): {kat['vydaje']:,.2f} Kč\n"
-                
-                # Přidej informace o počtu účtů
-                try:
-                    ucty = AIExecutor.get_all_budget_items_new()
-                    if ucty:
-                        budget_info += f"\nPočet účtů v rozpočtu: {len(ucty)}\n"
-                        budget_info += "Pro detailní seznam všech účtů použij příkaz: 'Ukaž všechny účty v rozpočtu'\n"
-                except:
-                    pass
-        except Exception as e:
-            budget_info = f"\n(Poznámka: Nepodařilo se načíst aktuální stav rozpočtu: {e})\n"
-        
-        # Informace o aplikaci a jejích funkcích
-        app_info = """
+# Informace o aplikaci a jejích funkcích (statická část system promptu)
+APP_INFO = """
 === DOSTUPNÉ FUNKCE V APLIKACI ===
 
 1. HLAVNÍ ROZPOČET (nový systém):
@@ -158,6 +61,9 @@ Kategorie:
    - "Ukaž všechny výnosy" - zobrazí všechny výnosy
    - "Ukaž měsíční přehled" - zobrazí měsíční přehled výdajů a výnosů
    - "Jaké jsou účty v rozpočtu?" - zobrazí seznam všech účtů s jejich stavem
+   Seznamy (výdaje, výnosy, služby, zprávy...) přicházejí jako tabulka: "sloupce" je
+   hlavička, "radky" jsou řádky ve stejném pořadí, "dalsi": true znamená, že záznamů je víc
+   než zobrazená stránka.
 
 2. PROJEKTY:
    - Vytvořit projekt: "Vytvoř projekt s názvem X"
@@ -227,6 +133,169 @@ DŮLEŽITÉ - PŘÍSTUP K DATŮM:
 - Vždy zobraz uživateli načtená data v přehledné formě
 - NIKDY neříkej, že nemáš přístup ke službám - MÁŠ PLNÝ PŘÍSTUP!
 """
+
+
+class AIAssistantService:
+    """Třída pro komunikaci s Claude API a správu AI asistenta"""
+    
+    # Stav rozpočtu závisí i na aktuálním datu - nejdéle po této době (s) se sestaví znovu
+    ROZPOCET_MAX_VEK = 300
+    
+    def __init__(self):
+        self.api_key = os.getenv('ANTHROPIC_API_KEY')
+        # Použij podporovaný model - zkus nejnovější, pak starší verze
+        # Dostupné modely: claude-sonnet-4-20250514, claude-3-5-sonnet-20241022, claude-3-5-sonnet-20240620
+        self.model = os.getenv('ANTHROPIC_MODEL', 'claude-sonnet-4-20250514')
+        
+        if not self.api_key:
+            raise Exception("ANTHROPIC_API_KEY není nastaven v .env")
+        
+        # Inicializuj Anthropic client - bez httpx
+        try:
+            import anthropic
+            # Přímý request bez httpx wrapper
+            self.client = anthropic
+            self.api_key_value = self.api_key
+        except ImportError:
+            raise Exception("Anthropic SDK není nainstalován. Spusť: pip install anthropic")
+    
+    def get_knowledge_base_context(self, dotaz: Optional[str] = None) -> str:
+        """
+        Vrátí znalostní databázi jako kontext
+        
+        S dotazem jen nejrelevantnější záznamy (BM25, omezeno AI_KNOWLEDGE_TOP_K
+        a AI_KNOWLEDGE_TOKEN_BUDGET), bez dotazu celou databázi (z cache).
+        """
+        if dotaz is None:
+            return prompt_context_cache.get_or_build('znalosti', None, self._sestav_znalosti)
+        
+        from flask import current_app
+        knowledge_index.synchronizuj()
+        vybrane = knowledge_index.vyber_kontext(
+            dotaz,
+            top_k=current_app.config.get('AI_KNOWLEDGE_TOP_K', 5),
+            token_budget=current_app.config.get('AI_KNOWLEDGE_TOKEN_BUDGET', 1500)
+        )
+        
+        if not vybrane:
+            if not len(knowledge_index):
+                return "Znalostní databáze je prázdná."
+            return "=== ZNALOSTNÍ DATABÁZE ===\n\nK dotazu nebyl nalezen žádný relevantní záznam.\n"
+        
+        return ''.join(["=== ZNALOSTNÍ DATABÁZE (nejrelevantnější záznamy) ===\n\n"] + vybrane)
+    
+    @staticmethod
+    def _sestav_znalosti() -> str:
+        entries = KnowledgeEntry.query.filter_by(is_public=True).all()
+        
+        if not entries:
+            return "Znalostní databáze je prázdná."
+        
+        casti = ["=== ZNALOSTNÍ DATABÁZE ===\n\n"]
+        casti.extend(
+            formatuj_znalost(entry.title, entry.content, entry.category, entry.tags)
+            for entry in entries
+        )
+        return ''.join(casti)
+    
+    def get_employee_memory(self, employee_id: int) -> str:
+        """Vrátí paměť specifického zaměstnance (z cache, dokud se nezmění)"""
+        return prompt_context_cache.get_or_build(
+            'pamet', employee_id, lambda: self._sestav_pamet(employee_id)
+        )
+    
+    @staticmethod
+    def _sestav_pamet(employee_id: int) -> str:
+        memories = AssistantMemory.query.filter_by(employee_id=employee_id).all()
+        
+        if not memories:
+            return ""
+        
+        casti = ["=== PAMĚŤ O ZAMĚSTNANCI ===\n\n"]
+        casti.extend(f"**{memory.key}**: {memory.value}\n" for memory in memories)
+        return ''.join(casti)
+    
+    def get_project_context(self, projekt_id: Optional[int]) -> str:
+        """Vrátí informace o projektu pro prompt (z cache, dokud se projekt nezmění)"""
+        if not projekt_id:
+            return ""
+        return prompt_context_cache.get_or_build(
+            'projekt', projekt_id, lambda: self._sestav_projekt(projekt_id)
+        )
+    
+    @staticmethod
+    def _sestav_projekt(projekt_id: int) -> str:
+        project = ProjectExecutor.get_project_detail(projekt_id)
+        if not project.get("success"):
+            return ""
+        
+        vedouci = (project.get('created_by_user') or {}).get('jmeno_prijmeni')
+        return f"""
+=== AKTUÁLNÍ PROJEKT ===
+Projekt: {project['nazev']}
+Vedoucí: {vedouci or 'Není přiřazen'}
+Status: {project['status']}
+Rozpočet: {project['celkovy_rozpocet']} Kč
+Vydaje: {project['celkove_vydaje']} Kč
+Zbývá: {project['zbytek']} Kč
+Termínů: {project['terminy']}
+"""
+    
+    def get_budget_context(self) -> str:
+        """Vrátí aktuální stav rozpočtu pro prompt (z cache, dokud se rozpočet nezmění)"""
+        return prompt_context_cache.get_or_build(
+            'rozpocet', None, self._sestav_rozpocet, max_vek=self.ROZPOCET_MAX_VEK
+        )
+    
+    @staticmethod
+    def _sestav_rozpocet() -> str:
+        try:
+            overview = AIExecutor.get_budget_overview_new()
+            if not overview.get('success'):
+                return ""
+            
+            budget = overview['budget']
+            casti = [f"""
+=== AKTUÁLNÍ STAV ROZPOČTU ===
+Rozpočet: {budget['nazev']} (Rok: {budget['rok']})
+Celkový rozpočet: {budget['castka_celkem']:,.2f} Kč
+Celkové výdaje: {budget['celkove_vydaje']:,.2f} Kč
+Celkové výnosy: {budget['celkove_vynosy']:,.2f} Kč
+Bilance: {budget['bilance']:,.2f} Kč
+Zbývá: {budget['zbytek']:,.2f} Kč
+Čerpání: {budget['procento_vycerpano']:.1f}%
+
+Kategorie:
+"""]
+            for kat in overview.get('kategorie', [])[:5]:  # Prvních 5 kategorií
+                casti.append(f"  - {kat['nazev']} ({kat['typ']}): {kat['vydaje']:,.2f} Kč\n")
+            
+            # Přidej informace o počtu účtů (stačí počet, ne celé položky)
+            try:
+                pocet_uctu = AIExecutor.count_budget_items_new()
+                if pocet_uctu:
+                    casti.append(f"\nPočet účtů v rozpočtu: {pocet_uctu}\n")
+                    casti.append("Pro detailní seznam všech účtů použij příkaz: 'Ukaž všechny účty v rozpočtu'\n")
+            except:
+                pass
+            
+            return ''.join(casti)
+        except Exception as e:
+            return f"\n(Poznámka: Nepodařilo se načíst aktuální stav rozpočtu: {e})\n"
+    
+    def build_system_prompt(self, employee: Employee, session: AISession, projekt_id: Optional[int] = None,
+                            dotaz: Optional[str] = None) -> str:
+        """
+        Vytvoří system prompt s kontextem - sekce se berou z cache a jen se spojí
+        
+        Pokud je zadán dotaz (zpráva uživatele), vloží se jen znalosti relevantní k němu.
+        """
+        
+        knowledge_context = self.get_knowledge_base_context(dotaz)
+        employee_memory = self.get_employee_memory(employee.id)
+        project_info = self.get_project_context(projekt_id)
+        budget_info = self.get_budget_context()
+        app_info = APP_INFO
         
         prompt = f"""Jsi AI asistent pro správu projektů v Knihovně Polička.
 
@@ -261,19 +330,18 @@ Kontext relace: {session.context or 'Bez speciálního kontextu'}
 """
         return prompt
     
-    def send_message(self, employee_id: int, session_id: int, user_message: str) -> Tuple[str, int]:
+    def _priprav_pozadavek(self, employee_id: int, session_id: int, user_message: str,
+                           bez_cache: bool = False) -> Dict:
         """
-        Odešle zprávu Claude a vrátí odpověď
+        Provede příkazy ze zprávy a sestaví tělo požadavku na API
         
-        1. Nejdřív se pokusí rozpoznat příkazy z uživatelovy zprávy
-        2. Pokud je příkaz, provede jej přes AIExecutor
-        3. Pak pošle zprávu asistentovi s výsledky
+        Pokud zpráva vede jen na čtecí příkazy a stejná odpověď nad stejnými
+        daty už je v response_cache, nic se neprovádí a požadavek se nesestavuje.
         
         Returns:
-            tuple: (odpověď asistenta, počet tokenů)
+            dict: 'session', 'klic_cache' (None = necachovat) a buď
+            'odpoved_z_cache', nebo 'data' (tělo požadavku) a 'okno_info'
         """
-        import requests
-        
         # Získej zaměstnance a relaci
         employee = Employee.query.get(employee_id)
         session = AISession.query.get(session_id)
@@ -281,8 +349,25 @@ Kontext relace: {session.context or 'Bez speciálního kontextu'}
         if not employee or not session:
             raise ValueError("Zaměstnanec nebo relace nenalezeny")
         
+        # Denní limity tokenů - tvrdý volání odmítne ještě před provedením příkazů
+        # (jinak by se zápis uložil a uživatel dostal odmítnutí), měkký zmenší požadavek
+        omezeno = usage_ledger.kontrola(employee_id, session_id) == LIMIT_MEKKY
+        
+        # Odpověď na stejný čtecí dotaz nad nezměněnými daty - klíč z plánu příkazů,
+        # ještě před jejich provedením (zásah do cache nestojí žádné čtení dat)
+        shoda = matcher_asistenta.rozpoznej(user_message)
+        klic_cache = None
+        if not bez_cache and shoda.hlavni not in (None, 'pridej'):
+            from flask import current_app
+            plan = plan_prikazu(shoda, current_app.config.get('AI_INTENT_MAX_READS', 1))
+            klic_cache = response_cache.klic(employee_id, user_message, [akce for akce, _ in plan])
+            if klic_cache is not None:
+                odpoved = response_cache.get(klic_cache)
+                if odpoved is not None:
+                    return {"session": session, "klic_cache": klic_cache, "odpoved_z_cache": odpoved}
+        
         # Pokus se detekovat a provést příkazy
-        execution_results = self._detect_and_execute_commands(user_message, session_id)
+        execution_results = self._detect_and_execute_commands(user_message, session_id, shoda)
         
         # Přidej kontakt s výsledky do zprávy pro AI
         enhanced_message = user_message
@@ -290,31 +375,25 @@ Kontext relace: {session.context or 'Bez speciálního kontextu'}
             enhanced_message += "\n\n[VÝSLEDKY PROVEDENÝCH AKCÍ]\n"
             enhanced_message += json.dumps(execution_results, ensure_ascii=False, indent=2)
         
-        # Urči si všechny zprávy v konverzaci
-        messages = Message.query.filter_by(session_id=session_id).order_by(Message.created_at).all()
-        
-        # Přeformátuj pro API
-        conversation = []
-        for msg in messages:
-            conversation.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-        
-        # Přidej novou zprávu s eventuálními výsledky akcí
-        conversation.append({
-            "role": "user",
-            "content": enhanced_message
-        })
-        
-        # Zavolej Claude API
-        system_prompt = self.build_system_prompt(employee, session)
+        system_prompt = self.build_system_prompt(employee, session, dotaz=user_message)
         
-        headers = {
-            "x-api-key": self.api_key_value,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json"
-        }
+        # Historie: posledních N výměn doslovně, starší jako průběžné shrnutí v system promptu
+        from flask import current_app
+        okno = ConversationWindow.z_konfigurace(current_app.config)
+        if omezeno:
+            okno = ConversationWindow(
+                posledni_vymeny=max(1, okno.posledni_vymeny // 3),
+                token_budget=okno.token_budget // 2,
+                max_tokenu_souhrnu=okno.max_tokenu_souhrnu // 2
+            )
+        conversation, okno_info = okno.sestav(session, enhanced_message, system_prompt)
+        if okno_info['souhrn']:
+            system_prompt = ''.join([
+                system_prompt,
+                "\n=== SHRNUTÍ STARŠÍ ČÁSTI KONVERZACE ===\n",
+                okno_info['souhrn'],
+                "\n"
+            ])
         
         # Ověření, že model existuje
         if not self.model:
@@ -322,256 +401,173 @@ Kontext relace: {session.context or 'Bez speciálního kontextu'}
         
         data = {
             "model": self.model,
-            "max_tokens": 2048,
+            "max_tokens": 1024 if omezeno else 2048,
             "system": system_prompt,
             "messages": conversation
         }
+        return {"session": session, "klic_cache": klic_cache, "data": data, "okno_info": okno_info}
+    
+    def _chyba_api(self, e: ClaudeAPIError) -> Exception:
+        """Převede chybu klienta na srozumitelnou výjimku pro uživatele"""
+        if isinstance(e, CircuitOpenError):
+            return e
+        error_detail = f" - {e.detail}" if e.detail else ""
+        
+        # Pokud je 404, zkus jiný model
+        if e.status_code == 404:
+            return Exception(f"Model '{self.model}' není dostupný (HTTP 404). Zkus nastavit jiný model v .env jako ANTHROPIC_MODEL=claude-3-5-sonnet-20240620 nebo claude-3-opus-20240229{error_detail}")
+        return Exception(f"{e}{error_detail}")
+    
+    def send_message(self, employee_id: int, session_id: int, user_message: str,
+                     bez_cache: bool = False) -> Tuple[str, int]:
+        """
+        Odešle zprávu Claude a vrátí odpověď
+        
+        1. Nejdřív se pokusí rozpoznat příkazy z uživatelovy zprávy
+        2. Pokud je příkaz, provede jej přes AIExecutor
+        3. Pak pošle zprávu asistentovi s výsledky
+        
+        Opakovaný čtecí dotaz se vrátí z response_cache (0 tokenů), bez_cache
+        cache obejde.
         
+        Returns:
+            tuple: (odpověď asistenta, počet tokenů)
+        """
+        pozadavek = self._priprav_pozadavek(employee_id, session_id, user_message, bez_cache)
+        if 'odpoved_z_cache' in pozadavek:
+            return pozadavek['odpoved_z_cache'], 0
+        
+        start = time.perf_counter()
         try:
-            response = requests.post(
-                "https://api.anthropic.com/v1/messages",
-                json=data,
-                headers=headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Zpracování odpovědi - může být text nebo array
-            if isinstance(result.get('content'), list) and len(result['content']) > 0:
-                if isinstance(result['content'][0], dict) and 'text' in result['content'][0]:
-                    assistant_message = result['content'][0]['text']
-                else:
-                    assistant_message = str(result['content'][0])
-            elif isinstance(result.get('content'), str):
-                assistant_message = result['content']
-            else:
-                assistant_message = str(result.get('content', 'Žádná odpověď'))
-            
-            tokens_used = result.get('usage', {}).get('input_tokens', 0) + result.get('usage', {}).get('output_tokens', 0)
-            
-            return assistant_message, tokens_used
-        except requests.exceptions.HTTPError as e:
-            error_detail = ""
-            status_code = "?"
-            try:
-                if hasattr(e, 'response') and e.response is not None:
-                    status_code = e.response.status_code
-                    try:
-                        error_response = e.response.json()
-                        error_msg = error_response.get('error', {})
-                        if isinstance(error_msg, dict):
-                            error_detail = f" - {error_msg.get('message', str(e))}"
-                        else:
-                            error_detail = f" - {error_msg}"
-                    except:
-                        error_detail = f" - {e.response.text[:200]}"
-                else:
-                    error_detail = f" - {str(e)}"
-            except:
-                error_detail = f" - {str(e)}"
-            
-            # Pokud je 404, zkus jiný model
-            if status_code == 404:
-                raise Exception(f"Model '{self.model}' není dostupný (HTTP 404). Zkus nastavit jiný model v .env jako ANTHROPIC_MODEL=claude-3-5-sonnet-20240620 nebo claude-3-opus-20240229{error_detail}")
-            else:
-                raise Exception(f"Chyba při komunikaci s Claude API (HTTP {status_code}){error_detail}")
-        except Exception as e:
-            raise Exception(f"Chyba při komunikaci s Claude API: {str(e)}")
+            result = get_client().messages(pozadavek['data'], self.api_key_value)
+        except ClaudeAPIError as e:
+            raise self._chyba_api(e)
+        
+        assistant_message = extrahuj_text(result)
+        tokens_used = result.get('usage', {}).get('input_tokens', 0) + result.get('usage', {}).get('output_tokens', 0)
+        usage_ledger.zapis('chat', self.model, result.get('usage', {}), (time.perf_counter() - start) * 1000,
+                           employee_id=employee_id, session_id=session_id)
+        
+        # Úspora oproti celé historii - uloží se spolu se zprávami (save_message_pair)
+        ConversationWindow.zapis_usporu(pozadavek['session'], pozadavek['okno_info'])
+        
+        if pozadavek['klic_cache'] is not None:
+            response_cache.put(pozadavek['klic_cache'], assistant_message)
+        
+        return assistant_message, tokens_used
     
-    def _detect_and_execute_commands(self, user_message: str, session_id: int) -> Optional[Dict]:
+    def stream_message(self, employee_id: int, session_id: int, user_message: str,
+                       bez_cache: bool = False) -> Iterator[Tuple[str, object]]:
+        """
+        Jako send_message, ale odpověď vrací postupně, jak ji model generuje
+        
+        Yields:
+            ('text', kus textu) pro každý přírůstek odpovědi, na konci
+            ('hotovo', (celá odpověď, počet tokenů))
+        """
+        pozadavek = self._priprav_pozadavek(employee_id, session_id, user_message, bez_cache)
+        if 'odpoved_z_cache' in pozadavek:
+            yield 'text', pozadavek['odpoved_z_cache']
+            yield 'hotovo', (pozadavek['odpoved_z_cache'], 0)
+            return
+        
+        casti = []
+        vstupni_tokeny = 0
+        vystupni_tokeny = 0
+        start = time.perf_counter()
+        try:
+            for udalost in get_client().messages_stream(pozadavek['data'], self.api_key_value):
+                typ = udalost.get('type')
+                if typ == 'content_block_delta':
+                    text = udalost.get('delta', {}).get('text')
+                    if text:
+                        casti.append(text)
+                        yield 'text', text
+                elif typ == 'message_start':
+                    vstupni_tokeny = udalost.get('message', {}).get('usage', {}).get('input_tokens', 0)
+                elif typ == 'message_delta':
+                    vystupni_tokeny = udalost.get('usage', {}).get('output_tokens', vystupni_tokeny)
+        except ClaudeAPIError as e:
+            raise self._chyba_api(e)
+        finally:
+            # Tokeny se spotřebují i při přerušeném streamu (odpojení klienta, chyba API) -
+            # bez konečného message_delta se výstup odhadne z dosud přijatého textu
+            if not vystupni_tokeny and casti:
+                vystupni_tokeny = odhad_tokenu(''.join(casti))
+            if vstupni_tokeny or vystupni_tokeny:
+                usage_ledger.zapis('stream', self.model,
+                                   {'input_tokens': vstupni_tokeny, 'output_tokens': vystupni_tokeny},
+                                   (time.perf_counter() - start) * 1000,
+                                   employee_id=employee_id, session_id=session_id)
+        
+        ConversationWindow.zapis_usporu(pozadavek['session'], pozadavek['okno_info'])
+        odpoved = ''.join(casti)
+        if pozadavek['klic_cache'] is not None and odpoved:
+            response_cache.put(pozadavek['klic_cache'], odpoved)
+        yield 'hotovo', (odpoved, vstupni_tokeny + vystupni_tokeny)
+    
+    def _detect_and_execute_commands(self, user_message: str, session_id: int,
+                                     shoda=None) -> Optional[Dict]:
         """
         Detekuje příkazy v uživatelově zprávě a provádí je
         
         Příklady:
         - "Ukaž mi rozpočet" -> seznam položek
         - "Přidej nový výdaj 5000 Kč" -> add_expense
+        
+        Záměry a parametry rozpozná matcher_asistenta jedním průchodem (viz
+        modules/ai/intents.py); čte se jen pro nejlepší záměr(y) a každý
+        příkaz se provede nejvýše jednou. Již rozpoznanou `shoda` lze předat.
         """
+        from flask import current_app
         
         results = []
-        keywords_query = ['rozpočet', 'polozka', 'položka', 'seznam', 'ukaž', 'ukaz', 'jaký', 'jaky', 'kolik', 'jak']
-        keywords_employees = ['zaměstnanec', 'zamestnanec', 'osoba', 'pracovník', 'pracovnic', 'pracovníka', 'lidé', 'lide']
-        keywords_status = ['stav', 'jak je', 'kolik', 'zbývá', 'zbyva', 'bilance', 'vydali', 'spálili', 'spali', 'vydaje']
-        keywords_accounts = ['účty', 'ucty', 'účet', 'ucet', 'položky rozpočtu', 'polozky rozpoctu', 'jaké účty', 'jake ucty']
-        keywords_categories = ['kategorie', 'kategorii', 'kategorií', 'kategorii rozpočtu']
-        keywords_expenses = ['výdaje', 'vydaje', 'výdajů', 'vydaju', 'výdaj', 'vydaj']
-        keywords_revenues = ['výnosy', 'vynosy', 'výnosů', 'vynosu', 'výnos', 'vynos']
-        keywords_projects = ['projekty', 'projektů', 'projektu', 'projekt']
-        keywords_monthly = ['měsíční', 'mesicni', 'měsíc', 'mesic', 'měsíce', 'mesice', 'měsíční přehled', 'mesicni prehled']
-        keywords_services = ['služby', 'sluzby', 'služba', 'sluzba', 'služeb', 'sluzeb', 'směny', 'směna', 'smeny', 'smena', 'rozpis služeb', 'rozpis sluzeb', 'kalendář služeb', 'kalendar sluzeb']
-        keywords_users = ['uživatelé', 'uzivatele', 'uživatel', 'uzivatel', 'uživatelů', 'uzivatelu']
-        keywords_changelog = ['changelog', 'změny', 'zmeny', 'historie změn', 'historie zmen']
-        
+        if shoda is None:
+            shoda = matcher_asistenta.rozpoznej(user_message)
         lower_msg = user_message.lower()
         
-        # Detekce dotazů na čtení dat z databáze (priorita - konkrétní dotazy)
-        # Účty v rozpočtu (nejčastější dotaz)
-        if any(k in lower_msg for k in keywords_accounts):
-            try:
-                # Zkontroluj, zda je to dotaz na typ (náklady/výnosy)
-                typ = None
-                if 'náklad' in lower_msg or 'naklad' in lower_msg:
-                    typ = 'naklad'
-                elif 'výnos' in lower_msg or 'vynos' in lower_msg:
-                    typ = 'vynos'
-                
-                result = AIExecutor.execute_command('get_all_budget_items_new', {'typ': typ} if typ else {})
-                results.append({
-                    "action": "get_all_budget_items_new",
-                    "data": result.get('result', [])
-                })
-            except Exception as e:
-                print(f"Chyba při čtení účtů: {e}")
-                pass
-        
-        # Kategorie
-        elif any(k in lower_msg for k in keywords_categories):
-            try:
-                result = AIExecutor.execute_command('get_all_budget_categories')
-                results.append({
-                    "action": "get_all_budget_categories",
-                    "data": result.get('result', [])
-                })
-            except:
-                pass
-        
-        # Výdaje
-        elif any(k in lower_msg for k in keywords_expenses):
-            try:
-                result = AIExecutor.execute_command('get_all_expenses')
-                results.append({
-                    "action": "get_all_expenses",
-                    "data": result.get('result', [])
-                })
-            except:
-                pass
-        
-        # Výnosy
-        elif any(k in lower_msg for k in keywords_revenues):
-            try:
-                result = AIExecutor.execute_command('get_all_revenues')
-                results.append({
-                    "action": "get_all_revenues",
-                    "data": result.get('result', [])
-                })
-            except:
-                pass
-        
-        # Projekty
-        elif any(k in lower_msg for k in keywords_projects) and 'projekt' in lower_msg:
-            try:
-                result = AIExecutor.execute_command('get_all_projects')
-                results.append({
-                    "action": "get_all_projects",
-                    "data": result.get('result', [])
-                })
-            except:
-                pass
-        
-        # Měsíční přehled
-        elif any(k in lower_msg for k in keywords_monthly):
-            try:
-                result = AIExecutor.execute_command('get_monthly_overview')
-                results.append({
-                    "action": "get_monthly_overview",
-                    "data": result.get('result', [])
-                })
-            except:
-                pass
+        if shoda.hlavni is None:
+            return None
         
-        # Detekce stavu rozpočtu (obecný dotaz) - nový systém
-        elif any(k in lower_msg for k in keywords_status):
-            try:
-                # Zkus nový systém
-                result = AIExecutor.execute_command('get_budget_overview_new')
-                if result.get('success'):
-                    results.append({
-                        "action": "get_budget_overview_new",
-                        "data": result.get('result', {})
-                    })
-                else:
-                    # Fallback na starý systém
-                    result = AIExecutor.execute_command('get_budget_status')
-                    results.append({
-                        "action": "get_budget_status",
-                        "data": result.get('result', {})
-                    })
-                    
-                    summary = AIExecutor.execute_command('get_budget_summary')
+        # Detekce dotazů na čtení dat z databáze - příkazy nejlepších záměrů, každý jen jednou
+        if shoda.hlavni != 'pridej':
+            plan = plan_prikazu(shoda, current_app.config.get('AI_INTENT_MAX_READS', 1))
+            for akce, parametry in plan:
+                try:
+                    result = AIExecutor.execute_command(akce, parametry)
+                    if akce == 'get_budget_overview_new' and not result.get('success'):
+                        # Fallback na starý systém
+                        for stara_akce in ('get_budget_status', 'get_budget_summary'):
+                            stary = AIExecutor.execute_command(stara_akce)
+                            results.append({
+                                "action": stara_akce,
+                                "data": stary.get('result', {})
+                            })
+                        continue
+                    data = result.get('result', [])
+                    if akce == 'list_budget_items':
+                        data = data[:10]  # Limit na prvních 10
                     results.append({
-                        "action": "get_budget_summary",
-                        "data": summary.get('result', {})
+                        "action": akce,
+                        "data": data
                     })
-            except:
-                pass
-        
-        # Starý systém - dotazy na rozpočet (kompatibilita)
-        elif any(k in lower_msg for k in keywords_query):
-            try:
-                result = AIExecutor.execute_command('list_budget_items')
-                results.append({
-                    "action": "list_budget_items",
-                    "data": result.get('result', [])[:10]  # Limit na prvních 10
-                })
-            except:
-                pass
-        
-        # Detekce dotazů na zaměstnance
-        elif any(k in lower_msg for k in keywords_employees):
-            try:
-                result = AIExecutor.execute_command('get_employees')
-                results.append({
-                    "action": "get_employees",
-                    "data": result.get('result', [])
-                })
-            except:
-                pass
+                except Exception as e:
+                    print(f"Chyba při provádění příkazu {akce}: {e}")
         
         # Detekce přidávání výdajů do nového rozpočtu
-        elif 'přidej' in lower_msg or 'pridej' in lower_msg:
+        else:
             try:
-                import re
-                numbers = re.findall(r'\d+(?:,\d+)?', user_message)
-                
-                # Nový systém rozpočtu
-                if 'kategorii' in lower_msg or 'kategorie' in lower_msg:
-                    # Přidání kategorie
-                    if 'mzdov' in lower_msg:
-                        typ = 'naklad_mzdovy'
-                    elif 'ostatn' in lower_msg:
-                        typ = 'naklad_ostatni'
-                    elif 'výnos' in lower_msg or 'vynos' in lower_msg:
-                        typ = 'vynos'
-                    else:
-                        typ = 'naklad_ostatni'
-                    
-                    # Extrahuj název kategorie
-                    nazev_match = re.search(r'kategorii\s+[\'"]?([^\'"]+)[\'"]?', user_message, re.IGNORECASE)
-                    if nazev_match:
-                        nazev = nazev_match.group(1).strip()
-                        result = AIExecutor.execute_command('add_budget_category', {
-                            'typ': typ,
-                            'nazev': nazev
-                        })
-                        results.append({
-                            "action": "add_budget_category",
-                            "result": result
-                        })
+                castka = shoda.castka
+                category_id = shoda.parametry.get('kategorie_id')
                 
                 # Přidání rozpočtové položky
-                elif 'položku' in lower_msg or 'polozku' in lower_msg or 'řádek' in lower_msg or 'radek' in lower_msg:
-                    if numbers:
-                        castka = float(numbers[0].replace(',', '.'))
-                        # Hledej ID kategorie
-                        id_match = re.search(r'kategorii\s+(\d+)|kategorie\s+(\d+)', user_message, re.IGNORECASE)
-                        category_id = int(id_match.group(1) or id_match.group(2)) if id_match else None
-                        
+                if 'položku' in lower_msg or 'polozku' in lower_msg or 'řádek' in lower_msg or 'radek' in lower_msg:
+                    if castka:
                         # Extrahuj název
                         nazev_match = re.search(r'položku\s+[\'"]?([^\'"]+)[\'"]?', user_message, re.IGNORECASE)
                         nazev = nazev_match.group(1).strip() if nazev_match else 'Nová položka'
                         
-                        if category_id and castka:
+                        if category_id:
                             result = AIExecutor.execute_command('add_new_budget_item', {
                                 'category_id': category_id,
                                 'nazev': nazev,
@@ -583,17 +579,12 @@ Kontext relace: {session.context or 'Bez speciálního kontextu'}
                             })
                 
                 # Přidání výdaje
-                elif ('výdaj' in lower_msg or 'vydaj' in lower_msg or 'kč' in lower_msg) and numbers:
-                    castka = float(numbers[0].replace(',', '.'))
-                    # Hledej ID kategorie
-                    id_match = re.search(r'kategorii\s+(\d+)|kategorie\s+(\d+)', user_message, re.IGNORECASE)
-                    category_id = int(id_match.group(1) or id_match.group(2)) if id_match else None
-                    
+                elif ('vydaj' in shoda.text or 'kc' in shoda.text) and castka:
                     # Extrahuj popis
                     popis_match = re.search(r'za\s+[\'"]?([^\'"]+)[\'"]?|popis[:\s]+[\'"]?([^\'"]+)[\'"]?', user_message, re.IGNORECASE)
                     popis = (popis_match.group(1) or popis_match.group(2) or 'Výdaj').strip() if popis_match else 'Výdaj'
                     
-                    if category_id and castka:
+                    if category_id:
                         result = AIExecutor.execute_command('add_budget_expense', {
                             'category_id': category_id,
                             'popis': popis,
@@ -603,25 +594,11 @@ Kontext relace: {session.context or 'Bez speciálního kontextu'}
                             "action": "add_budget_expense",
                             "result": result
                         })
-                
-                # Starý systém (kompatibilita)
-                elif numbers and ('výdaj' in lower_msg or 'vydaj' in lower_msg or 'kč' in lower_msg):
-                    # Pokus se detekovat ID položky a částku
-                    castka = None
-                    polozka_id = None
-                    
-                    # Hledej "ID XXX" nebo "položka XXX"
-                    id_match = re.search(r'ID\s+(\d+)', user_message, re.IGNORECASE)
-                    if id_match:
-                        polozka_id = int(id_match.group(1))
-                    
-                    # Hledej "XXXX Kč" nebo jen první číslo
-                    if numbers:
-                        castka = float(numbers[0].replace(',', '.'))
                     
-                    if castka and polozka_id:
+                    # Starý systém (kompatibilita) - výdaj k položce "ID XXX"
+                    elif shoda.parametry.get('id'):
                         result = AIExecutor.execute_command('add_expense', {
-                            'polozka_id': polozka_id,
+                            'polozka_id': shoda.parametry['id'],
                             'castka': castka,
                             'popis': 'Přidáno AI asistentem'
                         })
@@ -629,6 +606,30 @@ Kontext relace: {session.context or 'Bez speciálního kontextu'}
                             "action": "add_expense",
                             "result": result
                         })
+                
+                # Přidání kategorie
+                elif 'kategori' in shoda.text:
+                    if 'mzdov' in lower_msg:
+                        typ = 'naklad_mzdovy'
+                    elif 'ostatn' in lower_msg:
+                        typ = 'naklad_ostatni'
+                    elif 'výnos' in lower_msg or 'vynos' in lower_msg:
+                        typ = 'vynos'
+                    else:
+                        typ = 'naklad_ostatni'
+                    
+                    # Extrahuj název kategorie
+                    nazev_match = re.search(r'kategorii\s+[\'"]?([^\'"]+)[\'"]?', user_message, re.IGNORECASE)
+                    if nazev_match:
+                        nazev = nazev_match.group(1).strip()
+                        result = AIExecutor.execute_command('add_budget_category', {
+                            'typ': typ,
+                            'nazev': nazev
+                        })
+                        results.append({
+                            "action": "add_budget_category",
+                            "result": result
+                        })
             except Exception as e:
                 print(f"Chyba při detekci příkazu: {e}")
                 pass
@@ -734,14 +735,25 @@ def setup():
         return jsonify({'error': f'Chyba při ukládání: {str(e)}'}), 500
 
 
-def send_claude_message(system_prompt: str, user_message: str, conversation_history: list = None) -> Dict:
-    """Pošle zprávu do Claude API s možností historie konverzace"""
-    import requests
+def send_claude_message(system_prompt: str, user_message: str, conversation_history: list = None,
+                        projekt_id: Optional[int] = None) -> Dict:
+    """
+    Pošle zprávu do Claude API s možností historie konverzace
     
+    Volání se eviduje v usage_ledger; po překročení měkkého denního limitu
+    projektu se historie zkrátí na poslední výměnu, po tvrdém se neodešle.
+    """
     api_key = os.getenv('ANTHROPIC_API_KEY')
     if not api_key:
         return {"error": "API klíč není konfigurován"}
     
+    try:
+        omezeno = usage_ledger.kontrola(projekt_id=projekt_id) == LIMIT_MEKKY
+    except TokenBudgetExceeded as e:
+        return {'error': str(e), 'limit_tokenu': True}
+    if omezeno and conversation_history:
+        conversation_history = conversation_history[-2:]
+    
     # Sestav messages - historie + aktuální zpráva
     messages = []
     if conversation_history:
@@ -759,43 +771,26 @@ def send_claude_message(system_prompt: str, user_message: str, conversation_hist
             'content': user_message
         })
     
+    model = os.getenv('ANTHROPIC_MODEL', 'claude-sonnet-4-20250514')
     try:
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers={
-                'x-api-key': api_key,
-                'anthropic-version': '2023-06-01',
-                'content-type': 'application/json'
-            },
-            json={
-                'model': os.getenv('ANTHROPIC_MODEL', 'claude-sonnet-4-20250514'),
-                'max_tokens': 1024,  # Zkráceno pro úsporu tokenů
-                'system': system_prompt,
-                'messages': messages
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Zpracování odpovědi - může být text nebo array
-            if isinstance(data.get('content'), list) and len(data['content']) > 0:
-                if isinstance(data['content'][0], dict) and 'text' in data['content'][0]:
-                    assistant_message = data['content'][0]['text']
-                else:
-                    assistant_message = str(data['content'][0])
-            elif isinstance(data.get('content'), str):
-                assistant_message = data['content']
-            else:
-                assistant_message = str(data.get('content', 'Žádná odpověď'))
-            return {
-                'success': True,
-                'content': data.get('content', [{}])[0].get('text', 'Chyba odpovědi'),
-                'usage': data.get('usage', {})
-            }
-        else:
-            return {'error': f'API error: {response.status_code} - {response.text}'}
+        start = time.perf_counter()
+        data = get_client().messages({
+            'model': model,
+            'max_tokens': 512 if omezeno else 1024,  # Zkráceno pro úsporu tokenů
+            'system': system_prompt,
+            'messages': messages
+        }, api_key)
+        usage_ledger.zapis('projekt', model, data.get('usage', {}), (time.perf_counter() - start) * 1000,
+                           projekt_id=projekt_id)
+        return {
+            'success': True,
+            'content': extrahuj_text(data),
+            'usage': data.get('usage', {})
+        }
+    except ClaudeAPIError as e:
+        if e.status_code:
+            return {'error': f'API error: {e.status_code} - {e.detail}'}
+        return {'error': str(e)}
     except Exception as e:
         return {'error': str(e)}
 
@@ -807,6 +802,7 @@ def send_message():
     message_text = data.get('message', '').strip()
     session_id = data.get('session_id')
     projekt_id = data.get('projekt_id')
+    bez_cache = bool(data.get('no_cache'))
     
     if not message_text:
         return jsonify({'error': 'Zpráva je prázdná'}), 400
@@ -902,7 +898,8 @@ Odpovídej stručně česky."""
             response = send_claude_message(
                 system_prompt=system_prompt,
                 user_message=message_text,
-                conversation_history=conversation_history
+                conversation_history=conversation_history,
+                projekt_id=projekt_id
             )
             
             # Po obdržení odpovědi z Claude, zkus detekovat a provést příkazy
@@ -929,170 +926,138 @@ Odpovídej stručně česky."""
             if 'expense_deleted' not in response:
                 response['expense_deleted'] = False
             
+            # Záměry i parametry zprávy - jeden průchod zkompilovaným matcherem (viz modules/ai/intents.py)
+            shoda = matcher_projektu.rozpoznej(message_text)
+            klicova_slova = dict(INTENTY_PROJEKTU)
+            castka = shoda.castka
+            
+            # Text před a za částkou - pro popis, když není zadán výslovně. Normalizace
+            # zachovává pozice znaků, kromě vzácných ligatur (pak se popis neodhaduje)
+            pred_castkou = za_castkou = ''
+            if shoda.pozice_castky and len(shoda.text) == len(message_text):
+                zacatek, konec = shoda.pozice_castky
+                pred_castkou = message_text[:zacatek].strip()
+                za_castkou = message_text[konec:].strip()
+            
             # Detekce příkazů pro nastavení rozpočtu - NOVÁ LOGIKA
-            budget_set_keywords = ['nastav rozpočet', 'nastavit rozpočet', 'set budget', 'rozpočet na', 'rozpočet je']
-            is_budget_set_command = any(keyword in message_text.lower() for keyword in budget_set_keywords) and \
-                                   any(word in message_text.lower() for word in ['kč', 'korun', 'koruny', 'částka', 'castka'])
+            is_budget_set_command = 'nastav_rozpocet' in shoda and 'castka' in shoda
             
-            if is_budget_set_command:
-                # Pokus se extrahovat částku
-                castka_match = re.search(r'(\d+(?:\s*\d+)*(?:[.,]\d+)?)\s*kč', message_text, re.IGNORECASE)
-                if not castka_match:
-                    castka_match = re.search(r'(\d+(?:\s*\d+)*(?:[.,]\d+)?)', message_text)
-                
-                if castka_match:
-                    castka_str = castka_match.group(1).replace(' ', '').replace(',', '.')
-                    try:
-                        castka = float(castka_str)
-                        try:
-                            result = AIExecutor.execute_command("set_project_budget", {
-                                "projekt_id": projekt_id,
-                                "rozpocet": castka
-                            })
-                            execution_results = {"set_budget": result}
-                            
-                            if result.get('success') and result.get('result', {}).get('success'):
-                                success_msg = f"✅ {result['result'].get('message', 'Rozpočet byl nastaven')}"
-                                assistant_response = success_msg + "\n\n" + assistant_response
-                                response['budget_updated'] = True
-                            elif result.get('success') and not result.get('result', {}).get('success'):
-                                error_msg = f"❌ Chyba: {result.get('result', {}).get('error', 'Neznámá chyba')}"
-                                assistant_response = error_msg + "\n\n" + assistant_response
-                        except Exception as e:
-                            assistant_response = f"❌ Chyba při nastavení rozpočtu: {str(e)}\n\n{assistant_response}"
-                    except ValueError:
-                        pass
+            if is_budget_set_command and castka is not None:
+                try:
+                    result = AIExecutor.execute_command("set_project_budget", {
+                        "projekt_id": projekt_id,
+                        "rozpocet": castka
+                    })
+                    execution_results = {"set_budget": result}
+                    
+                    if result.get('success') and result.get('result', {}).get('success'):
+                        success_msg = f"✅ {result['result'].get('message', 'Rozpočet byl nastaven')}"
+                        assistant_response = success_msg + "\n\n" + assistant_response
+                        response['budget_updated'] = True
+                    elif result.get('success') and not result.get('result', {}).get('success'):
+                        error_msg = f"❌ Chyba: {result.get('result', {}).get('error', 'Neznámá chyba')}"
+                        assistant_response = error_msg + "\n\n" + assistant_response
+                except Exception as e:
+                    assistant_response = f"❌ Chyba při nastavení rozpočtu: {str(e)}\n\n{assistant_response}"
             
             # Detekce příkazů pro přidání rozpočtu (zastaralé, ale ponecháno)
-            budget_keywords = ['přidej rozpočet', 'přidej do rozpočtu', 'přidat rozpočet', 'add budget']
-            is_budget_command = any(keyword in message_text.lower() for keyword in budget_keywords) and \
-                              any(word in message_text.lower() for word in ['kč', 'korun', 'koruny', 'částka', 'castka'])
+            budget_keywords = klicova_slova['pridej_rozpocet']
+            is_budget_command = 'pridej_rozpocet' in shoda and 'castka' in shoda
             
-            if is_budget_command and not is_budget_set_command:
-                # Pokus se extrahovat parametry z uživatelovy zprávy
-                # Hledej částku - různé formáty: "5000 Kč", "5 000 Kč", "5000.50 Kč"
-                castka_match = re.search(r'(\d+(?:\s*\d+)*(?:[.,]\d+)?)\s*kč', message_text, re.IGNORECASE)
-                if not castka_match:
-                    castka_match = re.search(r'(\d+(?:\s*\d+)*(?:[.,]\d+)?)', message_text)
-                
+            if is_budget_command and not is_budget_set_command and castka is not None:
                 # Hledej kategorii
                 kategorie_match = re.search(r'(?:kategorii?|kategorie|typ)[:\s]+([^,\n]+)', message_text, re.IGNORECASE)
                 
                 # Hledej popis - může být před nebo po částce
                 popis_match = re.search(r'(?:popis|název|nazev|pro)[:\s]+([^,\n]+)', message_text, re.IGNORECASE)
+                popis = popis_match.group(1).strip() if popis_match else None
                 
-                # Pokud není popis explicitně zadán, zkus ho extrahovat z kontextu
-                if not popis_match:
-                    # Zkus najít text před částkou
-                    if castka_match:
-                        before_amount = message_text[:castka_match.start()].strip()
-                        after_amount = message_text[castka_match.end():].strip()
-                        
-                        # Odstraň klíčová slova
-                        for keyword in budget_keywords:
-                            before_amount = before_amount.replace(keyword, '').strip()
-                        before_amount = re.sub(r'(?:přidej|přidat|do|rozpočtu|rozpočet)', '', before_amount, flags=re.IGNORECASE).strip()
-                        
-                        if before_amount and len(before_amount) > 3:
-                            popis_match = type('obj', (object,), {'group': lambda x: before_amount.split(',')[0].split('.')[0].strip()})()
-                        elif after_amount and len(after_amount) > 3 and 'kč' not in after_amount.lower():
-                            popis_match = type('obj', (object,), {'group': lambda x: after_amount.split(',')[0].split('.')[0].strip()})()
+                # Pokud není popis explicitně zadán, zkus ho extrahovat z textu kolem částky
+                if not popis:
+                    before_amount = pred_castkou
+                    # Odstraň klíčová slova
+                    for keyword in budget_keywords:
+                        before_amount = before_amount.replace(keyword, '').strip()
+                    before_amount = re.sub(r'(?:přidej|přidat|do|rozpočtu|rozpočet)', '', before_amount, flags=re.IGNORECASE).strip()
+                    
+                    if before_amount and len(before_amount) > 3:
+                        popis = before_amount.split(',')[0].split('.')[0].strip()
+                    elif za_castkou and len(za_castkou) > 3 and 'kč' not in za_castkou.lower():
+                        popis = za_castkou.split(',')[0].split('.')[0].strip()
                 
-                if castka_match:
-                    castka_str = castka_match.group(1).replace(' ', '').replace(',', '.')
-                    try:
-                        castka = float(castka_str)
-                        kategorie = kategorie_match.group(1).strip() if kategorie_match else "Ostatní"
-                        popis = popis_match.group(1).strip() if popis_match else f"Rozpočtová položka {castka} Kč"
-                        
-                        try:
-                            result = AIExecutor.execute_command("add_project_budget", {
-                                "projekt_id": projekt_id,
-                                "kategorie": kategorie,
-                                "popis": popis,
-                                "castka": castka
-                            })
-                            execution_results = {"add_budget": result}
-                            
-                            # Pokud bylo úspěšné, uprav odpověď
-                            if result.get('success') and result.get('result', {}).get('success'):
-                                assistant_response = f"✅ {result['result'].get('message', 'Rozpočtová položka byla přidána')}\n\n{assistant_response}"
-                            elif result.get('success') and not result.get('result', {}).get('success'):
-                                assistant_response = f"❌ Chyba: {result.get('result', {}).get('error', 'Neznámá chyba')}\n\n{assistant_response}"
-                        except Exception as e:
-                            assistant_response = f"❌ Chyba při přidávání rozpočtu: {str(e)}\n\n{assistant_response}"
-                    except ValueError:
-                        pass  # Neplatná částka
+                kategorie = kategorie_match.group(1).strip() if kategorie_match else "Ostatní"
+                popis = popis or f"Rozpočtová položka {castka} Kč"
+                
+                try:
+                    result = AIExecutor.execute_command("add_project_budget", {
+                        "projekt_id": projekt_id,
+                        "kategorie": kategorie,
+                        "popis": popis,
+                        "castka": castka
+                    })
+                    execution_results = {"add_budget": result}
+                    
+                    # Pokud bylo úspěšné, uprav odpověď
+                    if result.get('success') and result.get('result', {}).get('success'):
+                        assistant_response = f"✅ {result['result'].get('message', 'Rozpočtová položka byla přidána')}\n\n{assistant_response}"
+                    elif result.get('success') and not result.get('result', {}).get('success'):
+                        assistant_response = f"❌ Chyba: {result.get('result', {}).get('error', 'Neznámá chyba')}\n\n{assistant_response}"
+                except Exception as e:
+                    assistant_response = f"❌ Chyba při přidávání rozpočtu: {str(e)}\n\n{assistant_response}"
             
             # Detekce příkazů pro přidání výdaje - rozšířená detekce
-            expense_keywords = ['přidej výdaj', 'přidej výdaje', 'přidat výdaj', 'add expense', 
-                              'výdaj', 'vydaj', 'utratil', 'zaplatil', 'zaplaceno', 'zaplatit']
-            is_expense_command = any(keyword in message_text.lower() for keyword in expense_keywords) and \
-                               any(word in message_text.lower() for word in ['kč', 'korun', 'koruny', 'částka', 'castka'])
+            expense_keywords = klicova_slova['vydaj']
+            is_expense_command = 'vydaj' in shoda and 'castka' in shoda
             
             # Detekce příkazů pro úpravu výdaje
-            expense_edit_keywords = ['uprav výdaj', 'upravit výdaj', 'změň výdaj', 'zmen výdaj', 'edit expense']
-            is_expense_edit_command = any(keyword in message_text.lower() for keyword in expense_edit_keywords)
+            is_expense_edit_command = 'uprav_vydaj' in shoda
             
             # Detekce příkazů pro smazání výdaje
-            expense_delete_keywords = ['smaž výdaj', 'smazat výdaj', 'odstraň výdaj', 'odstran výdaj', 'delete expense']
-            is_expense_delete_command = any(keyword in message_text.lower() for keyword in expense_delete_keywords)
+            is_expense_delete_command = 'smaz_vydaj' in shoda
             
             if is_expense_command and not is_budget_command and not is_budget_set_command:
-                # Hledej částku
-                castka_match = re.search(r'(\d+(?:\s*\d+)*(?:[.,]\d+)?)\s*kč', message_text, re.IGNORECASE)
-                if not castka_match:
-                    castka_match = re.search(r'(\d+(?:\s*\d+)*(?:[.,]\d+)?)', message_text)
-                
                 # Hledej popis
                 popis_match = re.search(r'(?:za|popis|název|nazev|pro|zaplatil|utratil)[:\s]+([^,\n]+)', message_text, re.IGNORECASE)
+                popis = popis_match.group(1).strip() if popis_match else None
                 
-                if not popis_match:
-                    # Zkus najít popis z kontextu
-                    if castka_match:
-                        before_amount = message_text[:castka_match.start()].strip()
-                        after_amount = message_text[castka_match.end():].strip()
-                        
-                        # Odstraň klíčová slova
-                        for keyword in expense_keywords:
-                            before_amount = before_amount.replace(keyword, '').strip()
-                        before_amount = re.sub(r'(?:přidej|přidat|výdaj|vydaj)', '', before_amount, flags=re.IGNORECASE).strip()
-                        
-                        if before_amount and len(before_amount) > 3:
-                            popis_match = type('obj', (object,), {'group': lambda x: before_amount.split(',')[0].split('.')[0].strip()})()
-                        elif after_amount and len(after_amount) > 3 and 'kč' not in after_amount.lower():
-                            popis_match = type('obj', (object,), {'group': lambda x: after_amount.split(',')[0].split('.')[0].strip()})()
+                if not popis:
+                    # Zkus najít popis z textu kolem částky
+                    before_amount = pred_castkou
+                    # Odstraň klíčová slova
+                    for keyword in expense_keywords:
+                        before_amount = before_amount.replace(keyword, '').strip()
+                    before_amount = re.sub(r'(?:přidej|přidat|výdaj|vydaj)', '', before_amount, flags=re.IGNORECASE).strip()
+                    
+                    if before_amount and len(before_amount) > 3:
+                        popis = before_amount.split(',')[0].split('.')[0].strip()
+                    elif za_castkou and len(za_castkou) > 3 and 'kč' not in za_castkou.lower():
+                        popis = za_castkou.split(',')[0].split('.')[0].strip()
                 
-                if castka_match:
-                    castka_str = castka_match.group(1).replace(' ', '').replace(',', '.')
+                if castka is not None:
+                    popis = popis or f"Výdaj {castka} Kč"
+                    
                     try:
-                        castka = float(castka_str)
-                        popis = popis_match.group(1).strip() if popis_match else f"Výdaj {castka} Kč"
+                        result = AIExecutor.execute_command("add_project_expense", {
+                            "projekt_id": projekt_id,
+                            "popis": popis,
+                            "castka": castka
+                        })
+                        execution_results = {"add_expense": result}
                         
-                        try:
-                            result = AIExecutor.execute_command("add_project_expense", {
-                                "projekt_id": projekt_id,
-                                "popis": popis,
-                                "castka": castka
-                            })
-                            execution_results = {"add_expense": result}
-                            
-                            # Pokud bylo úspěšné, uprav odpověď
-                            if result.get('success') and result.get('result', {}).get('success'):
-                                success_msg = f"✅ {result['result'].get('message', 'Výdaj byl přidán')}"
-                                if result['result'].get('warning'):
-                                    success_msg += f"\n⚠️ {result['result']['warning']}"
-                                # Přidej úspěšnou zprávu PŘED odpověď AI (ne duplikuj)
-                                assistant_response = success_msg + "\n\n" + assistant_response
-                                # Označ, že byl přidán výdaj (pro reload stránky)
-                                response['expense_added'] = True
-                            elif result.get('success') and not result.get('result', {}).get('success'):
-                                error_msg = f"❌ Chyba: {result.get('result', {}).get('error', 'Neznámá chyba')}"
-                                assistant_response = error_msg + "\n\n" + assistant_response
-                        except Exception as e:
-                            assistant_response = f"❌ Chyba při přidávání výdaje: {str(e)}\n\n{assistant_response}"
-                    except ValueError:
-                        pass  # Neplatná částka
+                        # Pokud bylo úspěšné, uprav odpověď
+                        if result.get('success') and result.get('result', {}).get('success'):
+                            success_msg = f"✅ {result['result'].get('message', 'Výdaj byl přidán')}"
+                            if result['result'].get('warning'):
+                                success_msg += f"\n⚠️ {result['result']['warning']}"
+                            # Přidej úspěšnou zprávu PŘED odpověď AI (ne duplikuj)
+                            assistant_response = success_msg + "\n\n" + assistant_response
+                            # Označ, že byl přidán výdaj (pro reload stránky)
+                            response['expense_added'] = True
+                        elif result.get('success') and not result.get('result', {}).get('success'):
+                            error_msg = f"❌ Chyba: {result.get('result', {}).get('error', 'Neznámá chyba')}"
+                            assistant_response = error_msg + "\n\n" + assistant_response
+                    except Exception as e:
+                        assistant_response = f"❌ Chyba při přidávání výdaje: {str(e)}\n\n{assistant_response}"
             
             # Detekce příkazů pro úpravu výdaje
             elif is_expense_edit_command:
@@ -1106,13 +1071,9 @@ Odpovídej stručně česky."""
                     # Zkus extrahovat parametry pro úpravu
                     update_params = {"vydaj_id": vydaj_id}
                     
-                    castka_match = re.search(r'(\d+(?:\s*\d+)*(?:[.,]\d+)?)\s*kč', message_text, re.IGNORECASE)
-                    if castka_match:
-                        castka_str = castka_match.group(1).replace(' ', '').replace(',', '.')
-                        try:
-                            update_params["castka"] = float(castka_str)
-                        except:
-                            pass
+                    # Jen částka s měnou - samotné číslo je ID výdaje
+                    if shoda.parametry['castky']:
+                        update_params["castka"] = shoda.parametry['castky'][0]
                     
                     popis_match = re.search(r'popis[:\s]+([^,\n]+)', message_text, re.IGNORECASE)
                     if popis_match:
@@ -1192,7 +1153,7 @@ Odpovídej stručně česky."""
                     'error': response['error'],
                     'assistant_message': f"Chyba: {response['error']}",
                     'tokens_used': 0
-                }), 500
+                }), (429 if response.get('limit_tokenu') else 500)
             
             # Připravit response s informací o změnách
             json_response = {
@@ -1241,9 +1202,22 @@ Odpovídej stručně česky."""
         session = AISession.query.get_or_404(session_id)
         user = session.employee
         
+        # "async": true - zpráva se zpracuje na pozadí, klient si výsledek vyzvedne
+        # na /ai/api/jobs/<job_id> (s ?wait=N počká na dokončení)
+        if data.get('async'):
+            try:
+                job_id = job_queue.zarad(session_id, user.id, message_text, bez_cache)
+            except QueueFullError as e:
+                return jsonify({'error': str(e)}), 503
+            return jsonify({
+                'job_id': job_id,
+                'stav': 'cekajici',
+                'status_url': url_for('ai_assistant.api_job_status', job_id=job_id)
+            }), 202
+        
         try:
             service = AIAssistantService()
-            assistant_response, tokens = service.send_message(user.id, session_id, message_text)
+            assistant_response, tokens = service.send_message(user.id, session_id, message_text, bez_cache)
             
             # Ulož zprávy
             service.save_message_pair(session_id, message_text, assistant_response, tokens)
@@ -1252,6 +1226,8 @@ Odpovídej stručně česky."""
                 'assistant_message': assistant_response,
                 'tokens_used': tokens
             })
+        except TokenBudgetExceeded as e:
+            return jsonify({'error': str(e)}), 429
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -1259,6 +1235,76 @@ Odpovídej stručně česky."""
         return jsonify({'error': 'Projekt ID nebo Session ID chybí'}), 400
 
 
+@ai_bp.route('/send-message/stream', methods=['POST'])
+def send_message_stream():
+    """
+    Odeslání zprávy AI se streamovanou odpovědí (server-sent events)
+    
+    Události: 'start', 'delta' ({"text": ...}) pro každý přírůstek odpovědi,
+    'done' ({"tokens_used": ...}) po uložení zpráv, nebo 'error' ({"error": ...}).
+    """
+    from flask import Response, stream_with_context
+    
+    data = request.get_json() or {}
+    message_text = data.get('message', '').strip()
+    session_id = data.get('session_id')
+    bez_cache = bool(data.get('no_cache'))
+    
+    if not message_text:
+        return jsonify({'error': 'Zpráva je prázdná'}), 400
+    if not session_id:
+        return jsonify({'error': 'Session ID chybí'}), 400
+    
+    session = AISession.query.get_or_404(session_id)
+    employee_id = session.employee_id
+    
+    def sse(udalost: str, obsah: Dict) -> str:
+        return f"event: {udalost}\ndata: {json.dumps(obsah, ensure_ascii=False)}\n\n"
+    
+    def generuj():
+        # Hlavičky odejdou hned - prohlížeč ví, že se odpověď připravuje
+        yield sse('start', {'session_id': session_id})
+        
+        casti = []
+        ulozeno = False
+        proud = None
+        try:
+            service = AIAssistantService()
+            proud = service.stream_message(employee_id, session_id, message_text, bez_cache)
+            for typ, hodnota in proud:
+                if typ == 'text':
+                    casti.append(hodnota)
+                    yield sse('delta', {'text': hodnota})
+                else:
+                    odpoved, tokens = hodnota
+                    service.save_message_pair(session_id, message_text, odpoved, tokens)
+                    ulozeno = True
+                    yield sse('done', {'tokens_used': tokens})
+        except GeneratorExit:
+            # Prohlížeč se odpojil - ulož, co stihlo dorazit, ať historie relace zůstane souvislá
+            if not ulozeno and casti:
+                try:
+                    service.save_message_pair(
+                        session_id, message_text, ''.join(casti) + "\n\n(odpověď přerušena)", None
+                    )
+                except Exception:
+                    db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            yield sse('error', {'error': str(e)})
+        finally:
+            # Zavře i spojení s API, pokud stream ještě běží
+            if proud is not None:
+                proud.close()
+    
+    return Response(
+        stream_with_context(generuj()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @ai_bp.route('/knowledge-base', methods=['GET', 'POST'])
 def knowledge_base():
     """Správa znalostní databáze - pro administraci"""
@@ -1302,8 +1348,45 @@ def api_session_messages(session_id: int):
     return jsonify([msg.to_dict() for msg in messages])
 
 
+@ai_bp.route('/api/session/<int:session_id>/tokens', methods=['GET'])
+def api_session_tokens(session_id: int):
+    """Vrátí spotřebu tokenů relace a odhad úspory díky oknu historie"""
+    result = ConversationWindow.get_uspora(session_id)
+    return jsonify(result), (200 if result['success'] else 404)
+
+
 @ai_bp.route('/api/knowledge', methods=['GET'])
 def api_knowledge():
     """Vrátí všechny znalostní záznamy"""
     entries = KnowledgeEntry.query.filter_by(is_public=True).all()
     return jsonify([e.to_dict() for e in entries])
+
+
+@ai_bp.route('/api/context-cache-stats', methods=['GET'])
+def api_context_cache_stats():
+    """Vrátí počítadla cache kontextu system promptu"""
+    return jsonify(prompt_context_cache.stats())
+
+
+@ai_bp.route('/api/response-cache-stats', methods=['GET'])
+def api_response_cache_stats():
+    """Vrátí počítadla cache odpovědí na čtecí dotazy"""
+    return jsonify(response_cache.stats())
+
+
+@ai_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def api_job_status(job_id):
+    """
+    Stav úlohy z fronty zpráv; s ?wait=N (max 25 s) počká na její dokončení
+    """
+    cekani = min(request.args.get('wait', 0, type=float), 25.0)
+    if cekani > 0:
+        job_queue.cekej(job_id, cekani)
+    job = AIJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+
+@ai_bp.route('/api/jobs/stats', methods=['GET'])
+def api_job_stats():
+    """Vrátí hloubku fronty zpráv, doby čekání a počítadla úloh"""
+    return jsonify(job_queue.stats())
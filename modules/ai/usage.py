@@ -0,0 +1,248 @@
+"""
+AI Usage - Evidence spotřeby tokenů a denní limity
+
+Každé volání Claude API (chat relace, streamovaný chat i chat v projektu)
+se zapíše do tabulky ai_usage: vstupní a výstupní tokeny, latence a model.
+Zároveň se přičte do denních souhrnů (ai_usage_daily) - celkem a po
+zaměstnanci, relaci a projektu. Report i kontrola limitů čtou jen souhrny,
+takže kontrola před voláním API stojí jeden dotaz na unikátní index.
+
+Limity jsou denní a dvoustupňové (0 = bez limitu):
+- měkký: požadavek se zmenší (kratší okno historie, nižší max_tokens)
+- tvrdý: volání se odmítne výjimkou TokenBudgetExceeded
+Odpovědi z response_cache API nevolají, a tak se nezapočítávají ani neomezují.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from core import db
+from .models import AIUsage, AIUsageDaily, Employee, AISession
+
+# Rozměry s limity - (rozměr v ai_usage_daily, název v hlášení)
+ROZMERY = (
+    ('zamestnanec', 'zaměstnanec'),
+    ('relace', 'relace'),
+    ('projekt', 'projekt'),
+)
+
+# Výsledek kontroly limitů
+LIMIT_OK = 'ok'
+LIMIT_MEKKY = 'mekky'
+
+
+def _tisice(cislo: int) -> str:
+    return f"{cislo:,}".replace(',', ' ')
+
+
+class TokenBudgetExceeded(Exception):
+    """Tvrdý denní limit tokenů je vyčerpán - volání API se neprovede"""
+
+
+class UsageLedger:
+    """Evidence volání API, denní souhrny a kontrola limitů"""
+    
+    def __init__(self):
+        # rozměr -> (měkký limit, tvrdý limit) tokenů za den
+        self.limity: Dict[str, tuple] = {rozmer: (0, 0) for rozmer, _ in ROZMERY}
+    
+    def init_app(self, app):
+        """Načte denní limity z konfigurace aplikace"""
+        app.extensions['ai_usage_ledger'] = self
+        self.limity = {
+            'zamestnanec': (app.config.get('AI_TOKEN_BUDGET_EMPLOYEE_SOFT', 0),
+                            app.config.get('AI_TOKEN_BUDGET_EMPLOYEE_HARD', 0)),
+            'relace': (app.config.get('AI_TOKEN_BUDGET_SESSION_SOFT', 0),
+                       app.config.get('AI_TOKEN_BUDGET_SESSION_HARD', 0)),
+            'projekt': (app.config.get('AI_TOKEN_BUDGET_PROJECT_SOFT', 0),
+                        app.config.get('AI_TOKEN_BUDGET_PROJECT_HARD', 0)),
+        }
+    
+    # ------------------------------------------------------------------------
+    # Limity
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def spotreba_dne(rozmer: str, klic: int) -> int:
+        """Dnešní spotřeba tokenů (vstup + výstup) pro zaměstnance/relaci/projekt"""
+        souhrn = AIUsageDaily.query.filter_by(
+            den=datetime.utcnow().date(), rozmer=rozmer, klic=klic
+        ).first()
+        return (souhrn.input_tokens + souhrn.output_tokens) if souhrn else 0
+    
+    def kontrola(self, employee_id: Optional[int] = None, session_id: Optional[int] = None,
+                 projekt_id: Optional[int] = None) -> str:
+        """
+        Zkontroluje denní limity před voláním API
+        
+        Returns:
+            str: LIMIT_OK, nebo LIMIT_MEKKY (požadavek se má zmenšit)
+        
+        Raises:
+            TokenBudgetExceeded: některý tvrdý limit je vyčerpán
+        """
+        vysledek = LIMIT_OK
+        klice = {'zamestnanec': employee_id, 'relace': session_id, 'projekt': projekt_id}
+        for rozmer, nazev in ROZMERY:
+            mekky, tvrdy = self.limity[rozmer]
+            klic = klice[rozmer]
+            if klic is None or not (mekky or tvrdy):
+                continue
+            
+            spotreba = self.spotreba_dne(rozmer, klic)
+            if tvrdy and spotreba >= tvrdy:
+                raise TokenBudgetExceeded(
+                    f"Denní limit tokenů ({nazev}) je vyčerpán: {_tisice(spotreba)} z {_tisice(tvrdy)}. "
+                    f"Zkus to zítra nebo požádej správce o navýšení limitu."
+                )
+            if mekky and spotreba >= mekky:
+                vysledek = LIMIT_MEKKY
+        return vysledek
+    
+    # ------------------------------------------------------------------------
+    # Zápis
+    # ------------------------------------------------------------------------
+    
+    def zapis(self, kanal: str, model: str, usage: Dict, latence_ms: float,
+              employee_id: Optional[int] = None, session_id: Optional[int] = None,
+              projekt_id: Optional[int] = None):
+        """
+        Zapíše volání API a přičte ho do denních souhrnů
+        
+        Chyba zápisu se jen vypíše - evidence nesmí shodit odpověď uživateli.
+        """
+        zaznam = {
+            'kanal': kanal,
+            'model': model,
+            'employee_id': employee_id,
+            'session_id': session_id,
+            'projekt_id': projekt_id,
+            'input_tokens': (usage or {}).get('input_tokens', 0) or 0,
+            'output_tokens': (usage or {}).get('output_tokens', 0) or 0,
+            'latence_ms': int(latence_ms),
+        }
+        # Souběžný první zápis dne vloží stejný souhrn dvakrát - druhý pokus už jen přičítá
+        for _ in range(2):
+            try:
+                self._zapis(zaznam)
+                return
+            except IntegrityError:
+                db.session.rollback()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Chyba při zápisu spotřeby tokenů: {e}")
+                return
+    
+    @staticmethod
+    def _zapis(zaznam: Dict):
+        db.session.add(AIUsage(**zaznam))
+        
+        den = datetime.utcnow().date()
+        klice = [('celkem', 0), ('zamestnanec', zaznam['employee_id']),
+                 ('relace', zaznam['session_id']), ('projekt', zaznam['projekt_id'])]
+        for rozmer, klic in klice:
+            if klic is None:
+                continue
+            # Přičtení v SQL (UPDATE ... SET x = x + n) - bez čtení souhrnu a bez ztráty souběžných zápisů
+            upraveno = AIUsageDaily.query.filter_by(den=den, rozmer=rozmer, klic=klic).update({
+                AIUsageDaily.volani: AIUsageDaily.volani + 1,
+                AIUsageDaily.input_tokens: AIUsageDaily.input_tokens + zaznam['input_tokens'],
+                AIUsageDaily.output_tokens: AIUsageDaily.output_tokens + zaznam['output_tokens'],
+                AIUsageDaily.latence_ms: AIUsageDaily.latence_ms + zaznam['latence_ms'],
+            }, synchronize_session=False)
+            if not upraveno:
+                db.session.add(AIUsageDaily(
+                    den=den, rozmer=rozmer, klic=klic, volani=1,
+                    input_tokens=zaznam['input_tokens'],
+                    output_tokens=zaznam['output_tokens'],
+                    latence_ms=zaznam['latence_ms']
+                ))
+        db.session.commit()
+    
+    # ------------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------------
+    
+    def report(self, dny: int = 30, top: int = 20) -> Dict:
+        """
+        Spotřeba tokenů za posledních `dny` dní - po dnech, zaměstnancích,
+        relacích, projektech a modelech, spolu s nastavenými limity
+        """
+        od = datetime.utcnow().date() - timedelta(days=dny - 1)
+        tokeny = AIUsageDaily.input_tokens + AIUsageDaily.output_tokens
+        
+        def radek(klic, volani, vstup, vystup, latence) -> Dict:
+            return {
+                'klic': klic,
+                'volani': volani,
+                'input_tokens': vstup,
+                'output_tokens': vystup,
+                'tokens': vstup + vystup,
+                'latence_prumer_ms': (latence / volani) if volani else 0.0
+            }
+        
+        dny_radky = AIUsageDaily.query.with_entities(
+            AIUsageDaily.den, AIUsageDaily.volani, AIUsageDaily.input_tokens,
+            AIUsageDaily.output_tokens, AIUsageDaily.latence_ms
+        ).filter(AIUsageDaily.rozmer == 'celkem', AIUsageDaily.den >= od) \
+            .order_by(AIUsageDaily.den.desc()).all()
+        po_dnech = [radek(*r) for r in dny_radky]
+        for d in po_dnech:
+            d['den'] = d.pop('klic').isoformat()
+        
+        def nejvetsi(rozmer: str):
+            return [radek(*r) for r in db.session.query(
+                AIUsageDaily.klic,
+                func.sum(AIUsageDaily.volani),
+                func.sum(AIUsageDaily.input_tokens),
+                func.sum(AIUsageDaily.output_tokens),
+                func.sum(AIUsageDaily.latence_ms)
+            ).filter(AIUsageDaily.rozmer == rozmer, AIUsageDaily.den >= od) \
+                .group_by(AIUsageDaily.klic).order_by(func.sum(tokeny).desc()).limit(top).all()]
+        
+        zamestnanci = nejvetsi('zamestnanec')
+        relace = nejvetsi('relace')
+        projekty = nejvetsi('projekt')
+        
+        # Názvy jedním dotazem na rozměr
+        from ..projects.models import Projekt
+        for radky, model, sloupec in ((zamestnanci, Employee, Employee.name),
+                                      (relace, AISession, AISession.title),
+                                      (projekty, Projekt, Projekt.nazev)):
+            if radky:
+                nazvy = dict(db.session.query(model.id, sloupec)
+                             .filter(model.id.in_([r['klic'] for r in radky])).all())
+                for r in radky:
+                    r['nazev'] = nazvy.get(r['klic'], f"#{r['klic']} (smazáno)")
+        
+        modely = [
+            {'model': r[0], 'volani': r[1], 'tokens': (r[2] or 0) + (r[3] or 0)}
+            for r in db.session.query(
+                AIUsage.model, func.count(AIUsage.id),
+                func.sum(AIUsage.input_tokens), func.sum(AIUsage.output_tokens)
+            ).filter(AIUsage.created_at >= datetime.combine(od, datetime.min.time())) \
+                .group_by(AIUsage.model).all()
+        ]
+        
+        return {
+            'od': od.isoformat(),
+            'dny': dny,
+            'celkem': {
+                'volani': sum(d['volani'] for d in po_dnech),
+                'tokens': sum(d['tokens'] for d in po_dnech),
+            },
+            'po_dnech': po_dnech,
+            'zamestnanci': zamestnanci,
+            'relace': relace,
+            'projekty': projekty,
+            'modely': modely,
+            'limity': {rozmer: {'mekky': mekky, 'tvrdy': tvrdy}
+                       for rozmer, (mekky, tvrdy) in self.limity.items()}
+        }
+
+
+# Sdílená instance - konfiguruje se v app.py
+usage_ledger = UsageLedger()
@@ -8,7 +8,9 @@ from decimal import Decimal
 from typing import Dict, List, Optional
 from collections import defaultdict
 from core import db
-from .models import Budget, BudgetCategory, BudgetSubCategory, BudgetItem, Expense, Revenue, MonthlyBudgetItem
+from core.event_log import event_log
+from .models import Budget, BudgetCategory, BudgetSubCategory, BudgetItem, Expense, Revenue, MonthlyBudgetItem, BudgetItemTotal, RevenueSchedule
+from .totals import budget_totals
 
 
 class BudgetExecutor:
@@ -21,34 +23,19 @@ class BudgetExecutor:
     @staticmethod
     def get_or_create_main_budget(rok: int = None) -> Budget:
         """Vrátí hlavní rozpočet nebo ho vytvoří"""
-        import json
-        from datetime import datetime as dt
-        
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:22","message":"get_or_create_main_budget called","data":{"rok":rok},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "get_or_create_main_budget called", {"rok":rok})
         
         if rok is None:
             rok = datetime.utcnow().year
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:28","message":"Before Budget.query","data":{"rok":rok},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Before Budget.query", {"rok":rok})
         
         hlavni = Budget.query.filter_by(hlavni=True, aktivni=True).first()
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:30","message":"After Budget.query","data":{"found":hlavni is not None,"id":hlavni.id if hlavni else None},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "After Budget.query", {"found":hlavni is not None,"id":hlavni.id if hlavni else None})
         
         if not hlavni:
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:33","message":"Creating new budget","data":{"rok":rok},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.debug('budget', "Creating new budget", {"rok":rok})
             
             hlavni = Budget(
                 nazev=f"Rozpočet {rok}",
@@ -58,36 +45,21 @@ class BudgetExecutor:
             )
             db.session.add(hlavni)
             
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:43","message":"Before db.commit","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.debug('budget', "Before db.commit")
             
             db.session.commit()
             
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:46","message":"After db.commit, before _create_default_categories","data":{"budget_id":hlavni.id},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.debug('budget', "After db.commit, before _create_default_categories", {"budget_id":hlavni.id})
             
             # Vytvoř základní kategorie
             try:
                 BudgetExecutor._create_default_categories(hlavni.id)
-                # #region agent log
-                with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:51","message":"_create_default_categories completed","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-                # #endregion
+                event_log.debug('budget', "_create_default_categories completed")
             except Exception as e:
-                # #region agent log
-                with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:54","message":"_create_default_categories failed","data":{"error":str(e)},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-                # #endregion
+                event_log.error('budget', "_create_default_categories failed", {"error":str(e)})
                 raise
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/executor.py:58","message":"get_or_create_main_budget returning","data":{"budget_id":hlavni.id,"nazev":hlavni.nazev},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "get_or_create_main_budget returning", {"budget_id":hlavni.id,"nazev":hlavni.nazev})
         
         return hlavni
     
@@ -268,6 +240,7 @@ class BudgetExecutor:
             )
             
             db.session.add(expense)
+            BudgetExecutor.prepocitat_souhrn_polozky(budget_item_id, datum.month, datum.year)
             db.session.commit()
             
             return {
@@ -279,87 +252,288 @@ class BudgetExecutor:
             db.session.rollback()
             return {"success": False, "error": str(e)}
     
+    # ========================================================================
+    # SOUHRNY POLOŽEK (BudgetItemTotal)
+    # ========================================================================
+    
+    @staticmethod
+    def prepocitat_souhrn_polozky(budget_item_id: int, mesic: int, rok: int) -> BudgetItemTotal:
+        """
+        Přepočítá souhrn položky za jeden měsíc z výdajů a měsíčních stavů.
+        Necommituje - volá se uvnitř transakce, která zdroje změnila.
+        """
+        return BudgetExecutor.prepocitat_souhrny_mesice([budget_item_id], mesic, rok)[budget_item_id]
+    
+    @staticmethod
+    def prepocitat_souhrny_mesice(budget_item_ids: List[int], mesic: int, rok: int) -> Dict[int, BudgetItemTotal]:
+        """
+        Přepočítá souhrny více položek za jeden měsíc třemi dotazy (bez ohledu na počet položek).
+        Necommituje - volá se uvnitř transakce, která zdroje změnila.
+        """
+        from sqlalchemy import func
+        
+        budget_item_ids = list(set(budget_item_ids))
+        if not budget_item_ids:
+            return {}
+        
+        do_data = datetime(rok + 1, 1, 1) if mesic == 12 else datetime(rok, mesic + 1, 1)
+        vydaje = dict(db.session.query(Expense.budget_item_id, func.sum(Expense.castka)).filter(
+            Expense.budget_item_id.in_(budget_item_ids),
+            Expense.datum >= datetime(rok, mesic, 1),
+            Expense.datum < do_data
+        ).group_by(Expense.budget_item_id).all())
+        
+        stavy = defaultdict(list)
+        for stav in MonthlyBudgetItem.query.filter(
+            MonthlyBudgetItem.budget_item_id.in_(budget_item_ids),
+            MonthlyBudgetItem.mesic == mesic,
+            MonthlyBudgetItem.rok == rok
+        ).order_by(MonthlyBudgetItem.id):
+            stavy[stav.budget_item_id].append(stav)
+        
+        souhrny = {
+            s.budget_item_id: s
+            for s in BudgetItemTotal.query.filter(
+                BudgetItemTotal.budget_item_id.in_(budget_item_ids),
+                BudgetItemTotal.mesic == mesic,
+                BudgetItemTotal.rok == rok
+            )
+        }
+        
+        for polozka_id in budget_item_ids:
+            souhrn = souhrny.get(polozka_id)
+            if not souhrn:
+                souhrn = BudgetItemTotal(budget_item_id=polozka_id, mesic=mesic, rok=rok)
+                db.session.add(souhrn)
+                souhrny[polozka_id] = souhrn
+            
+            stavy_polozky = stavy.get(polozka_id, [])
+            souhrn.vydaje = vydaje.get(polozka_id) or Decimal('0')
+            souhrn.ma_mesicni_stav = bool(stavy_polozky)
+            souhrn.aktualni_stav = stavy_polozky[0].aktualni_stav if stavy_polozky else None
+            souhrn.souhrnne_vydaje = sum((s.souhrnne_vydaje or Decimal('0') for s in stavy_polozky), Decimal('0'))
+            souhrn.datum_prepoctu = datetime.utcnow()
+        
+        return souhrny
+    
+    @staticmethod
+    def prebudovat_souhrny() -> Dict:
+        """Znovu sestaví celou tabulku souhrnů ze zdrojových dat (pro existující databáze)"""
+        from sqlalchemy import func
+        
+        try:
+            BudgetItemTotal.query.delete()
+            
+            souhrny = {}  # (polozka_id, rok, mesic) -> BudgetItemTotal
+            
+            def ziskej(polozka_id, rok, mesic):
+                klic = (polozka_id, int(rok), int(mesic))
+                if klic not in souhrny:
+                    souhrny[klic] = BudgetItemTotal(
+                        budget_item_id=klic[0], rok=klic[1], mesic=klic[2],
+                        vydaje=Decimal('0'), ma_mesicni_stav=False,
+                        aktualni_stav=None, souhrnne_vydaje=Decimal('0')
+                    )
+                return souhrny[klic]
+            
+            # Uložené rok/mesic výdaje (nastavené z data) - bez extract() nad každým řádkem
+            for polozka_id, rok, mesic, soucet in db.session.query(
+                Expense.budget_item_id, Expense.rok, Expense.mesic, func.sum(Expense.castka)
+            ).group_by(Expense.budget_item_id, Expense.rok, Expense.mesic):
+                ziskej(polozka_id, rok, mesic).vydaje = soucet or Decimal('0')
+            
+            for stav in MonthlyBudgetItem.query.order_by(MonthlyBudgetItem.id):
+                souhrn = ziskej(stav.budget_item_id, stav.rok, stav.mesic)
+                if not souhrn.ma_mesicni_stav:
+                    # Při duplicitách platí první záznam
+                    souhrn.aktualni_stav = stav.aktualni_stav
+                souhrn.ma_mesicni_stav = True
+                souhrn.souhrnne_vydaje += stav.souhrnne_vydaje or Decimal('0')
+            
+            db.session.add_all(souhrny.values())
+            db.session.commit()
+            return {"success": True, "message": f"Přepočítáno {len(souhrny)} souhrnů položek"}
+        except Exception as e:
+            db.session.rollback()
+            return {"success": False, "error": str(e)}
+    
+    # ========================================================================
+    # ROZPIS VÝNOSŮ (RevenueSchedule)
+    # ========================================================================
+    
+    @staticmethod
+    def _mesice_vynosu(revenue: Revenue) -> List[int]:
+        """Měsíce, do kterých výnos patří - každý jen jednou"""
+        return sorted(m for m in set(revenue.get_planned_months()) if 1 <= m <= 12)
+    
+    @staticmethod
+    def prepocitat_rozpis_vynosu(revenue: Revenue) -> List[RevenueSchedule]:
+        """
+        Přepočítá rozpis výnosu do měsíců (typ, měsíce, rok, částka, příznaky).
+        Volá se po vytvoření i úpravě výnosu. Necommituje.
+        """
+        mesice = BudgetExecutor._mesice_vynosu(revenue) if revenue.rok else []
+        
+        # Stávající řádky se upraví na místě - smazání a vložení stejného klíče
+        # v jednom flushi by narazilo na unikátní omezení
+        stavajici = {}
+        for radek in list(revenue.rozpis):
+            if radek.rok == revenue.rok and radek.mesic in mesice:
+                stavajici[radek.mesic] = radek
+            else:
+                revenue.rozpis.remove(radek)
+        
+        for mesic in mesice:
+            radek = stavajici.get(mesic)
+            if radek is None:
+                radek = RevenueSchedule(rok=revenue.rok, mesic=mesic)
+                revenue.rozpis.append(radek)
+            radek.castka = revenue.castka
+            radek.naplanovano = bool(revenue.naplanovano)
+            radek.skutecne_prijato = bool(revenue.skutecne_prijato)
+        
+        return revenue.rozpis
+    
+    @staticmethod
+    def prebudovat_rozpis_vynosu() -> Dict:
+        """Znovu sestaví celý rozpis výnosů ze zdrojových dat (pro existující databáze)"""
+        try:
+            RevenueSchedule.query.delete()
+            
+            radky = [
+                RevenueSchedule(
+                    revenue_id=r.id, rok=r.rok, mesic=mesic, castka=r.castka,
+                    naplanovano=bool(r.naplanovano), skutecne_prijato=bool(r.skutecne_prijato)
+                )
+                for r in Revenue.query.filter(Revenue.rok.isnot(None)).all()
+                for mesic in BudgetExecutor._mesice_vynosu(r)
+            ]
+            
+            db.session.add_all(radky)
+            db.session.commit()
+            return {"success": True, "message": f"Rozepsáno {len(radky)} měsíců výnosů"}
+        except Exception as e:
+            db.session.rollback()
+            return {"success": False, "error": str(e)}
+    
+    @staticmethod
+    def _vynosy_po_mesicich(budget_id: int, rok: int) -> Dict[int, Dict[str, float]]:
+        """
+        Naplánované a skutečně přijaté výnosy po měsících - jeden GROUP BY nad rozpisem
+        
+        Returns:
+            dict: {mesic: {'planovano': ..., 'skutecne': ...}}
+        """
+        from sqlalchemy import case, func
+        
+        radky = db.session.query(
+            RevenueSchedule.mesic,
+            func.sum(case((RevenueSchedule.naplanovano == True, RevenueSchedule.castka), else_=0)),
+            func.sum(case((RevenueSchedule.skutecne_prijato == True, RevenueSchedule.castka), else_=0))
+        ).join(
+            Revenue, RevenueSchedule.revenue_id == Revenue.id
+        ).filter(
+            Revenue.budget_id == budget_id,
+            RevenueSchedule.rok == rok
+        ).group_by(RevenueSchedule.mesic).all()
+        
+        return {
+            mesic: {'planovano': float(planovano or 0), 'skutecne': float(skutecne or 0)}
+            for mesic, planovano, skutecne in radky
+        }
+    
     # ========================================================================
     # STATISTIKY A PŘEHLEDY
     # ========================================================================
     
     @staticmethod
     def get_budget_overview(budget_id: int) -> Dict:
-        """Vrátí přehled rozpočtu"""
-        import json
-        from datetime import datetime as dt
+        """
+        Vrátí přehled rozpočtu - kategorie s podkategoriemi a výdaji, mzdové náklady
+        
+        Pevný počet dotazů nezávislý na počtu kategorií: rozpočet, kategorie,
+        podkategorie (selectinload) a dva seskupené součty výdajů.
+        """
+        from sqlalchemy import func, or_
+        from sqlalchemy.orm import selectinload
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/executor.py:235","message":"get_budget_overview called","data":{"budget_id":budget_id},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "get_budget_overview called", {"budget_id":budget_id})
         
         budget = Budget.query.get(budget_id)
         if not budget:
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/executor.py:240","message":"Budget not found","data":{"budget_id":budget_id},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.debug('budget', "Budget not found", {"budget_id":budget_id})
             return None
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/executor.py:245","message":"Before BudgetCategory.query","data":{"budget_id":budget_id},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Before BudgetCategory.query", {"budget_id":budget_id})
         
-        # Kategorie s výdaji
-        kategorie = BudgetCategory.query.filter_by(budget_id=budget_id, aktivni=True).order_by(
+        # Kategorie i s podkategoriemi - dva dotazy bez ohledu na počet kategorií
+        kategorie = BudgetCategory.query.options(
+            selectinload(BudgetCategory.podkategorie)
+        ).filter_by(budget_id=budget_id, aktivni=True).order_by(
             BudgetCategory.poradi
         ).all()
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/executor.py:250","message":"After BudgetCategory.query","data":{"kategorie_count":len(kategorie)},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "After BudgetCategory.query", {"kategorie_count":len(kategorie)})
+        
+        podkategorie = {
+            kat.id: sorted((sub for sub in kat.podkategorie if sub.aktivni), key=lambda sub: sub.poradi)
+            for kat in kategorie
+        }
+        kat_ids = [kat.id for kat in kategorie]
+        sub_ids = [sub.id for subs in podkategorie.values() for sub in subs]
+        
+        # Výdaje do aktuálního data po kategoriích a podkategoriích - jeden seskupený dotaz
+        vydaje_kategorii = defaultdict(float)
+        vydaje_podkategorii = defaultdict(float)
+        if kat_ids:
+            for category_id, subcategory_id, soucet in db.session.query(
+                Expense.category_id, Expense.subcategory_id, func.sum(Expense.castka)
+            ).filter(
+                or_(Expense.category_id.in_(kat_ids), Expense.subcategory_id.in_(sub_ids)),
+                Expense.datum <= datetime.utcnow()
+            ).group_by(Expense.category_id, Expense.subcategory_id).all():
+                vydaje_kategorii[category_id] += float(soucet or 0)
+                if subcategory_id is not None:
+                    vydaje_podkategorii[subcategory_id] += float(soucet or 0)
         
         kategorie_data = []
         for kat in kategorie:
             kategorie_data.append({
                 'kategorie': kat,
-                'vydaje': kat.celkove_vydaje,
+                'vydaje': vydaje_kategorii[kat.id],
                 'podkategorie': [
                     {
                         'podkategorie': sub,
-                        'vydaje': sub.celkove_vydaje
+                        'vydaje': vydaje_podkategorii[sub.id]
                     }
-                    for sub in BudgetSubCategory.query.filter_by(
-                        category_id=kat.id, aktivni=True
-                    ).order_by(BudgetSubCategory.poradi).all()
+                    for sub in podkategorie[kat.id]
                 ]
             })
         
-        # Mzdové náklady
-        mzdove_kategorie = BudgetCategory.query.filter_by(
-            budget_id=budget_id,
-            typ='naklad_mzdovy',
-            aktivni=True
-        ).all()
+        # Mzdové náklady - součty po kategoriích a personálních záznamech jedním dotazem
+        mzdove_kategorie = sorted((kat for kat in kategorie if kat.typ == 'naklad_mzdovy'), key=lambda kat: kat.id)
         
-        mzdove_vydaje = []
-        for kat in mzdove_kategorie:
-            vydaje = Expense.query.filter_by(
-                budget_id=budget_id,
-                category_id=kat.id,
-                typ='mzda'
-            ).all()
-            
-            # Seskupit podle personálního záznamu
-            from collections import defaultdict
-            by_personnel = defaultdict(float)
-            for v in vydaje:
-                if v.personnel_id:
-                    by_personnel[v.personnel_id] += float(v.castka)
-            
-            mzdove_vydaje.append({
+        mzdy = defaultdict(lambda: {'celkem': 0.0, 'by_personnel': {}})
+        if mzdove_kategorie:
+            for category_id, personnel_id, soucet in db.session.query(
+                Expense.category_id, Expense.personnel_id, func.sum(Expense.castka)
+            ).filter(
+                Expense.budget_id == budget_id,
+                Expense.category_id.in_([kat.id for kat in mzdove_kategorie]),
+                Expense.typ == 'mzda'
+            ).group_by(Expense.category_id, Expense.personnel_id).all():
+                mzdy[category_id]['celkem'] += float(soucet or 0)
+                if personnel_id:
+                    mzdy[category_id]['by_personnel'][personnel_id] = float(soucet or 0)
+        
+        mzdove_vydaje = [
+            {
                 'kategorie': kat,
-                'celkem': sum(float(e.castka) for e in vydaje),
-                'by_personnel': dict(by_personnel)
-            })
+                'celkem': mzdy[kat.id]['celkem'],
+                'by_personnel': mzdy[kat.id]['by_personnel']
+            }
+            for kat in mzdove_kategorie
+        ]
         
         return {
             'budget': budget,
@@ -413,6 +587,8 @@ class BudgetExecutor:
     def get_all_budgets_by_year() -> List[Dict]:
         """Vrátí všechny rozpočty seřazené podle roku"""
         rozpocty = Budget.query.filter_by(aktivni=True).order_by(Budget.rok.desc()).all()
+        # Součty všech rozpočtů jedním dotazem
+        budget_totals.nacti([r.id for r in rozpocty])
         return [
             {
                 'id': r.id,
@@ -474,6 +650,12 @@ class BudgetExecutor:
             if not budget:
                 return {"success": False, "error": f"Rozpočet ID {budget_id} neexistuje"}
             
+            # Dosavadní hlavní rozpočty starších let - přepnutím se jejich rok uzavírá
+            uzavirane = Budget.query.filter(
+                Budget.hlavni == True,
+                Budget.rok < budget.rok
+            ).all()
+            
             # Odstraň hlavní z ostatních rozpočtů
             Budget.query.filter_by(hlavni=True).update({'hlavni': False})
             
@@ -481,6 +663,14 @@ class BudgetExecutor:
             budget.hlavni = True
             db.session.commit()
             
+            # Snímek uzavřeného roku pro meziroční porovnání - chyba nesmí zablokovat přepnutí
+            from .snapshots import snapshot_store
+            for stary in uzavirane:
+                try:
+                    snapshot_store.vytvor(stary)
+                except Exception as e:
+                    print(f"Chyba při vytváření snímku rozpočtu {stary.rok}: {e}")
+            
             return {
                 "success": True,
                 "message": f"Rozpočet '{budget.nazev}' byl nastaven jako hlavní"
@@ -558,6 +748,7 @@ class BudgetExecutor:
                 )
             
             db.session.add(revenue)
+            BudgetExecutor.prepocitat_rozpis_vynosu(revenue)
             db.session.commit()
             
             return {
@@ -575,33 +766,15 @@ class BudgetExecutor:
         if rok is None:
             rok = datetime.utcnow().year
         
-        revenues = Revenue.query.filter_by(budget_id=budget_id, rok=rok).all()
-        
-        monthly_planned = defaultdict(float)
-        monthly_actual = defaultdict(float)
-        
-        for r in revenues:
-            if r.typ == 'jednorazovy':
-                if r.mesic:
-                    if r.naplanovano:
-                        monthly_planned[r.mesic] += float(r.castka)
-                    if r.skutecne_prijato:
-                        monthly_actual[r.mesic] += float(r.castka)
-            else:  # pravidelny
-                months = r.get_planned_months()
-                for m in months:
-                    if r.naplanovano:
-                        monthly_planned[m] += float(r.castka)
-                    if r.skutecne_prijato:
-                        monthly_actual[m] += float(r.castka)
+        vynosy = BudgetExecutor._vynosy_po_mesicich(budget_id, rok)
         
         # Vytvoř seznam pro všech 12 měsíců
         result = []
         for m in range(1, 13):
             result.append({
                 'mesic': m,
-                'planovano': monthly_planned.get(m, 0.0),
-                'skutecne': monthly_actual.get(m, 0.0)
+                'planovano': vynosy.get(m, {}).get('planovano', 0.0),
+                'skutecne': vynosy.get(m, {}).get('skutecne', 0.0)
             })
         
         return result
@@ -618,32 +791,15 @@ class BudgetExecutor:
         for e in expenses:
             monthly_expenses[e.mesic] += float(e.castka)
         
-        # Výnosy
-        revenues = Revenue.query.filter_by(budget_id=budget_id, rok=rok).all()
-        monthly_revenues_planned = defaultdict(float)
-        monthly_revenues_actual = defaultdict(float)
-        
-        for r in revenues:
-            if r.typ == 'jednorazovy':
-                if r.mesic:
-                    if r.naplanovano:
-                        monthly_revenues_planned[r.mesic] += float(r.castka)
-                    if r.skutecne_prijato:
-                        monthly_revenues_actual[r.mesic] += float(r.castka)
-            else:  # pravidelny
-                months = r.get_planned_months()
-                for m in months:
-                    if r.naplanovano:
-                        monthly_revenues_planned[m] += float(r.castka)
-                    if r.skutecne_prijato:
-                        monthly_revenues_actual[m] += float(r.castka)
+        # Výnosy - z rozpisu do měsíců
+        vynosy = BudgetExecutor._vynosy_po_mesicich(budget_id, rok)
         
         # Vytvoř seznam pro všech 12 měsíců
         result = []
         for m in range(1, 13):
             vydaje = monthly_expenses.get(m, 0.0)
-            vynosy_plan = monthly_revenues_planned.get(m, 0.0)
-            vynosy_skut = monthly_revenues_actual.get(m, 0.0)
+            vynosy_plan = vynosy.get(m, {}).get('planovano', 0.0)
+            vynosy_skut = vynosy.get(m, {}).get('skutecne', 0.0)
             bilance = vynosy_skut - vydaje
             
             result.append({
@@ -657,70 +813,100 @@ class BudgetExecutor:
         return result
     
     # ========================================================================
-    # MĚSÍČNÍ STATISTIKY
+    # MĚSÍČNÍ STAVY
     # ========================================================================
     
     @staticmethod
-    def get_mesicni_statistiky(budget_id: int, mesic: int, rok: int) -> Dict:
-        """Vrátí statistiky rozpočtu pro konkrétní měsíc"""
-        polozky = BudgetItem.query.filter_by(budget_id=budget_id, aktivni=True).all()
-        
-        # Výdaje (náklady)
-        naklady_rozpocet = 0.0
-        naklady_skutecne = 0.0
-        
-        # Výnosy
-        vynosy_rozpocet = 0.0
-        vynosy_skutecne = 0.0
-        
-        for polozka in polozky:
-            if polozka.typ == 'naklad':
-                naklady_rozpocet += polozka.castka_float
-                
-                # Skutečné výdaje v měsíci
-                # 1. Ručně zadané výdaje
-                from sqlalchemy import extract
-                vydaje_mesic = Expense.query.filter(
-                    Expense.budget_item_id == polozka.id,
-                    extract('month', Expense.datum) == mesic,
-                    extract('year', Expense.datum) == rok
-                ).all()
-                naklady_skutecne += sum(float(e.castka) if e.castka else 0.0 for e in vydaje_mesic)
-                
-                # 2. Aktuální stav z měsíčních aktualizací (pokud je zadán)
-                mesicni_stav = MonthlyBudgetItem.query.filter_by(
-                    budget_item_id=polozka.id,
-                    mesic=mesic,
-                    rok=rok
-                ).first()
-                if mesicni_stav and mesicni_stav.aktualni_stav is not None:
-                    # Použij aktuální stav, pokud je zadán (přepíše ruční výdaje)
-                    naklady_skutecne = mesicni_stav.aktualni_stav_float
-                elif mesicni_stav:
-                    # Jinak použij souhrnné výdaje (zpětná kompatibilita)
-                    naklady_skutecne += mesicni_stav.souhrnne_vydaje_float
-            else:
-                # Výnosy
-                vynosy_rozpocet += polozka.castka_float
-                
-                # Skutečné výnosy v měsíci
-                vynosy_mesic = Revenue.query.filter(
-                    Revenue.budget_item_id == polozka.id,
-                    Revenue.rok == rok,
-                    Revenue.skutecne_prijato == True
-                ).all()
-                
-                # Zkontroluj, zda výnos spadá do tohoto měsíce
-                for vynos in vynosy_mesic:
-                    if vynos.typ == 'jednorazovy' and vynos.mesic == mesic:
-                        vynosy_skutecne += vynos.castka_float
-                    elif vynos.typ == 'pravidelny':
-                        planned_months = vynos.get_planned_months()
-                        if mesic in planned_months:
-                            vynosy_skutecne += vynos.castka_float
+    def get_mesicni_stavy(budget_item_ids: List[int], mesic: int, rok: int) -> Dict[int, MonthlyBudgetItem]:
+        """Vrátí měsíční stavy položek za měsíc jedním dotazem - {budget_item_id: MonthlyBudgetItem}"""
+        if not budget_item_ids:
+            return {}
+        stavy = {}
+        for stav in MonthlyBudgetItem.query.filter(
+            MonthlyBudgetItem.budget_item_id.in_(budget_item_ids),
+            MonthlyBudgetItem.mesic == mesic,
+            MonthlyBudgetItem.rok == rok
+        ).order_by(MonthlyBudgetItem.id):
+            # Při duplicitách platí první záznam
+            stavy.setdefault(stav.budget_item_id, stav)
+        return stavy
+    
+    @staticmethod
+    def ulozit_mesicni_stavy(budget_id: int, mesic: int, rok: int, aktualni_stavy: Dict[int, Optional[Decimal]]) -> Dict:
+        """
+        Hromadně uloží aktuální stavy položek za měsíc v jedné transakci.
         
-        bilance = vynosy_skutecne - naklady_skutecne
+        Existující záznamy načte jedním dotazem, nové vloží a stávající upraví
+        hromadně (executemany), přepočítá souhrny a vrátí aktuální statistiky měsíce.
+        """
+        from sqlalchemy import insert, update
         
+        try:
+            if not aktualni_stavy:
+                return {
+                    "success": True,
+                    "message": "Žádné položky k uložení",
+                    "statistiky": BudgetExecutor.get_mesicni_statistiky(budget_id, mesic, rok)
+                }
+            
+            # Ukládej jen položky, které patří do rozpočtu
+            platne_ids = {
+                polozka_id for (polozka_id,) in db.session.query(BudgetItem.id).filter(
+                    BudgetItem.budget_id == budget_id,
+                    BudgetItem.id.in_(list(aktualni_stavy.keys()))
+                )
+            }
+            existujici = BudgetExecutor.get_mesicni_stavy(list(platne_ids), mesic, rok)
+            
+            ted = datetime.utcnow()
+            nove = []
+            upravy = []
+            for polozka_id, aktualni_stav in aktualni_stavy.items():
+                if polozka_id not in platne_ids:
+                    continue
+                stav = existujici.get(polozka_id)
+                if stav:
+                    upravy.append({"id": stav.id, "aktualni_stav": aktualni_stav, "datum_aktualizace": ted})
+                else:
+                    nove.append({
+                        "budget_item_id": polozka_id,
+                        "mesic": mesic,
+                        "rok": rok,
+                        "aktualni_stav": aktualni_stav,
+                        "souhrnne_vydaje": Decimal('0'),
+                        "datum_aktualizace": ted
+                    })
+            
+            if nove:
+                db.session.execute(insert(MonthlyBudgetItem), nove)
+            if upravy:
+                db.session.execute(update(MonthlyBudgetItem), upravy)
+                # Hromadný update neobnoví už načtené objekty v session
+                for stav in existujici.values():
+                    db.session.expire(stav)
+            
+            BudgetExecutor.prepocitat_souhrny_mesice(list(platne_ids), mesic, rok)
+            db.session.commit()
+            
+            return {
+                "success": True,
+                "message": f"Měsíční stav pro {rok}/{mesic:02d} byl uložen",
+                "vlozeno": len(nove),
+                "upraveno": len(upravy),
+                "statistiky": BudgetExecutor.get_mesicni_statistiky(budget_id, mesic, rok)
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {"success": False, "error": str(e)}
+    
+    # ========================================================================
+    # MĚSÍČNÍ STATISTIKY
+    # ========================================================================
+    
+    @staticmethod
+    def _sestav_statistiky(naklady_rozpocet: float, naklady_skutecne: float,
+                           vynosy_rozpocet: float, vynosy_skutecne: float) -> Dict:
+        """Sestaví slovník statistik ve formátu, který očekávají šablony"""
         return {
             'naklady_rozpocet': naklady_rozpocet,
             'naklady_skutecne': naklady_skutecne,
@@ -728,76 +914,145 @@ class BudgetExecutor:
             'vynosy_rozpocet': vynosy_rozpocet,
             'vynosy_skutecne': vynosy_skutecne,
             'vynosy_procento': (vynosy_skutecne / vynosy_rozpocet * 100) if vynosy_rozpocet > 0 else 0,
-            'bilance': bilance
+            'bilance': vynosy_skutecne - naklady_skutecne
         }
     
     @staticmethod
-    def get_rocni_statistiky(budget_id: int, rok: int) -> Dict:
-        """Vrátí celkové statistiky rozpočtu za rok"""
-        polozky = BudgetItem.query.filter_by(budget_id=budget_id, aktivni=True).all()
+    def get_statistiky_roku(budget_id: int, rok: int) -> Dict:
+        """
+        Vrátí statistiky všech 12 měsíců i celého roku najednou.
         
-        naklady_rozpocet = 0.0
-        naklady_skutecne = 0.0
-        vynosy_rozpocet = 0.0
-        vynosy_skutecne = 0.0
+        Místo dotazů po jednotlivých položkách načte výdaje, měsíční stavy
+        a výnosy několika seskupenými dotazy (GROUP BY položka, měsíc).
+        Vrací {'mesice': {1: {...}, ..., 12: {...}}, 'rok': {...}}.
+        """
+        from sqlalchemy import func
         
-        for polozka in polozky:
-            if polozka.typ == 'naklad':
-                naklady_rozpocet += polozka.castka_float
-                
-                # Výdaje za celý rok
-                from sqlalchemy import extract
-                vydaje_rok = Expense.query.filter(
-                    Expense.budget_item_id == polozka.id,
-                    extract('year', Expense.datum) == rok
-                ).all()
-                naklady_skutecne += sum(float(e.castka) if e.castka else 0.0 for e in vydaje_rok)
-                
-                # Aktuální stavy za celý rok - použij nejnovější měsíční stav
-                mesicni_stavy = MonthlyBudgetItem.query.filter_by(
-                    budget_item_id=polozka.id,
-                    rok=rok
-                ).order_by(MonthlyBudgetItem.mesic.desc()).all()
-                
-                if mesicni_stavy:
-                    # Najdi nejnovější stav s aktuálním stavem
-                    nejnovejsi_s_aktualnim = None
-                    for s in mesicni_stavy:
-                        if s.aktualni_stav is not None:
-                            nejnovejsi_s_aktualnim = s
-                            break
-                    
-                    if nejnovejsi_s_aktualnim:
-                        # Použij aktuální stav z nejnovějšího měsíce
-                        naklady_skutecne = nejnovejsi_s_aktualnim.aktualni_stav_float
-                    else:
-                        # Jinak použij souhrnné výdaje (zpětná kompatibilita)
-                        for s in mesicni_stavy:
-                            if s.souhrnne_vydaje:
-                                naklady_skutecne += float(s.souhrnne_vydaje)
-            else:
-                vynosy_rozpocet += polozka.castka_float
-                
-                # Výnosy za celý rok
-                vynosy_rok = Revenue.query.filter(
-                    Revenue.budget_item_id == polozka.id,
-                    Revenue.rok == rok,
-                    Revenue.skutecne_prijato == True
-                ).all()
-                vynosy_skutecne += sum(float(v.castka) if v.castka else 0.0 for v in vynosy_rok)
+        polozky = db.session.query(
+            BudgetItem.id, BudgetItem.typ, BudgetItem.castka
+        ).filter(
+            BudgetItem.budget_id == budget_id,
+            BudgetItem.aktivni == True
+        ).all()
+        
+        naklady_ids = {p.id for p in polozky if p.typ == 'naklad'}
+        vynosy_ids = {p.id for p in polozky if p.typ != 'naklad'}
+        naklady_rozpocet = sum(float(p.castka) if p.castka else 0.0 for p in polozky if p.typ == 'naklad')
+        vynosy_rozpocet = sum(float(p.castka) if p.castka else 0.0 for p in polozky if p.typ != 'naklad')
+        
+        # 1. Ručně zadané výdaje - součet po položkách a měsících
+        vydaje = defaultdict(float)  # (polozka_id, mesic) -> částka
+        if naklady_ids:
+            # Rozsah na datum (index budget_item_id, datum), seskupení podle uloženého měsíce
+            radky = db.session.query(
+                Expense.budget_item_id,
+                Expense.mesic,
+                func.sum(Expense.castka)
+            ).join(
+                BudgetItem, Expense.budget_item_id == BudgetItem.id
+            ).filter(
+                BudgetItem.budget_id == budget_id,
+                BudgetItem.aktivni == True,
+                BudgetItem.typ == 'naklad',
+                Expense.datum >= datetime(rok, 1, 1),
+                Expense.datum < datetime(rok + 1, 1, 1)
+            ).group_by(Expense.budget_item_id, Expense.mesic).all()
+            for polozka_id, mesic, soucet in radky:
+                vydaje[(polozka_id, int(mesic))] += float(soucet) if soucet else 0.0
         
-        bilance = vynosy_skutecne - naklady_skutecne
+        # 2. Měsíční stavy za rok - jeden dotaz pro všechny položky
+        stavy = {}  # (polozka_id, mesic) -> (aktualni_stav, souhrnne_vydaje)
+        if naklady_ids:
+            radky = db.session.query(
+                MonthlyBudgetItem.budget_item_id,
+                MonthlyBudgetItem.mesic,
+                MonthlyBudgetItem.aktualni_stav,
+                MonthlyBudgetItem.souhrnne_vydaje
+            ).join(
+                BudgetItem, MonthlyBudgetItem.budget_item_id == BudgetItem.id
+            ).filter(
+                BudgetItem.budget_id == budget_id,
+                BudgetItem.aktivni == True,
+                BudgetItem.typ == 'naklad',
+                MonthlyBudgetItem.rok == rok
+            ).order_by(MonthlyBudgetItem.id).all()
+            for polozka_id, mesic, aktualni_stav, souhrnne in radky:
+                # Při duplicitách platí první záznam (stejně jako dřívější .first())
+                stavy.setdefault((polozka_id, mesic), (
+                    float(aktualni_stav) if aktualni_stav is not None else None,
+                    float(souhrnne) if souhrnne else 0.0
+                ))
+        
+        # 3. Skutečně přijaté výnosy - po měsících z rozpisu, za rok každý výnos jednou
+        vynosy_mesic = defaultdict(float)
+        vynosy_rok = 0.0
+        if vynosy_ids:
+            prijate = [
+                BudgetItem.budget_id == budget_id,
+                BudgetItem.aktivni == True,
+                BudgetItem.typ != 'naklad',
+                Revenue.rok == rok,
+                Revenue.skutecne_prijato == True
+            ]
+            for mesic, soucet in db.session.query(
+                RevenueSchedule.mesic, func.sum(RevenueSchedule.castka)
+            ).join(
+                Revenue, RevenueSchedule.revenue_id == Revenue.id
+            ).join(
+                BudgetItem, Revenue.budget_item_id == BudgetItem.id
+            ).filter(*prijate, RevenueSchedule.rok == rok).group_by(RevenueSchedule.mesic).all():
+                vynosy_mesic[mesic] += float(soucet or 0)
+            vynosy_rok = float(db.session.query(func.sum(Revenue.castka)).join(
+                BudgetItem, Revenue.budget_item_id == BudgetItem.id
+            ).filter(*prijate).scalar() or 0)
+        
+        # Jeden průchod: měsíční skutečnost i roční součet po položkách
+        naklady_mesic = defaultdict(float)
+        naklady_rok = 0.0
+        for polozka_id in naklady_ids:
+            vydaje_rok = 0.0
+            souhrnne_rok = 0.0
+            posledni_stav = None
+            for mesic in range(1, 13):
+                vydaje_mesic = vydaje.get((polozka_id, mesic), 0.0)
+                vydaje_rok += vydaje_mesic
+                stav = stavy.get((polozka_id, mesic))
+                if stav and stav[0] is not None:
+                    # Aktuální stav přepíše ruční výdaje dané položky v měsíci
+                    naklady_mesic[mesic] += stav[0]
+                    posledni_stav = stav[0]
+                elif stav:
+                    # Jinak souhrnné výdaje (zpětná kompatibilita)
+                    naklady_mesic[mesic] += vydaje_mesic + stav[1]
+                    souhrnne_rok += stav[1]
+                else:
+                    naklady_mesic[mesic] += vydaje_mesic
+            
+            if posledni_stav is not None:
+                # Za rok platí aktuální stav z nejnovějšího měsíce
+                naklady_rok += posledni_stav
+            else:
+                naklady_rok += vydaje_rok + souhrnne_rok
         
         return {
-            'naklady_rozpocet': naklady_rozpocet,
-            'naklady_skutecne': naklady_skutecne,
-            'naklady_procento': (naklady_skutecne / naklady_rozpocet * 100) if naklady_rozpocet > 0 else 0,
-            'vynosy_rozpocet': vynosy_rozpocet,
-            'vynosy_skutecne': vynosy_skutecne,
-            'vynosy_procento': (vynosy_skutecne / vynosy_rozpocet * 100) if vynosy_rozpocet > 0 else 0,
-            'bilance': bilance
+            'mesice': {
+                mesic: BudgetExecutor._sestav_statistiky(
+                    naklady_rozpocet, naklady_mesic.get(mesic, 0.0),
+                    vynosy_rozpocet, vynosy_mesic.get(mesic, 0.0)
+                )
+                for mesic in range(1, 13)
+            },
+            'rok': BudgetExecutor._sestav_statistiky(
+                naklady_rozpocet, naklady_rok, vynosy_rozpocet, vynosy_rok
+            )
         }
-
-
-
-
+    
+    @staticmethod
+    def get_mesicni_statistiky(budget_id: int, mesic: int, rok: int) -> Dict:
+        """Vrátí statistiky rozpočtu pro konkrétní měsíc"""
+        return BudgetExecutor.get_statistiky_roku(budget_id, rok)['mesice'][mesic]
+    
+    @staticmethod
+    def get_rocni_statistiky(budget_id: int, rok: int) -> Dict:
+        """Vrátí celkové statistiky rozpočtu za rok"""
+        return BudgetExecutor.get_statistiky_roku(budget_id, rok)['rok']
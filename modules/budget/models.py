@@ -6,6 +6,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import List
 from core import db
+from core.event_log import event_log
 
 
 class Budget(db.Model):
@@ -36,16 +37,16 @@ class Budget(db.Model):
     def castka_celkem_float(self):
         return float(self.castka_celkem) if self.castka_celkem else 0.0
     
+    @property
+    def souhrn(self):
+        """Součty výdajů a výnosů - jeden SQL dotaz za požadavek (viz modules/budget/totals.py)"""
+        from .totals import budget_totals
+        return budget_totals.get(self.id)
+    
     @property
     def celkove_vydaje(self):
         """Celkové výdaje v rozpočtu (do aktuálního data)"""
-        if not self.vydaje:
-            return 0.0
-        dnes = datetime.utcnow()
-        try:
-            return sum(float(e.castka) if e.castka else 0.0 for e in self.vydaje if e.datum and e.datum <= dnes)
-        except (TypeError, AttributeError):
-            return 0.0
+        return self.souhrn['vydaje']
     
     @property
     def zbytek(self):
@@ -61,45 +62,19 @@ class Budget(db.Model):
     
     @property
     def celkove_vynosy(self):
-        """Celkové výnosy v rozpočtu (do aktuálního data)"""
-        if not self.vynosy:
-            return 0.0
-        dnes = datetime.utcnow()
-        try:
-            # Jednorázové výnosy - skutečně přijaté
-            jednorazove = sum(
-                float(r.castka) if r.castka else 0.0 
-                for r in self.vynosy 
-                if r.typ == 'jednorazovy' and r.datum and r.datum <= dnes and r.skutecne_prijato
-            )
-            # Pravidelné výnosy - skutečně přijaté
-            pravidelne = sum(
-                float(r.castka) if r.castka else 0.0 
-                for r in self.vynosy 
-                if r.typ == 'pravidelny' and r.skutecne_prijato
-            )
-            return jednorazove + pravidelne
-        except (TypeError, AttributeError):
-            return 0.0
+        """Celkové výnosy v rozpočtu (do aktuálního data) - jednorázové i pravidelné skutečně přijaté"""
+        return self.souhrn['vynosy']
     
     @property
     def planovane_vynosy(self):
         """Naplánované výnosy (včetně budoucích)"""
-        if not self.vynosy:
-            return 0.0
-        try:
-            return sum(
-                float(r.castka) if r.castka else 0.0 
-                for r in self.vynosy 
-                if r.naplanovano
-            )
-        except (TypeError, AttributeError):
-            return 0.0
+        return self.souhrn['planovane_vynosy']
     
     @property
     def bilance(self):
         """Bilance (výnosy - výdaje)"""
-        return self.celkove_vynosy - self.celkove_vydaje
+        souhrn = self.souhrn
+        return souhrn['vynosy'] - souhrn['vydaje']
 
 
 class BudgetCategory(db.Model):
@@ -212,40 +187,28 @@ class BudgetItem(db.Model):
         aktualni_rok = dnes.year
         
         if self.typ == 'naklad':
-            # Pro náklady - součet výdajů
-            vydaje_castka = 0.0
-            if self.vydaje:
-                try:
-                    vydaje_castka = sum(float(e.castka) if e.castka else 0.0 for e in self.vydaje if e.datum and e.datum <= dnes)
-                except:
-                    vydaje_castka = 0.0
-            
-            # Použij aktuální stav z měsíčních aktualizací (pokud je zadán)
-            if hasattr(self, 'mesicni_stavy') and self.mesicni_stavy:
-                try:
-                    # Najdi nejnovější měsíční stav do aktuálního měsíce
-                    nejnovejsi_stav = None
-                    for stav in self.mesicni_stavy:
-                        if stav.rok < aktualni_rok or (stav.rok == aktualni_rok and stav.mesic <= aktualni_mesic):
-                            if nejnovejsi_stav is None:
-                                nejnovejsi_stav = stav
-                            elif stav.rok > nejnovejsi_stav.rok or (stav.rok == nejnovejsi_stav.rok and stav.mesic > nejnovejsi_stav.mesic):
-                                nejnovejsi_stav = stav
-                    
-                    # Pokud má nejnovější stav aktuální stav, použij ho
-                    if nejnovejsi_stav and nejnovejsi_stav.aktualni_stav is not None:
-                        return nejnovejsi_stav.aktualni_stav_float
+            # Pro náklady - čte z udržovaného souhrnu (BudgetItemTotal) místo procházení všech výdajů
+            try:
+                souhrny = [
+                    s for s in self.souhrny
+                    if s.rok < aktualni_rok or (s.rok == aktualni_rok and s.mesic <= aktualni_mesic)
+                ]
+                vydaje_castka = sum(float(s.vydaje) if s.vydaje else 0.0 for s in souhrny)
+                
+                # Použij aktuální stav z nejnovější měsíční aktualizace (pokud je zadán)
+                stavy = [s for s in souhrny if s.ma_mesicni_stav]
+                if stavy:
+                    nejnovejsi_stav = max(stavy, key=lambda s: (s.rok, s.mesic))
+                    if nejnovejsi_stav.aktualni_stav is not None:
+                        return float(nejnovejsi_stav.aktualni_stav)
                     
                     # Jinak použij souhrnné výdaje (zpětná kompatibilita)
-                    souhrnne_vydaje = 0.0
-                    for stav in self.mesicni_stavy:
-                        if stav.rok < aktualni_rok or (stav.rok == aktualni_rok and stav.mesic <= aktualni_mesic):
-                            souhrnne_vydaje += float(stav.souhrnne_vydaje) if stav.souhrnne_vydaje else 0.0
+                    souhrnne_vydaje = sum(float(s.souhrnne_vydaje) if s.souhrnne_vydaje else 0.0 for s in stavy)
                     return vydaje_castka + souhrnne_vydaje
-                except:
-                    pass
-            
-            return vydaje_castka
+                
+                return vydaje_castka
+            except:
+                return 0.0
         else:
             # Pro výnosy - součet výnosů
             if not self.vynosy:
@@ -265,13 +228,10 @@ class BudgetItem(db.Model):
     @property
     def procenta_vycerpani(self):
         """Procenta vyčerpání"""
-        import json
-        from datetime import datetime as dt
-        
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/models.py:236","message":"procenta_vycerpani called","data":{"item_id":self.id,"castka_float":self.castka_float},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        # Volá se pro každou položku seznamu - data sestavuj jen při zapnutém logu
+        loguj = event_log.enabled_for('budget')
+        if loguj:
+            event_log.debug('budget', "procenta_vycerpani called", {"item_id":self.id,"castka_float":self.castka_float})
         
         if self.castka_float == 0:
             return 0.0
@@ -279,16 +239,11 @@ class BudgetItem(db.Model):
         try:
             aktualni = self.aktualni_plneni
             result = min(100.0, (aktualni / self.castka_float) * 100.0)
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/models.py:245","message":"procenta_vycerpani calculated","data":{"aktualni_plneni":aktualni,"result":result},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            if loguj:
+                event_log.debug('budget', "procenta_vycerpani calculated", {"aktualni_plneni":aktualni,"result":result})
             return result
         except Exception as ex:
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/models.py:249","message":"Exception in procenta_vycerpani","data":{"error":str(ex)},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.error('budget', "Exception in procenta_vycerpani", {"error":str(ex)})
             return 0.0
     
     @property
@@ -324,6 +279,12 @@ class Expense(db.Model):
     
     datum_vytvoreni = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
+    # Indexy pro výdaje rozpočtu za rok a výdaje položky v rozsahu dat (migrate_budget_indexes.py)
+    __table_args__ = (
+        db.Index('ix_expense_budget_rok', 'budget_id', 'rok'),
+        db.Index('ix_expense_item_datum', 'budget_item_id', 'datum'),
+    )
+    
     def __repr__(self):
         return f'<Expense {self.popis} - {self.castka}>'
     
@@ -357,6 +318,11 @@ class MonthlyBudgetItem(db.Model):
     # Relace
     budget_item = db.relationship('BudgetItem', backref='mesicni_stavy')
     
+    # Jeden měsíční stav na položku a měsíc (migrate_budget_indexes.py sloučí starší duplicity)
+    __table_args__ = (
+        db.Index('unique_monthly_budget_item', 'budget_item_id', 'rok', 'mesic', unique=True),
+    )
+    
     def __repr__(self):
         return f'<MonthlyBudgetItem {self.budget_item_id} - {self.rok}/{self.mesic:02d}>'
     
@@ -369,6 +335,36 @@ class MonthlyBudgetItem(db.Model):
         return float(self.aktualni_stav) if self.aktualni_stav is not None else None
 
 
+class BudgetItemTotal(db.Model):
+    """Průběžné součty položky rozpočtu po měsících - udržovaný souhrn pro aktualni_plneni"""
+    __tablename__ = 'budget_item_total'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    budget_item_id = db.Column(db.Integer, db.ForeignKey('budget_item.id'), nullable=False, index=True)
+    mesic = db.Column(db.Integer, nullable=False)  # 1-12
+    rok = db.Column(db.Integer, nullable=False)
+    
+    # Součet ručně zadaných výdajů v měsíci
+    vydaje = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    
+    # Kopie měsíčního stavu (MonthlyBudgetItem) pro daný měsíc
+    ma_mesicni_stav = db.Column(db.Boolean, nullable=False, default=False)
+    aktualni_stav = db.Column(db.Numeric(12, 2), nullable=True)  # NULL = není zadán
+    souhrnne_vydaje = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    
+    datum_prepoctu = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Relace
+    budget_item = db.relationship('BudgetItem', backref=db.backref('souhrny', lazy=True, cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.UniqueConstraint('budget_item_id', 'rok', 'mesic', name='unique_budget_item_total'),
+    )
+    
+    def __repr__(self):
+        return f'<BudgetItemTotal {self.budget_item_id} - {self.rok}/{self.mesic:02d}>'
+
+
 class Revenue(db.Model):
     """Výnos - jednorázový nebo pravidelný výnos"""
     __tablename__ = 'revenue'
@@ -407,6 +403,10 @@ class Revenue(db.Model):
     datum_vytvoreni = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     datum_aktualizace = db.Column(db.DateTime, nullable=True, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_revenue_item_rok_prijato', 'budget_item_id', 'rok', 'skutecne_prijato'),
+    )
+    
     def __repr__(self):
         return f'<Revenue {self.nazev} - {self.castka} ({self.typ})>'
     
@@ -431,6 +431,31 @@ class Revenue(db.Model):
             return list(range(1, 13))
 
 
+class RevenueSchedule(db.Model):
+    """Rozpis výnosu do měsíců - předpočítaný get_planned_months() pro měsíční součty"""
+    __tablename__ = 'revenue_schedule'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    revenue_id = db.Column(db.Integer, db.ForeignKey('revenue.id'), nullable=False)
+    rok = db.Column(db.Integer, nullable=False)
+    mesic = db.Column(db.Integer, nullable=False)  # 1-12
+    
+    # Kopie z výnosu - přepočítá BudgetExecutor.prepocitat_rozpis_vynosu
+    castka = db.Column(db.Numeric(12, 2), nullable=False)
+    naplanovano = db.Column(db.Boolean, nullable=False, default=False)
+    skutecne_prijato = db.Column(db.Boolean, nullable=False, default=False)
+    
+    # Relace
+    revenue = db.relationship('Revenue', backref=db.backref('rozpis', lazy=True, cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.UniqueConstraint('revenue_id', 'rok', 'mesic', name='unique_revenue_schedule'),
+    )
+    
+    def __repr__(self):
+        return f'<RevenueSchedule {self.revenue_id} - {self.rok}/{self.mesic:02d}>'
+
+
 # Zastaralé modely - ponechány pro kompatibilitu
 class UctovaSkupina(db.Model):
     """ZASTARALÉ - bude odstraněno"""
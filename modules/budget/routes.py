@@ -5,6 +5,7 @@ Routes pro modul rozpočtu - kompletní implementace
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from datetime import datetime
 from core import db
+from core.event_log import event_log
 from .models import Budget, BudgetCategory, BudgetSubCategory, BudgetItem, Expense, Revenue, MonthlyBudgetItem
 from .executor import BudgetExecutor
 
@@ -14,31 +15,16 @@ budget_bp = Blueprint('budget', __name__, url_prefix='/rozpocet')
 @budget_bp.route('/')
 def index():
     """Hlavní stránka modulu rozpočtu - dashboard"""
-    import json
-    from datetime import datetime as dt
-    
-    # #region agent log
-    with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-        f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/routes.py:15","message":"budget index route called","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-    # #endregion
+    event_log.debug('budget', "budget index route called")
     
     try:
         hlavni_rozpocet = BudgetExecutor.get_or_create_main_budget()
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/routes.py:20","message":"get_or_create_main_budget completed","data":{"budget_id":hlavni_rozpocet.id if hlavni_rozpocet else None},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "get_or_create_main_budget completed", {"budget_id":hlavni_rozpocet.id if hlavni_rozpocet else None})
         
         overview = BudgetExecutor.get_budget_overview(hlavni_rozpocet.id)
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/routes.py:23","message":"get_budget_overview completed","data":{"overview_keys":list(overview.keys()) if overview else None},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "get_budget_overview completed", {"overview_keys":list(overview.keys()) if overview else None})
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/routes.py:26","message":"Before render_template","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Before render_template")
         
         return render_template(
             'budget/index.html',
@@ -46,10 +32,7 @@ def index():
             overview=overview
         )
     except Exception as e:
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/routes.py:35","message":"Exception in budget index","data":{"error":str(e),"type":type(e).__name__},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.error('budget', "Exception in budget index", {"error":str(e),"type":type(e).__name__})
         raise
 
 
@@ -319,72 +302,93 @@ def nastavit_hlavni_rozpocet(budget_id):
     return redirect(url_for('budget.dalsi_roky'))
 
 
+@budget_bp.route('/dalsi-roky/<int:budget_id>/snimek', methods=['POST'])
+def vytvorit_snimek_rozpoctu(budget_id):
+    """Vytvořit (přepsat) snímek rozpočtu pro meziroční porovnání"""
+    from .snapshots import snapshot_store
+    
+    budget = Budget.query.get_or_404(budget_id)
+    try:
+        result = snapshot_store.vytvor(budget)
+        flash(result['message'], 'success')
+    except Exception as e:
+        flash(f'Chyba při vytváření snímku: {str(e)}', 'danger')
+    
+    return redirect(url_for('budget.dalsi_roky'))
+
+
+@budget_bp.route('/api/porovnani-roku')
+def api_porovnani_roku():
+    """
+    API meziročního porovnání ze snímků rozpočtu
+    
+    Parametry: roky=2025,2026 (výchozí všechny se snímkem), podle=ucet|poducet|kategorie,
+    typ=naklad|vynos, mesice=1 (i skutečnost po měsících)
+    """
+    from .snapshots import snapshot_store
+    
+    try:
+        roky = [int(r) for r in request.args.get('roky', '').split(',') if r.strip()]
+    except ValueError:
+        return jsonify({'error': 'Neplatný seznam roků'}), 400
+    roky = roky or snapshot_store.dostupne_roky()
+    typ = request.args.get('typ') or None
+    if typ not in (None, 'naklad', 'vynos'):
+        return jsonify({'error': f"Neznámý typ '{typ}'"}), 400
+    
+    try:
+        vysledek = snapshot_store.porovnani(
+            roky,
+            podle=request.args.get('podle', 'ucet'),
+            typ=typ,
+            mesice=request.args.get('mesice') == '1'
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(vysledek)
+
+
 @budget_bp.route('/polozky')
 def seznam_polozek():
     """Seznam všech položek rozpočtu"""
-    import json
-    from datetime import datetime as dt
-    
-    # #region agent log
-    with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-        f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"budget/routes.py:262","message":"seznam_polozek route called","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-    # #endregion
+    event_log.debug('budget', "seznam_polozek route called")
     
     try:
         hlavni_rozpocet = BudgetExecutor.get_or_create_main_budget()
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"budget/routes.py:268","message":"get_or_create_main_budget completed","data":{"budget_id":hlavni_rozpocet.id if hlavni_rozpocet else None},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "get_or_create_main_budget completed", {"budget_id":hlavni_rozpocet.id if hlavni_rozpocet else None})
         
         # Filtry
         typ_filter = request.args.get('typ', '')  # 'naklad', 'vynos', nebo prázdné pro všechny
         rok = request.args.get('rok', hlavni_rozpocet.rok, type=int)
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"budget/routes.py:275","message":"Before database query","data":{"budget_id":hlavni_rozpocet.id,"typ_filter":typ_filter},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Before database query", {"budget_id":hlavni_rozpocet.id,"typ_filter":typ_filter})
         
-        # Získat všechny položky rozpočtu
-        query = BudgetItem.query.filter_by(budget_id=hlavni_rozpocet.id, aktivni=True)
+        # Získat všechny položky rozpočtu (souhrny pro aktualni_plneni načti jedním dotazem)
+        from sqlalchemy.orm import selectinload
+        query = BudgetItem.query.options(selectinload(BudgetItem.souhrny)).filter_by(budget_id=hlavni_rozpocet.id, aktivni=True)
         
         if typ_filter:
             query = query.filter_by(typ=typ_filter)
         
         polozky = query.order_by(BudgetItem.typ, BudgetItem.ucet, BudgetItem.poducet).all()
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"budget/routes.py:285","message":"Database query completed","data":{"polozky_count":len(polozky)},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Database query completed", {"polozky_count":len(polozky)})
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/routes.py:288","message":"Before calculating sums","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Before calculating sums")
         
         # Součty
         naklady_celkem = sum(p.castka_float for p in polozky if p.typ == 'naklad')
         vynosy_celkem = sum(p.castka_float for p in polozky if p.typ == 'vynos')
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"B","location":"budget/routes.py:295","message":"Before calculating aktualni_plneni","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Before calculating aktualni_plneni")
         
         naklady_plneni = sum(p.aktualni_plneni for p in polozky if p.typ == 'naklad')
         vynosy_plneni = sum(p.aktualni_plneni for p in polozky if p.typ == 'vynos')
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"D","location":"budget/routes.py:300","message":"Sums calculated","data":{"naklady_celkem":naklady_celkem,"vynosy_celkem":vynosy_celkem,"naklady_plneni":naklady_plneni,"vynosy_plneni":vynosy_plneni},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Sums calculated", {"naklady_celkem":naklady_celkem,"vynosy_celkem":vynosy_celkem,"naklady_plneni":naklady_plneni,"vynosy_plneni":vynosy_plneni})
         
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"E","location":"budget/routes.py:303","message":"Before render_template","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.debug('budget', "Before render_template")
         
         return render_template(
             'budget/seznam_polozek.html',
@@ -398,32 +402,20 @@ def seznam_polozek():
             vynosy_plneni=vynosy_plneni
         )
     except Exception as e:
-        # #region agent log
-        with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-            f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"A","location":"budget/routes.py:320","message":"Exception in seznam_polozek","data":{"error":str(e),"type":type(e).__name__},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-        # #endregion
+        event_log.error('budget', "Exception in seznam_polozek", {"error":str(e),"type":type(e).__name__})
         raise
 
 
 @budget_bp.route('/polozka/pridat', methods=['GET', 'POST'])
 def pridat_polozku():
     """Přidat novou položku rozpočtu"""
-    import json
-    from datetime import datetime as dt
-    
-    # #region agent log
-    with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-        f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:298","message":"pridat_polozku route called","data":{"method":request.method},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-    # #endregion
+    event_log.debug('budget', "pridat_polozku route called", {"method":request.method})
     
     hlavni_rozpocet = BudgetExecutor.get_or_create_main_budget()
     
     if request.method == 'POST':
         try:
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:305","message":"Before creating BudgetItem","data":{"form_data":dict(request.form)},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.debug('budget', "Before creating BudgetItem", {"form_data":dict(request.form)})
             
             polozka = BudgetItem(
                 budget_id=hlavni_rozpocet.id,
@@ -435,39 +427,21 @@ def pridat_polozku():
                 aktivni=True
             )
             
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:316","message":"BudgetItem created","data":{"ucet":polozka.ucet,"popis":polozka.popis,"typ":polozka.typ,"castka":float(polozka.castka)},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.debug('budget', "BudgetItem created", {"ucet":polozka.ucet,"popis":polozka.popis,"typ":polozka.typ,"castka":float(polozka.castka)})
             
             if not polozka.ucet or not polozka.popis:
-                # #region agent log
-                with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:319","message":"Validation failed","data":{"ucet":polozka.ucet,"popis":polozka.popis},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-                # #endregion
+                event_log.warning('budget', "Validation failed", {"ucet":polozka.ucet,"popis":polozka.popis})
                 flash('Účet a popis jsou povinné', 'danger')
             else:
-                # #region agent log
-                with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:322","message":"Before db.session.add","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-                # #endregion
+                event_log.debug('budget', "Before db.session.add")
                 db.session.add(polozka)
-                # #region agent log
-                with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:324","message":"Before db.session.commit","data":{},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-                # #endregion
+                event_log.debug('budget', "Before db.session.commit")
                 db.session.commit()
-                # #region agent log
-                with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                    f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:326","message":"db.session.commit completed","data":{"polozka_id":polozka.id},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-                # #endregion
+                event_log.debug('budget', "db.session.commit completed", {"polozka_id":polozka.id})
                 flash(f'Položka rozpočtu "{polozka.popis}" byla přidána', 'success')
                 return redirect(url_for('budget.seznam_polozek'))
         except Exception as e:
-            # #region agent log
-            with open('/Users/jendouch/library_budget/.cursor/debug.log', 'a') as f:
-                f.write(json.dumps({"sessionId":"debug-session","runId":"run1","hypothesisId":"C","location":"budget/routes.py:330","message":"Exception in pridat_polozku","data":{"error":str(e),"type":type(e).__name__},"timestamp":int(dt.now().timestamp()*1000)})+'\n')
-            # #endregion
+            event_log.error('budget', "Exception in pridat_polozku", {"error":str(e),"type":type(e).__name__})
             db.session.rollback()
             flash(f'Chyba při přidávání položky: {str(e)}', 'danger')
     
@@ -528,6 +502,8 @@ def smazat_polozku(polozka_id):
             for stav in polozka.mesicni_stavy:
                 db.session.delete(stav)
         
+        # Souhrny položky (BudgetItemTotal) se smažou kaskádou s položkou
+        
         # Smaž položku
         db.session.delete(polozka)
         db.session.commit()
@@ -561,35 +537,19 @@ def mesicni_stav():
             mesic = int(request.form.get('mesic'))
             rok = int(request.form.get('rok'))
             
-            # Zpracuj všechny položky - aktuální stav
+            # Posbírej aktuální stavy všech položek a ulož je hromadně
+            aktualni_stavy = {}
             for key, value in request.form.items():
                 if key.startswith('aktualni_stav_'):
                     polozka_id = int(key.replace('aktualni_stav_', ''))
                     aktualni_stav_str = value.strip() if value else None
-                    aktualni_stav = Decimal(str(aktualni_stav_str)) if aktualni_stav_str else None
-                    
-                    # Zkontroluj, zda už existuje záznam
-                    existujici = MonthlyBudgetItem.query.filter_by(
-                        budget_item_id=polozka_id,
-                        mesic=mesic,
-                        rok=rok
-                    ).first()
-                    
-                    if existujici:
-                        existujici.aktualni_stav = aktualni_stav
-                        existujici.datum_aktualizace = datetime.utcnow()
-                    else:
-                        nova = MonthlyBudgetItem(
-                            budget_item_id=polozka_id,
-                            mesic=mesic,
-                            rok=rok,
-                            aktualni_stav=aktualni_stav
-                        )
-                        db.session.add(nova)
+                    aktualni_stavy[polozka_id] = Decimal(str(aktualni_stav_str)) if aktualni_stav_str else None
             
-            db.session.commit()
-            flash(f'Měsíční stav pro {rok}/{mesic:02d} byl uložen', 'success')
-            return redirect(url_for('budget.mesicni_stav', mesic=mesic, rok=rok))
+            result = BudgetExecutor.ulozit_mesicni_stavy(hlavni_rozpocet.id, mesic, rok, aktualni_stavy)
+            if result['success']:
+                flash(result['message'], 'success')
+                return redirect(url_for('budget.mesicni_stav', mesic=mesic, rok=rok))
+            flash(f'Chyba při ukládání: {result["error"]}', 'danger')
         except Exception as e:
             db.session.rollback()
             flash(f'Chyba při ukládání: {str(e)}', 'danger')
@@ -600,15 +560,9 @@ def mesicni_stav():
         aktivni=True
     ).order_by(BudgetItem.typ.desc(), BudgetItem.ucet).all()
     
-    # Načti měsíční stavy pro všechny položky
-    mesicni_stavy = {}
-    for polozka in polozky:
-        stav = MonthlyBudgetItem.query.filter_by(
-            budget_item_id=polozka.id,
-            mesic=mesic,
-            rok=rok
-        ).first()
-        mesicni_stavy[polozka.id] = stav
+    # Načti měsíční stavy pro všechny položky jedním dotazem
+    stavy = BudgetExecutor.get_mesicni_stavy([p.id for p in polozky], mesic, rok)
+    mesicni_stavy = {polozka.id: stavy.get(polozka.id) for polozka in polozky}
     
     # Statistiky pro měsíc
     statistiky = BudgetExecutor.get_mesicni_statistiky(hlavni_rozpocet.id, mesic, rok)
@@ -645,16 +599,18 @@ def mesicni_prehledy():
         'Červenec', 'Srpen', 'Září', 'Říjen', 'Listopad', 'Prosinec'
     ]
     
+    # Všech 12 měsíců i celý rok jedním výpočtem
+    statistiky_roku = BudgetExecutor.get_statistiky_roku(hlavni_rozpocet.id, rok)
+    
     for mesic in range(1, 13):
-        statistiky = BudgetExecutor.get_mesicni_statistiky(hlavni_rozpocet.id, mesic, rok)
         mesicni_data.append({
             'mesic': mesic,
             'nazev': nazvy_mesicu[mesic - 1],
-            'statistiky': statistiky
+            'statistiky': statistiky_roku['mesice'][mesic]
         })
     
     # Celkové statistiky za rok
-    celkove_statistiky = BudgetExecutor.get_rocni_statistiky(hlavni_rozpocet.id, rok)
+    celkove_statistiky = statistiky_roku['rok']
     
     return render_template(
         'budget/mesicni_prehledy.html',
@@ -669,6 +625,7 @@ def mesicni_prehledy():
 @budget_bp.route('/polozka/<int:polozka_id>/mesicni-aktualizace', methods=['GET', 'POST'])
 def mesicni_aktualizace(polozka_id):
     """Měsíční aktualizace stavu položky rozpočtu"""
+    from decimal import Decimal
     from .models import MonthlyBudgetItem
     
     polozka = BudgetItem.query.get_or_404(polozka_id)
@@ -704,6 +661,7 @@ def mesicni_aktualizace(polozka_id):
                 db.session.add(nova)
                 flash(f'Měsíční aktualizace pro {rok}/{mesic:02d} byla přidána', 'success')
             
+            BudgetExecutor.prepocitat_souhrn_polozky(polozka_id, mesic, rok)
             db.session.commit()
             return redirect(url_for('budget.seznam_polozek'))
         except Exception as e:
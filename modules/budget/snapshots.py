@@ -0,0 +1,362 @@
+"""
+Budget Snapshots - Roční snímky rozpočtu pro meziroční porovnání
+
+Snímek roku je dvojice souborů vedle databáze (BUDGET_SNAPSHOT_DIR):
+- rozpocet_<rok>.json - metadata a dimenze (položky: účet, podúčet,
+  popis, typ, kategorie; kategorie)
+- rozpocet_<rok>.bin - hodnoty položek jako pole float64 (array('d')),
+  po řádcích: rozpočet, skutečnost v měsících 1-12, skutečnost za rok
+
+Snímek se vytvoří při uzavření roku (hlavní rozpočet se přepne na pozdější
+rok) a na vyžádání. Porovnání uzavřených let pak čte jen soubory - načtené
+snímky drží v paměti podle času změny souboru - a živých tabulek se nedotkne.
+Otevřený rok (rok hlavního rozpočtu a pozdější) se do souboru automaticky
+neukládá - jeho data se ještě mění, a tak se pro porovnání sestaví živě
+a ve výsledku je označen jako předběžný.
+"""
+
+import json
+import os
+from array import array
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Iterable, List, Optional
+
+from core import db
+
+# Hodnoty jednoho řádku (položky) ve snímku
+SLOUPCE = ['rozpocet'] + [f'm{m}' for m in range(1, 13)] + ['skutecnost']
+SIRKA = len(SLOUPCE)
+
+# Podle čeho lze porovnávat
+SESKUPENI = ('ucet', 'poducet', 'kategorie')
+
+
+class Snapshot:
+    """Načtený snímek roku - dimenze a hodnoty po položkách"""
+    
+    def __init__(self, meta: Dict, hodnoty: array):
+        self.meta = meta
+        self.hodnoty = hodnoty
+    
+    @property
+    def rok(self) -> int:
+        return self.meta['rok']
+    
+    def radek(self, i: int) -> array:
+        return self.hodnoty[i * SIRKA:(i + 1) * SIRKA]
+
+
+class SnapshotStore:
+    """Zápis, načítání a porovnání ročních snímků"""
+    
+    def __init__(self, adresar: Optional[str] = None):
+        self.adresar = adresar
+        self._nactene: Dict[int, tuple] = {}  # rok -> (mtime, Snapshot)
+        self._lock = Lock()
+    
+    def init_app(self, app):
+        """Nastaví adresář snímků podle konfigurace aplikace"""
+        app.extensions['budget_snapshots'] = self
+        self.adresar = app.config.get('BUDGET_SNAPSHOT_DIR', self.adresar)
+    
+    def _cesta(self, rok: int, pripona: str) -> str:
+        return os.path.join(self.adresar, f'rozpocet_{rok}.{pripona}')
+    
+    def existuje(self, rok: int) -> bool:
+        return os.path.exists(self._cesta(rok, 'json')) and os.path.exists(self._cesta(rok, 'bin'))
+    
+    def dostupne_roky(self) -> List[int]:
+        """Roky, pro které existuje snímek"""
+        if not self.adresar or not os.path.isdir(self.adresar):
+            return []
+        roky = []
+        for nazev in os.listdir(self.adresar):
+            if nazev.startswith('rozpocet_') and nazev.endswith('.json'):
+                rok = nazev[len('rozpocet_'):-len('.json')]
+                if rok.isdigit() and self.existuje(int(rok)):
+                    roky.append(int(rok))
+        return sorted(roky)
+    
+    # ------------------------------------------------------------------------
+    # Vytvoření snímku
+    # ------------------------------------------------------------------------
+    
+    def vytvor(self, budget) -> Dict:
+        """Sestaví snímek rozpočtu ze živých tabulek a zapíše ho (přepíše starší)"""
+        snimek = self._sestav(budget)
+        self._zapis(budget.rok, snimek.meta, snimek.hodnoty)
+        return {
+            "success": True,
+            "message": f"Snímek rozpočtu {budget.rok} uložen ({len(snimek.meta['polozky'])} položek)",
+            "rok": budget.rok
+        }
+    
+    @staticmethod
+    def _sestav(budget) -> Snapshot:
+        """
+        Sestaví snímek rozpočtu ze živých tabulek (bez zápisu)
+        
+        Pět dotazů bez ohledu na počet položek: položky, kategorie, souhrny
+        nákladů po měsících (BudgetItemTotal), přijaté výnosy po měsících
+        (RevenueSchedule) a za rok. Hodnoty odpovídají get_statistiky_roku.
+        """
+        from sqlalchemy import func
+        from .models import BudgetItem, BudgetCategory, BudgetItemTotal, Revenue, RevenueSchedule
+        
+        rok = budget.rok
+        polozky = BudgetItem.query.with_entities(
+            BudgetItem.id, BudgetItem.ucet, BudgetItem.poducet, BudgetItem.popis,
+            BudgetItem.typ, BudgetItem.category_id, BudgetItem.castka
+        ).filter(
+            BudgetItem.budget_id == budget.id,
+            BudgetItem.aktivni == True
+        ).order_by(BudgetItem.ucet, BudgetItem.poducet, BudgetItem.id).all()
+        
+        kategorie = BudgetCategory.query.with_entities(
+            BudgetCategory.id, BudgetCategory.nazev, BudgetCategory.typ
+        ).filter(BudgetCategory.budget_id == budget.id).all()
+        
+        # Náklady - měsíční stav přepíše ruční výdaje (stejně jako get_statistiky_roku)
+        naklady: Dict[int, Dict[int, tuple]] = {}
+        for polozka_id, mesic, vydaje, aktualni_stav, souhrnne in db.session.query(
+            BudgetItemTotal.budget_item_id, BudgetItemTotal.mesic, BudgetItemTotal.vydaje,
+            BudgetItemTotal.aktualni_stav, BudgetItemTotal.souhrnne_vydaje
+        ).join(
+            BudgetItem, BudgetItemTotal.budget_item_id == BudgetItem.id
+        ).filter(
+            BudgetItem.budget_id == budget.id,
+            BudgetItemTotal.rok == rok
+        ).all():
+            naklady.setdefault(polozka_id, {})[mesic] = (
+                float(aktualni_stav) if aktualni_stav is not None else None,
+                float(vydaje or 0) + float(souhrnne or 0)
+            )
+        
+        vynosy: Dict[int, Dict[int, float]] = {}
+        for polozka_id, mesic, soucet in db.session.query(
+            Revenue.budget_item_id, RevenueSchedule.mesic, func.sum(RevenueSchedule.castka)
+        ).join(
+            Revenue, RevenueSchedule.revenue_id == Revenue.id
+        ).filter(
+            Revenue.budget_id == budget.id,
+            Revenue.budget_item_id.isnot(None),
+            Revenue.skutecne_prijato == True,
+            RevenueSchedule.rok == rok
+        ).group_by(Revenue.budget_item_id, RevenueSchedule.mesic).all():
+            vynosy.setdefault(polozka_id, {})[mesic] = float(soucet or 0)
+        
+        # Za rok se každý přijatý výnos počítá jednou (stejně jako get_statistiky_roku)
+        vynosy_rok = {
+            polozka_id: float(soucet or 0)
+            for polozka_id, soucet in db.session.query(
+                Revenue.budget_item_id, func.sum(Revenue.castka)
+            ).filter(
+                Revenue.budget_id == budget.id,
+                Revenue.budget_item_id.isnot(None),
+                Revenue.skutecne_prijato == True,
+                Revenue.rok == rok
+            ).group_by(Revenue.budget_item_id).all()
+        }
+        
+        hodnoty = array('d')
+        for p in polozky:
+            mesice = [0.0] * 12
+            skutecnost = 0.0
+            if p.typ == 'naklad':
+                souhrny = naklady.get(p.id, {})
+                posledni_stav = None
+                for mesic in range(1, 13):
+                    if mesic not in souhrny:
+                        continue
+                    stav, vydaje = souhrny[mesic]
+                    if stav is not None:
+                        mesice[mesic - 1] = stav
+                        posledni_stav = stav
+                    else:
+                        mesice[mesic - 1] = vydaje
+                # Za rok platí aktuální stav z nejnovějšího měsíce, jinak součet měsíců
+                skutecnost = posledni_stav if posledni_stav is not None else sum(mesice)
+            else:
+                for mesic, soucet in vynosy.get(p.id, {}).items():
+                    mesice[mesic - 1] = soucet
+                skutecnost = vynosy_rok.get(p.id, 0.0)
+            hodnoty.extend([float(p.castka or 0)] + mesice + [skutecnost])
+        
+        meta = {
+            'rok': rok,
+            'budget_id': budget.id,
+            'nazev': budget.nazev,
+            'vytvoreno': datetime.utcnow().isoformat(),
+            'sloupce': SLOUPCE,
+            'polozky': [[p.id, p.ucet, p.poducet, p.popis, p.typ, p.category_id] for p in polozky],
+            'kategorie': {str(k.id): [k.nazev, k.typ] for k in kategorie}
+        }
+        return Snapshot(meta, hodnoty)
+    
+    def _zapis(self, rok: int, meta: Dict, hodnoty: array):
+        # Zápis do dočasných souborů a přejmenování - čtenář nikdy nevidí rozepsaný snímek
+        os.makedirs(self.adresar, exist_ok=True)
+        with open(self._cesta(rok, 'bin.tmp'), 'wb') as f:
+            hodnoty.tofile(f)
+        with open(self._cesta(rok, 'json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(self._cesta(rok, 'bin.tmp'), self._cesta(rok, 'bin'))
+        os.replace(self._cesta(rok, 'json.tmp'), self._cesta(rok, 'json'))
+    
+    # ------------------------------------------------------------------------
+    # Načtení a porovnání
+    # ------------------------------------------------------------------------
+    
+    def nacti(self, rok: int) -> Optional[Snapshot]:
+        """Načte snímek roku (z paměti, pokud se soubor od posledního načtení nezměnil)"""
+        if not self.existuje(rok):
+            return None
+        mtime = os.path.getmtime(self._cesta(rok, 'json'))
+        with self._lock:
+            nacteny = self._nactene.get(rok)
+            if nacteny and nacteny[0] == mtime:
+                return nacteny[1]
+        
+        with open(self._cesta(rok, 'json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        hodnoty = array('d')
+        with open(self._cesta(rok, 'bin'), 'rb') as f:
+            hodnoty.frombytes(f.read())
+        snimek = Snapshot(meta, hodnoty)
+        
+        with self._lock:
+            self._nactene[rok] = (mtime, snimek)
+        return snimek
+    
+    @staticmethod
+    def _klic(snimek: Snapshot, polozka: list, podle: str) -> tuple:
+        """(klíč, název) skupiny, do které položka patří"""
+        _, ucet, poducet, popis, _, category_id = polozka
+        if podle == 'kategorie':
+            # Kategorie jsou v každém rozpočtu nové záznamy - mezi roky se páruje podle názvu
+            kategorie = snimek.meta['kategorie'].get(str(category_id))
+            nazev = kategorie[0] if kategorie else 'Bez kategorie'
+            return nazev, nazev
+        if podle == 'poducet' and poducet:
+            return f"{ucet}/{poducet}", popis
+        return ucet, popis
+    
+    @staticmethod
+    def otevreny_rok() -> int:
+        """První rok, který ještě není uzavřený - rok hlavního rozpočtu (jinak letošní)"""
+        from .models import Budget
+        
+        hlavni = Budget.query.with_entities(Budget.rok).filter_by(hlavni=True).order_by(Budget.rok).first()
+        return hlavni.rok if hlavni else datetime.utcnow().year
+    
+    def zajisti(self, rok: int, otevreny_rok: Optional[int] = None) -> Optional[Snapshot]:
+        """
+        Snímek roku pro porovnání
+        
+        Uzavřený rok se čte ze souboru; chybí-li, vytvoří se a uloží. Otevřený
+        rok se sestaví živě bez uložení (meta['predbezny']), aby uložený snímek
+        nezamrzl na datech z doby prvního porovnání.
+        """
+        if otevreny_rok is None:
+            otevreny_rok = self.otevreny_rok()
+        if rok < otevreny_rok:
+            snimek = self.nacti(rok)
+            if snimek is not None:
+                return snimek
+        from .models import Budget
+        
+        budget = Budget.query.filter_by(rok=rok, aktivni=True).order_by(Budget.hlavni.desc(), Budget.id).first()
+        if budget is None:
+            return None
+        if rok >= otevreny_rok:
+            snimek = self._sestav(budget)
+            snimek.meta['predbezny'] = True
+            return snimek
+        self.vytvor(budget)
+        return self.nacti(rok)
+    
+    def porovnani(self, roky: Iterable[int], podle: str = 'ucet', typ: Optional[str] = None,
+                  mesice: bool = False) -> Dict:
+        """
+        Meziroční porovnání po účtech, podúčtech nebo kategoriích - jen ze snímků
+        
+        Args:
+            roky: porovnávané roky
+            podle: 'ucet', 'poducet' nebo 'kategorie'
+            typ: jen 'naklad' nebo 'vynos' (None = obojí)
+            mesice: přidat i skutečnost po měsících
+        
+        Chybějící snímek uzavřeného roku se vytvoří, pokud rozpočet daného roku
+        existuje. Otevřené roky se sestaví živě (viz zajisti).
+        
+        Returns:
+            dict: roky, chybi (roky bez snímku), predbezne (otevřené roky),
+            radky (skupiny s hodnotami po letech a změnou mezi prvním
+            a posledním rokem) a celkem po letech a typech
+        """
+        if podle not in SESKUPENI:
+            raise ValueError(f"Neznámé seskupení '{podle}' (povoleno: {', '.join(SESKUPENI)})")
+        
+        roky = sorted(set(roky))
+        snimky = {}
+        chybi = []
+        otevreny_rok = self.otevreny_rok()
+        for rok in roky:
+            snimek = self.zajisti(rok, otevreny_rok)
+            if snimek is None:
+                chybi.append(rok)
+            else:
+                snimky[rok] = snimek
+        
+        skupiny: Dict[tuple, Dict] = {}
+        celkem = {rok: {t: {'rozpocet': 0.0, 'skutecnost': 0.0} for t in ('naklad', 'vynos')} for rok in snimky}
+        for rok, snimek in snimky.items():
+            for i, polozka in enumerate(snimek.meta['polozky']):
+                typ_polozky = polozka[4]
+                if typ and typ_polozky != typ:
+                    continue
+                klic, nazev = self._klic(snimek, polozka, podle)
+                skupina = skupiny.setdefault((typ_polozky, klic), {
+                    'klic': klic, 'nazev': nazev, 'typ': typ_polozky, 'roky': {}
+                })
+                hodnoty = snimek.radek(i)
+                rocni = skupina['roky'].setdefault(rok, {'rozpocet': 0.0, 'skutecnost': 0.0})
+                rocni['rozpocet'] += hodnoty[0]
+                rocni['skutecnost'] += hodnoty[-1]
+                if mesice:
+                    soucty = rocni.setdefault('mesice', [0.0] * 12)
+                    for m in range(12):
+                        soucty[m] += hodnoty[1 + m]
+                soucet = celkem[rok].setdefault(typ_polozky, {'rozpocet': 0.0, 'skutecnost': 0.0})
+                soucet['rozpocet'] += hodnoty[0]
+                soucet['skutecnost'] += hodnoty[-1]
+        
+        radky = []
+        dostupne = sorted(snimky)
+        for skupina in sorted(skupiny.values(), key=lambda s: (s['typ'], str(s['klic']))):
+            if len(dostupne) >= 2:
+                prvni = skupina['roky'].get(dostupne[0], {'rozpocet': 0.0, 'skutecnost': 0.0})
+                posledni = skupina['roky'].get(dostupne[-1], {'rozpocet': 0.0, 'skutecnost': 0.0})
+                skupina['zmena'] = {
+                    'rozpocet': posledni['rozpocet'] - prvni['rozpocet'],
+                    'skutecnost': posledni['skutecnost'] - prvni['skutecnost'],
+                    'skutecnost_procent': ((posledni['skutecnost'] - prvni['skutecnost']) / prvni['skutecnost'] * 100)
+                    if prvni['skutecnost'] else None
+                }
+            radky.append(skupina)
+        
+        return {
+            'roky': dostupne,
+            'chybi': chybi,
+            'predbezne': [rok for rok in dostupne if snimky[rok].meta.get('predbezny')],
+            'podle': podle,
+            'typ': typ,
+            'vytvoreno': {rok: snimky[rok].meta['vytvoreno'] for rok in dostupne},
+            'radky': radky,
+            'celkem': celkem
+        }
+
+
+# Sdílená instance - konfiguruje se v app.py
+snapshot_store = SnapshotStore()
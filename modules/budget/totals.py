@@ -0,0 +1,152 @@
+"""
+Budget Totals - Součty rozpočtu jedním SQL dotazem
+
+Budget.celkove_vydaje, celkove_vynosy, planovane_vynosy, zbytek,
+procento_vycerpano a bilance dřív každá zvlášť načítala celé relace
+vydaje/vynosy a sčítala castka v Pythonu. Teď čtou jeden souhrn, který
+spočítá podmíněné součty (SUM(CASE ...)) na straně databáze - pro jeden
+i více rozpočtů jedním dotazem.
+
+Souhrny se pamatují v session.info, tedy po dobu jednoho požadavku
+(session se na konci požadavku zahazuje). Zápis do expense/revenue/budget
+v téže session (flush i hromadný update/delete) i rollback je zahodí.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable
+
+from sqlalchemy import and_, case, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from core import db
+
+# Klíč v session.info - budget_id -> souhrn
+_SOUHRNY = '_souhrny_rozpoctu'
+
+# Zápis do těchto tabulek mění souhrny
+_TABULKY = {'budget', 'expense', 'revenue'}
+
+PRAZDNY_SOUHRN = {'vydaje': 0.0, 'vynosy': 0.0, 'planovane_vynosy': 0.0}
+
+
+class BudgetTotals:
+    """Souhrny rozpočtů (výdaje, výnosy, plánované výnosy) s pamětí na požadavek"""
+    
+    def __init__(self):
+        self._registrovano = False
+    
+    def init_app(self, app):
+        """Napojí zahazování souhrnů při zápisu na SQLAlchemy session (jen jednou)"""
+        app.extensions['budget_totals'] = self
+        if self._registrovano:
+            return
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(Session, 'do_orm_execute', self._do_orm_execute)
+        event.listen(Session, 'after_rollback', self._zahod)
+        self._registrovano = True
+    
+    # ------------------------------------------------------------------------
+    # Výpočet
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def spocitej(budget_ids: Iterable[int]) -> Dict[int, Dict[str, float]]:
+        """
+        Spočítá souhrny rozpočtů jedním dotazem (korelované poddotazy se SUM(CASE ...))
+        
+        - vydaje: výdaje s datem do dneška
+        - vynosy: skutečně přijaté výnosy (jednorázové do dneška, pravidelné vždy)
+        - planovane_vynosy: naplánované výnosy včetně budoucích
+        """
+        from .models import Budget, Expense, Revenue
+        
+        budget_ids = list(budget_ids)
+        if not budget_ids:
+            return {}
+        dnes = datetime.utcnow()
+        
+        vydaje = select(
+            func.sum(case((Expense.datum <= dnes, Expense.castka), else_=0))
+        ).where(Expense.budget_id == Budget.id).correlate(Budget).scalar_subquery()
+        
+        prijato = and_(
+            Revenue.skutecne_prijato == True,
+            or_(
+                Revenue.typ == 'pravidelny',
+                and_(Revenue.typ == 'jednorazovy', Revenue.datum <= dnes)
+            )
+        )
+        vynosy = select(
+            func.sum(case((prijato, Revenue.castka), else_=0))
+        ).where(Revenue.budget_id == Budget.id).correlate(Budget).scalar_subquery()
+        planovane = select(
+            func.sum(case((Revenue.naplanovano == True, Revenue.castka), else_=0))
+        ).where(Revenue.budget_id == Budget.id).correlate(Budget).scalar_subquery()
+        
+        radky = db.session.query(Budget.id, vydaje, vynosy, planovane) \
+            .filter(Budget.id.in_(budget_ids)).all()
+        return {
+            budget_id: {
+                'vydaje': float(v or 0),
+                'vynosy': float(r or 0),
+                'planovane_vynosy': float(p or 0)
+            }
+            for budget_id, v, r, p in radky
+        }
+    
+    def nacti(self, budget_ids: Iterable[int]):
+        """Předem načte souhrny více rozpočtů jedním dotazem (seznamy rozpočtů)"""
+        if not self._registrovano:
+            return
+        pamet = db.session.info.setdefault(_SOUHRNY, {})
+        chybi = [i for i in budget_ids if i is not None and i not in pamet]
+        if chybi:
+            pamet.update(self.spocitej(chybi))
+    
+    def get(self, budget_id: int) -> Dict[str, float]:
+        """Souhrn rozpočtu - v rámci požadavku se počítá jen jednou"""
+        if budget_id is None:
+            return dict(PRAZDNY_SOUHRN)
+        # Bez napojení na session (skripty mimo app.py) by se zápisy nepoznaly
+        if not self._registrovano:
+            return self.spocitej([budget_id]).get(budget_id, PRAZDNY_SOUHRN)
+        # Neuložené změny výdajů/výnosů - souhrn se spočítá znovu (dotaz změny nejdřív flushne)
+        if self._ma_zmeny(db.session):
+            self._zahod(db.session)
+        pamet = db.session.info.setdefault(_SOUHRNY, {})
+        if budget_id not in pamet:
+            pamet.update(self.spocitej([budget_id]))
+        return pamet.get(budget_id, PRAZDNY_SOUHRN)
+    
+    # ------------------------------------------------------------------------
+    # Zahazování při zápisu
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def _zahod(session, *args):
+        session.info.pop(_SOUHRNY, None)
+    
+    @staticmethod
+    def _ma_zmeny(session) -> bool:
+        if _SOUHRNY not in session.info:
+            return False
+        return any(
+            getattr(obj, '__tablename__', None) in _TABULKY
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        )
+    
+    def _after_flush(self, session, flush_context):
+        if self._ma_zmeny(session):
+            self._zahod(session)
+    
+    def _do_orm_execute(self, orm_execute_state):
+        # Hromadné insert/update/delete mimo unit of work
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        tabulka = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(tabulka, 'name', None) in _TABULKY:
+            self._zahod(orm_execute_state.session)
+
+
+# Sdílená instance - napojuje se v app.py
+budget_totals = BudgetTotals()
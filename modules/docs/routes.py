@@ -2,7 +2,7 @@
 Routes pro modul Dokumentace
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, abort
 from datetime import datetime
 from core import db
 from .models import ChangeLog
@@ -138,3 +138,66 @@ def smazat_changelog(log_id):
     
     flash('Log změny byl smazán', 'success')
     return redirect(url_for('docs.changelog'))
+
+
+# ============================================================================
+# PROFILOVÁNÍ
+# ============================================================================
+
+def _je_admin() -> bool:
+    """Je přihlášený uživatel administrátor?"""
+    current_user_id = session.get('current_user_id')
+    if not current_user_id:
+        return False
+    from modules.users.models import User
+    user = User.query.get(current_user_id)
+    return bool(user and user.role == 'admin')
+
+
+@docs_bp.route('/profilovani')
+def profilovani():
+    """Profilování - počty SQL dotazů a časy endpointů (pouze admin)"""
+    if not _je_admin():
+        abort(403)
+    from core.profiling import sql_profiler
+    return render_template('docs/profilovani.html', stats=sql_profiler.get_stats())
+
+
+@docs_bp.route('/profilovani.json')
+def profilovani_json():
+    """API: statistiky profilování jako JSON (pouze admin)"""
+    if not _je_admin():
+        abort(403)
+    from core.profiling import sql_profiler
+    return jsonify(sql_profiler.get_stats())
+
+
+@docs_bp.route('/profilovani/reset', methods=['POST'])
+def profilovani_reset():
+    """Vynulování statistik profilování"""
+    if not _je_admin():
+        abort(403)
+    from core.profiling import sql_profiler
+    sql_profiler.reset()
+    flash('Statistiky profilování byly vynulovány', 'success')
+    return redirect(url_for('docs.profilovani'))
+
+
+@docs_bp.route('/ai-spotreba')
+def ai_spotreba():
+    """Spotřeba tokenů AI asistenta po dnech, zaměstnancích, relacích a projektech (pouze admin)"""
+    if not _je_admin():
+        abort(403)
+    from modules.ai.usage import usage_ledger
+    dny = min(max(request.args.get('dny', 30, type=int), 1), 365)
+    return render_template('docs/ai_spotreba.html', report=usage_ledger.report(dny))
+
+
+@docs_bp.route('/ai-spotreba.json')
+def ai_spotreba_json():
+    """API: spotřeba tokenů AI asistenta jako JSON (pouze admin)"""
+    if not _je_admin():
+        abort(403)
+    from modules.ai.usage import usage_ledger
+    dny = min(max(request.args.get('dny', 30, type=int), 1), 365)
+    return jsonify(usage_ledger.report(dny))
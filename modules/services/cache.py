@@ -0,0 +1,114 @@
+"""
+Services Cache - Cache předpočítaného kalendáře služeb
+
+Kalendář se mění jen při úpravách rozpisu, proto se sestavené měsíce
+a přehled hodin drží v paměti procesu a zahazují se při každém zápisu
+do služeb (výjimky, výměny, šablony, úpravy služeb). Měsíce i přehled
+obsahují jména a údaje zaměstnanců, a tak cache zahodí i potvrzený zápis
+do zamestnanec_oon odkudkoli (modul personálu, AI asistent).
+"""
+
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Klíč v session.info - v transakci proběhl zápis do dat kalendáře
+_ZMENA = '_zmena_kalendare'
+
+# Zápis do těchto tabulek mění kalendář
+_TABULKY = {'zamestnanec_oon', 'sluzba', 'sluzba_template', 'sluzba_vynimka', 'sluzba_vymena'}
+
+
+class KalendarCache:
+    """Jednoduchá cache kalendáře s počítadly zásahů a výpadků"""
+    
+    def __init__(self, max_polozek: int = 32):
+        self.max_polozek = max_polozek
+        self._data: Dict[Hashable, Any] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidace = 0
+        self._registrovano = False
+    
+    def init_app(self, app):
+        """Napojí zahazování cache po zápisu do zaměstnanců a služeb na SQLAlchemy session (jen jednou)"""
+        app.extensions['services_kalendar_cache'] = self
+        if self._registrovano:
+            return
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(Session, 'do_orm_execute', self._do_orm_execute)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+        self._registrovano = True
+    
+    def get_or_build(self, klic: Hashable, sestav: Callable[[], Any]) -> Any:
+        """Vrátí hodnotu z cache, nebo ji sestaví funkcí `sestav` a uloží"""
+        with self._lock:
+            if klic in self._data:
+                self.hits += 1
+                return self._data[klic]
+            self.misses += 1
+            generace = self.invalidace
+        
+        hodnota = sestav()
+        
+        with self._lock:
+            if generace != self.invalidace:
+                # Během sestavení proběhl zápis - hodnotu neukládej
+                return hodnota
+            if len(self._data) >= self.max_polozek:
+                # Zahoď nejstarší záznam (dict drží pořadí vložení)
+                self._data.pop(next(iter(self._data)))
+            self._data[klic] = hodnota
+        return hodnota
+    
+    def invalidate(self):
+        """Zahodí celý obsah cache"""
+        with self._lock:
+            self._data.clear()
+            self.invalidace += 1
+    
+    def stats(self) -> Dict:
+        """Vrátí počítadla cache"""
+        with self._lock:
+            dotazy = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / dotazy * 100) if dotazy else 0.0,
+                "invalidace": self.invalidace,
+                "polozek": len(self._data)
+            }
+    
+    # ------------------------------------------------------------------------
+    # Háčky SQLAlchemy
+    # ------------------------------------------------------------------------
+    
+    def _after_flush(self, session, flush_context):
+        if any(
+            getattr(obj, '__tablename__', None) in _TABULKY
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        ):
+            session.info[_ZMENA] = True
+    
+    def _do_orm_execute(self, orm_execute_state):
+        # Hromadné insert/update/delete mimo unit of work
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        tabulka = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(tabulka, 'name', None) in _TABULKY:
+            orm_execute_state.session.info[_ZMENA] = True
+    
+    def _after_commit(self, session):
+        if session.info.pop(_ZMENA, False):
+            self.invalidate()
+    
+    def _after_rollback(self, session):
+        session.info.pop(_ZMENA, None)
+
+
+# Sdílená instance pro modul služeb - napojuje se v app.py
+kalendar_cache = KalendarCache()
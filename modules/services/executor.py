@@ -5,10 +5,12 @@ Services Executor - Logika pro správu služeb
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional
 from calendar import monthrange
+from functools import lru_cache
 import json
 
 from core import db
 from .models import SluzbaTemplate, Sluzba, SluzbaVynimka, SluzbaVymena
+from .cache import kalendar_cache
 
 
 class ServicesExecutor:
@@ -57,6 +59,7 @@ class ServicesExecutor:
             
             db.session.add(template)
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             
             # Vygeneruj služby od dneška rok dopředu
             ServicesExecutor._generate_sluzby_from_template(template.id)
@@ -158,6 +161,7 @@ class ServicesExecutor:
             # Rotující služby se ukládají bez šablony (nemají název)
             
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             
             return {
                 "success": True,
@@ -192,6 +196,7 @@ class ServicesExecutor:
             
             db.session.add(template)
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             
             # Vygeneruj služby od dneška rok dopředu
             ServicesExecutor._generate_sluzby_from_template(template.id)
@@ -206,18 +211,25 @@ class ServicesExecutor:
             return {"success": False, "error": str(e)}
     
     @staticmethod
-    def _generate_sluzby_from_template(template_id: int, start_date: date = None, end_date: date = None):
+    def _generate_sluzby_from_template(template_id: int, start_date: date = None, end_date: date = None,
+                                       dry_run: bool = False, commit: bool = True) -> Dict:
         """Vygeneruje služby z šablony od start_date do end_date (defaultně od dneška rok dopředu)
         
         POZOR: Pro rotující služby se služby negenerují automaticky - jsou vytvořeny při vytvoření šablony!
+        
+        Cílová data se počítají krokem po týdnech, existující služby se načtou jedním
+        dotazem do množiny a chybějící se vloží hromadně. S dry_run=True se nic
+        neukládá a vrátí se jen seznam služeb, které by vznikly.
         """
+        from sqlalchemy import insert
+        
         template = SluzbaTemplate.query.get(template_id)
         if not template:
-            return
+            return {"success": False, "error": f"Šablona ID {template_id} neexistuje"}
         
         # Rotující služby se negenerují automaticky - jsou vytvořeny při vytvoření šablony
         if template.typ == 'rotujici':
-            return
+            return {"success": True, "vytvoreno": 0, "sluzby": []}
         
         # Pokud není zadáno, použij od dneška rok dopředu
         if start_date is None:
@@ -225,15 +237,46 @@ class ServicesExecutor:
         if end_date is None:
             end_date = start_date + timedelta(days=365)
         
-        current_date = start_date
-        rotujici_index = 0
-        
-        # Pro nedělní služby - spočítej, kolik služeb už bylo vygenerováno před start_date
-        # (aby rotace pokračovala správně)
+        # Dny v týdnu, pro které šablona generuje (úterý je zavřeno)
+        dny = {template.den_v_tydnu} if template.den_v_tydnu is not None else set()
         if template.typ == 'nedele':
+            dny.add(6)
+        dny.discard(1)
+        
+        # Všechna cílová data - od prvního výskytu dne v týdnu po sedmi dnech
+        datumy = []
+        for den in dny:
+            current_date = start_date + timedelta(days=(den - start_date.weekday()) % 7)
+            while current_date <= end_date:
+                datumy.append(current_date)
+                current_date += timedelta(days=7)
+        datumy.sort()
+        
+        # Zaměstnanci pro jednotlivá data
+        planovane = []  # (datum, zamestnanec_id, hodina_od, hodina_do)
+        if template.typ == 'fixni':
+            # Pro fixní službu - použij seznam zaměstnanců z fixni_zamestnanci
+            zamestnanci_pro_den = template.fixni_zamestnanci_list
+            if not zamestnanci_pro_den and template.zamestnanec_id:
+                # Zpětná kompatibilita
+                zamestnanci_pro_den = [{
+                    'zamestnanec_id': template.zamestnanec_id,
+                    'hodina_od': template.hodina_od,
+                    'hodina_do': template.hodina_do
+                }]
+            for datum in datumy:
+                for zam_data in zamestnanci_pro_den:
+                    planovane.append((
+                        datum,
+                        zam_data.get('zamestnanec_id'),
+                        zam_data.get('hodina_od', template.hodina_od),
+                        zam_data.get('hodina_do', template.hodina_do)
+                    ))
+        elif template.typ == 'nedele':
             zamestnanci_ids = template.rotujici_seznam_ids
             if zamestnanci_ids:
-                # Najdi poslední službu před start_date pro tuto šablonu
+                # Rotace pokračuje za poslední službou před start_date
+                rotujici_index = 0
                 last_sluzba = Sluzba.query.filter(
                     Sluzba.template_id == template_id,
                     Sluzba.datum < start_date
@@ -246,89 +289,127 @@ class ServicesExecutor:
                         rotujici_index = (last_index + 1) % len(zamestnanci_ids)
                     except ValueError:
                         rotujici_index = 0
-        
-        while current_date <= end_date:
-            den_v_tydnu = current_date.weekday()  # 0=pondělí, 6=neděle
-            
-            # Úterý je zavřeno - přeskoč
-            if den_v_tydnu == 1:
-                current_date += timedelta(days=1)
-                continue
-            
-            # Zkontroluj, zda má šablona službu pro tento den
-            if template.den_v_tydnu == den_v_tydnu or (template.typ == 'nedele' and den_v_tydnu == 6):
-                # Urči zaměstnance
-                zamestnanci_pro_den = []
                 
-                if template.typ == 'fixni':
-                    # Pro fixní službu - použij seznam zaměstnanců z fixni_zamestnanci
-                    fixni_zamestnanci = template.fixni_zamestnanci_list
-                    if fixni_zamestnanci:
-                        zamestnanci_pro_den = fixni_zamestnanci
-                    elif template.zamestnanec_id:
-                        # Zpětná kompatibilita
-                        zamestnanci_pro_den = [{
-                            'zamestnanec_id': template.zamestnanec_id,
-                            'hodina_od': template.hodina_od,
-                            'hodina_do': template.hodina_do
-                        }]
-                elif template.typ == 'nedele':
-                    zamestnanci_ids = template.rotujici_seznam_ids
-                    if zamestnanci_ids:
-                        zamestnanec_id = zamestnanci_ids[rotujici_index % len(zamestnanci_ids)]
-                        rotujici_index += 1
-                        zamestnanci_pro_den = [{
-                            'zamestnanec_id': zamestnanec_id,
-                            'hodina_od': template.hodina_od,
-                            'hodina_do': template.hodina_do
-                        }]
+                # Neděle, která už službu šablony má, se přeskočí a rotace se
+                # na ní znovu ukotví - jinak by se doplněné neděle rozjely
+                # s již vygenerovanými a den by dostal druhého zaměstnance
+                obsazene = dict(db.session.query(
+                    Sluzba.datum, Sluzba.zamestnanec_id
+                ).filter(
+                    Sluzba.template_id == template_id,
+                    Sluzba.oddeleni == template.oddeleni,
+                    Sluzba.datum >= start_date,
+                    Sluzba.datum <= end_date
+                ).all())
                 
-                # Vytvoř službu pro každého zaměstnance
-                for zam_data in zamestnanci_pro_den:
-                    zamestnanec_id = zam_data.get('zamestnanec_id')
-                    hodina_od = zam_data.get('hodina_od', template.hodina_od)
-                    hodina_do = zam_data.get('hodina_do', template.hodina_do)
-                    
-                    if zamestnanec_id:
-                        # Zkontroluj, zda už služba neexistuje pro tohoto zaměstnance v tento den
-                        existing = Sluzba.query.filter_by(
-                            datum=current_date,
-                            oddeleni=template.oddeleni,
-                            zamestnanec_id=zamestnanec_id,
-                            template_id=template_id
-                        ).first()
-                        
-                        if not existing:
-                            sluzba = Sluzba(
-                                template_id=template_id,
-                                datum=current_date,
-                                den_v_tydnu=den_v_tydnu,
-                                oddeleni=template.oddeleni,
-                                hodina_od=hodina_od,
-                                hodina_do=hodina_do,
-                                zamestnanec_id=zamestnanec_id,
-                                typ=template.typ
-                            )
-                            db.session.add(sluzba)
-            
-            current_date += timedelta(days=1)
-        
-        db.session.commit()
+                for datum in datumy:
+                    if datum in obsazene:
+                        if obsazene[datum] in zamestnanci_ids:
+                            rotujici_index = zamestnanci_ids.index(obsazene[datum]) + 1
+                        continue
+                    planovane.append((
+                        datum,
+                        zamestnanci_ids[rotujici_index % len(zamestnanci_ids)],
+                        template.hodina_od,
+                        template.hodina_do
+                    ))
+                    rotujici_index += 1
+        
+        # Existující služby šablony v období - jedním dotazem
+        existujici = set(db.session.query(
+            Sluzba.datum, Sluzba.oddeleni, Sluzba.zamestnanec_id
+        ).filter(
+            Sluzba.template_id == template_id,
+            Sluzba.datum >= start_date,
+            Sluzba.datum <= end_date
+        ).all())
+        
+        nove = []
+        for datum, zamestnanec_id, hodina_od, hodina_do in planovane:
+            klic = (datum, template.oddeleni, zamestnanec_id)
+            if not zamestnanec_id or klic in existujici:
+                continue
+            existujici.add(klic)
+            nove.append({
+                "template_id": template_id,
+                "datum": datum,
+                "den_v_tydnu": datum.weekday(),
+                "oddeleni": template.oddeleni,
+                "hodina_od": hodina_od,
+                "hodina_do": hodina_do,
+                "zamestnanec_id": zamestnanec_id,
+                "typ": template.typ
+            })
+        
+        if dry_run:
+            return {
+                "success": True,
+                "vytvoreno": 0,
+                "k_vytvoreni": len(nove),
+                "sluzby": [dict(s, datum=s['datum'].isoformat()) for s in nove]
+            }
+        
+        if nove:
+            db.session.execute(insert(Sluzba), nove)
+        if commit:
+            db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
+        
+        return {"success": True, "vytvoreno": len(nove), "sluzby": []}
     
     @staticmethod
-    def _apply_vynimky_to_sluzba(sluzba_dict: Dict) -> Dict:
-        """Aplikuje výjimky na službu - pokud existuje aktivní výjimka, použije ji"""
-        sluzba_id = sluzba_dict.get('id')
-        datum = date.fromisoformat(sluzba_dict['datum'])
-        
-        # Najdi aktivní výjimku pro tuto službu
-        vynimka = SluzbaVynimka.query.filter_by(
-            sluzba_id=sluzba_id,
-            aktivni=True
-        ).first()
+    def regenerovat_sluzby_roku(rok: int, dry_run: bool = False) -> Dict:
+        """Doplní chybějící služby ze všech aktivních šablon pro celý rok (v jedné transakci)"""
+        from sqlalchemy import func
         
+        try:
+            templates = SluzbaTemplate.query.filter(
+                SluzbaTemplate.aktivni == True,
+                SluzbaTemplate.typ != 'rotujici'
+            ).all()
+            
+            celkem = 0
+            podle_sablon = {}
+            for template in templates:
+                # Šablona se nedoplňuje do doby před svým vznikem (ani před
+                # první službou, pokud byla vygenerována zpětně)
+                zacatek = template.datum_vytvoreni.date() if template.datum_vytvoreni else date(rok, 1, 1)
+                prvni_sluzba = db.session.query(func.min(Sluzba.datum)).filter(
+                    Sluzba.template_id == template.id
+                ).scalar()
+                if prvni_sluzba and prvni_sluzba < zacatek:
+                    zacatek = prvni_sluzba
+                zacatek = max(zacatek, date(rok, 1, 1))
+                if zacatek > date(rok, 12, 31):
+                    podle_sablon[template.id] = 0
+                    continue
+                
+                result = ServicesExecutor._generate_sluzby_from_template(
+                    template.id, zacatek, date(rok, 12, 31), dry_run=dry_run, commit=False
+                )
+                pocet = result.get('k_vytvoreni', 0) if dry_run else result.get('vytvoreno', 0)
+                podle_sablon[template.id] = pocet
+                celkem += pocet
+            
+            if not dry_run:
+                db.session.commit()
+                ServicesExecutor.invalidate_kalendar_cache()
+            
+            return {
+                "success": True,
+                "message": f"{'Bylo by vytvořeno' if dry_run else 'Vytvořeno'} {celkem} služeb pro rok {rok}",
+                "celkem": celkem,
+                "podle_sablon": podle_sablon,
+                "dry_run": dry_run
+            }
+        except Exception as e:
+            db.session.rollback()
+            return {"success": False, "error": str(e)}
+    
+    @staticmethod
+    def _apply_vynimka(sluzba_dict: Dict, vynimka: Optional[SluzbaVynimka]) -> Dict:
+        """Přepíše slovník služby daty z výjimky (pokud je výjimka zadána)"""
         if vynimka:
-            # Použij data z výjimky
             sluzba_dict['hodina_od'] = vynimka.hodina_od
             sluzba_dict['hodina_do'] = vynimka.hodina_do
             sluzba_dict['zamestnanec_id'] = vynimka.zamestnanec_id
@@ -343,34 +424,53 @@ class ServicesExecutor:
         return sluzba_dict
     
     @staticmethod
-    def get_sluzby_od_do(start_date: date, end_date: date, filtrovat_oddeleni: List[str] = None, filtrovat_typy: List[str] = None) -> Dict:
-        """Vrátí všechny služby od start_date do end_date, seskupené podle měsíců a roků (s aplikovanými výjimkami)"""
-        query = Sluzba.query.filter(
-            Sluzba.datum >= start_date,
-            Sluzba.datum <= end_date
-        )
+    def _apply_vynimky_to_sluzba(sluzba_dict: Dict) -> Dict:
+        """Aplikuje výjimky na službu - pokud existuje aktivní výjimka, použije ji"""
+        # Najdi aktivní výjimku pro tuto službu
+        vynimka = SluzbaVynimka.query.filter_by(
+            sluzba_id=sluzba_dict.get('id'),
+            aktivni=True
+        ).first()
+        
+        return ServicesExecutor._apply_vynimka(sluzba_dict, vynimka)
+    
+    @staticmethod
+    def _get_sluzby_s_vynimkami(start_date: date, end_date: date, filtrovat_oddeleni: List[str] = None, filtrovat_typy: List[str] = None) -> List[Dict]:
+        """
+        Vrátí služby v období jako slovníky s aplikovanými výjimkami, seřazené podle data.
+        
+        Zaměstnanci se načtou společně se službami a všechny aktivní výjimky období
+        jedním dotazem, takže počet dotazů nezávisí na počtu služeb.
+        """
+        from sqlalchemy.orm import joinedload
+        
+        filtry = [Sluzba.datum >= start_date, Sluzba.datum <= end_date]
         
         # Filtrování podle oddělení
         if filtrovat_oddeleni:
-            query = query.filter(Sluzba.oddeleni.in_(filtrovat_oddeleni))
+            filtry.append(Sluzba.oddeleni.in_(filtrovat_oddeleni))
         
         # Filtrování podle typů
         if filtrovat_typy:
-            query = query.filter(Sluzba.typ.in_(filtrovat_typy))
-        
-        sluzby = query.order_by(Sluzba.datum.asc()).all()
+            filtry.append(Sluzba.typ.in_(filtrovat_typy))
+        
+        sluzby = Sluzba.query.options(
+            joinedload(Sluzba.zamestnanec)
+        ).filter(*filtry).order_by(Sluzba.datum.asc()).all()
+        
+        # Aktivní výjimky pro služby v období - {sluzba_id: první výjimka}
+        vynimky = {}
+        for vynimka in SluzbaVynimka.query.options(
+            joinedload(SluzbaVynimka.zamestnanec)
+        ).join(
+            Sluzba, SluzbaVynimka.sluzba_id == Sluzba.id
+        ).filter(
+            SluzbaVynimka.aktivni == True, *filtry
+        ).order_by(SluzbaVynimka.id):
+            vynimky.setdefault(vynimka.sluzba_id, vynimka)
         
-        # Seskup podle roků a měsíců a aplikuj výjimky
-        # Struktura: {rok: {mesic: [sluzby]}}
-        mesice = {}
+        result = []
         for sluzba in sluzby:
-            rok = sluzba.datum.year
-            mesic = sluzba.datum.month
-            key = f"{rok}-{mesic:02d}"  # Klíč ve formátu "2025-01"
-            
-            if key not in mesice:
-                mesice[key] = []
-            
             sluzba_dict = {
                 "id": sluzba.id,
                 "datum": sluzba.datum.isoformat(),
@@ -391,65 +491,96 @@ class ServicesExecutor:
             }
             
             # Aplikuj výjimky
-            sluzba_dict = ServicesExecutor._apply_vynimky_to_sluzba(sluzba_dict)
-            
-            mesice[key].append(sluzba_dict)
+            result.append(ServicesExecutor._apply_vynimka(sluzba_dict, vynimky.get(sluzba.id)))
+        
+        return result
+    
+    @staticmethod
+    def get_sluzby_od_do(start_date: date, end_date: date, filtrovat_oddeleni: List[str] = None, filtrovat_typy: List[str] = None) -> Dict:
+        """Vrátí všechny služby od start_date do end_date, seskupené podle měsíců a roků (s aplikovanými výjimkami)"""
+        sluzby = ServicesExecutor._get_sluzby_s_vynimkami(start_date, end_date, filtrovat_oddeleni, filtrovat_typy)
+        
+        # Seskup podle roků a měsíců - klíč ve formátu "2025-01"
+        mesice = {}
+        for sluzba_dict in sluzby:
+            mesice.setdefault(sluzba_dict['datum'][:7], []).append(sluzba_dict)
         
         return mesice
     
     @staticmethod
     def get_sluzby_pro_rok(rok: int = 2026, filtrovat_oddeleni: List[str] = None, filtrovat_typy: List[str] = None) -> Dict:
         """Vrátí všechny služby pro daný rok, seskupené podle měsíců (s aplikovanými výjimkami)"""
-        start_date = date(rok, 1, 1)
-        end_date = date(rok, 12, 31)
-        
-        query = Sluzba.query.filter(
-            Sluzba.datum >= start_date,
-            Sluzba.datum <= end_date
-        )
+        sluzby = ServicesExecutor._get_sluzby_s_vynimkami(date(rok, 1, 1), date(rok, 12, 31), filtrovat_oddeleni, filtrovat_typy)
         
-        # Filtrování podle oddělení
-        if filtrovat_oddeleni:
-            query = query.filter(Sluzba.oddeleni.in_(filtrovat_oddeleni))
-        
-        # Filtrování podle typů
-        if filtrovat_typy:
-            query = query.filter(Sluzba.typ.in_(filtrovat_typy))
+        # Seskup podle měsíců
+        mesice = {}
+        for sluzba_dict in sluzby:
+            mesice.setdefault(int(sluzba_dict['datum'][5:7]), []).append(sluzba_dict)
         
-        sluzby = query.order_by(Sluzba.datum.asc()).all()
+        return mesice
+    
+    # ========================================================================
+    # CACHE KALENDÁŘE
+    # ========================================================================
+    
+    @staticmethod
+    def invalidate_kalendar_cache():
+        """Zahodí předpočítaný kalendář - volá se po každém zápisu do služeb"""
+        kalendar_cache.invalidate()
+    
+    @staticmethod
+    def get_kalendar_cache_stats() -> Dict:
+        """Vrátí počítadla cache kalendáře (hits/misses)"""
+        return kalendar_cache.stats()
+    
+    @staticmethod
+    def get_kalendar(start_date: date, end_date: date, filtrovat_oddeleni: List[str] = None, filtrovat_typy: List[str] = None) -> Dict:
+        """
+        Vrátí kalendář služeb pro období - měsíce (jako get_sluzby_od_do) a přehled
+        hodin zaměstnanců za měsíc start_date. Výsledek se drží v cache až do
+        dalšího zápisu do služeb.
+        """
+        klic = (
+            start_date, end_date,
+            tuple(sorted(filtrovat_oddeleni or [])),
+            tuple(sorted(filtrovat_typy or []))
+        )
         
-        # Seskup podle měsíců a aplikuj výjimky
-        mesice = {}
-        for sluzba in sluzby:
-            mesic = sluzba.datum.month
-            if mesic not in mesice:
-                mesice[mesic] = []
-            
-            sluzba_dict = {
-                "id": sluzba.id,
-                "datum": sluzba.datum.isoformat(),
-                "den_v_tydnu": sluzba.den_v_tydnu,
-                "den_nazev": sluzba.den_nazev,
-                "oddeleni": sluzba.oddeleni,
-                "hodina_od": sluzba.hodina_od,
-                "hodina_do": sluzba.hodina_do,
-                "zamestnanec_id": sluzba.zamestnanec_id,
-                "zamestnanec": {
-                    "id": sluzba.zamestnanec.id,
-                    "jmeno_plne": sluzba.zamestnanec.jmeno_plne
-                } if sluzba.zamestnanec else None,
-                "typ": sluzba.typ,
-                "poznamka": sluzba.poznamka,
-                "je_vynimka": False,
-                "je_vymena": sluzba.je_vymena or False
+        def sestav():
+            from modules.personnel.models import ZamestnanecAOON
+            
+            mesice = ServicesExecutor.get_sluzby_od_do(start_date, end_date, filtrovat_oddeleni, filtrovat_typy)
+            
+            # Hodiny podle typu a zaměstnance za měsíc start_date
+            prehled = {}
+            for sluzba in mesice.get(f'{start_date.year}-{start_date.month:02d}', []):
+                zam_id = sluzba.get('zamestnanec_id')
+                typ = sluzba.get('typ', '')
+                if zam_id and typ in ('fixni', 'rotujici', 'nedele'):
+                    minuty = (ServicesExecutor._cas_na_minuty(sluzba.get('hodina_do') or '16:00')
+                              - ServicesExecutor._cas_na_minuty(sluzba.get('hodina_od') or '08:00'))
+                    hodiny = prehled.setdefault(zam_id, {'fixni': 0.0, 'rotujici': 0.0, 'nedele': 0.0})
+                    hodiny[typ] += max(0.0, minuty / 60.0)
+            
+            # Jména zaměstnanců jedním dotazem
+            jmena = {}
+            if prehled:
+                jmena = {
+                    z.id: z.jmeno_plne
+                    for z in ZamestnanecAOON.query.filter(ZamestnanecAOON.id.in_(list(prehled.keys())))
+                }
+            prehled_sluzeb = {
+                zam_id: {'jmeno': jmena[zam_id], 'hours': hodiny}
+                for zam_id, hodiny in prehled.items() if zam_id in jmena
             }
             
-            # Aplikuj výjimky
-            sluzba_dict = ServicesExecutor._apply_vynimky_to_sluzba(sluzba_dict)
-            
-            mesice[mesic].append(sluzba_dict)
+            return {
+                'mesice': mesice,
+                # Seřaď podle jména
+                'prehled_sluzeb': dict(sorted(prehled_sluzeb.items(), key=lambda x: x[1]['jmeno']))
+            }
         
-        return mesice
+        return kalendar_cache.get_or_build(klic, sestav)
     
     @staticmethod
     def get_sluzby_pro_mesic(rok: int, mesic: int) -> List[Dict]:
@@ -520,6 +651,7 @@ class ServicesExecutor:
             # Smaž šablonu
             db.session.delete(template)
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             
             return {"success": True, "message": f"Šablona '{template.nazev}' byla smazána"}
         except Exception as e:
@@ -540,6 +672,7 @@ class ServicesExecutor:
                 sluzba.poznamka = poznamka
             
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             return {"success": True, "message": "Služba byla upravena"}
         except Exception as e:
             db.session.rollback()
@@ -572,6 +705,7 @@ class ServicesExecutor:
             db.session.add(vynimka)
             sluzba.je_vynimka = True
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             
             return {"success": True, "message": "Výjimka byla vytvořena", "vynimka_id": vynimka.id}
         except Exception as e:
@@ -594,6 +728,7 @@ class ServicesExecutor:
                     sluzba.je_vynimka = False
             
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             return {"success": True, "message": "Výjimka byla smazána"}
         except Exception as e:
             db.session.rollback()
@@ -625,6 +760,7 @@ class ServicesExecutor:
             
             db.session.add(vymena)
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             
             return {"success": True, "message": "Výměna byla vytvořena (čeká na schválení)", "vymena_id": vymena.id}
         except Exception as e:
@@ -658,6 +794,7 @@ class ServicesExecutor:
             
             vymena.schvaleno = True
             db.session.commit()
+            ServicesExecutor.invalidate_kalendar_cache()
             
             return {"success": True, "message": "Výměna byla schválena a provedena"}
         except Exception as e:
@@ -665,122 +802,114 @@ class ServicesExecutor:
             return {"success": False, "error": str(e)}
     
     @staticmethod
-    def get_statistiky_zamestnance(zamestnanec_id: int, rok: int = 2026) -> Dict:
-        """Vrátí statistiky služeb pro zaměstnance (počet hodin za týden/měsíc/rok)"""
+    @lru_cache(maxsize=512)
+    def _cas_na_minuty(hodina: str) -> int:
+        """Převede čas 'HH:MM' na minuty od půlnoci (převody se cachují)"""
+        try:
+            h, m = hodina.split(':')
+            return int(h) * 60 + int(m)
+        except (AttributeError, ValueError):
+            return 0
+    
+    @staticmethod
+    def get_statistiky_zamestnance(zamestnanec_id: int, rok: int = 2026, do_roku: int = None) -> Dict:
+        """
+        Vrátí statistiky služeb pro zaměstnance (počet hodin za týden/měsíc/rok)
+        
+        Hodnoty 'rok' a 'pocet' pokrývají celé období rok..do_roku (výchozí jen `rok`).
+        Služby i výjimky se načtou dvěma dotazy, časy se převedou na minuty jednou
+        a součty se počítají nad sloupci (datum, typ, minuty) bez dalších dotazů.
+        """
+        from sqlalchemy import or_
+        
+        do_roku = do_roku or rok
         start_date = date(rok, 1, 1)
-        end_date = date(rok, 12, 31)
+        end_date = date(do_roku, 12, 31)
         
-        # Získej všechny služby zaměstnance (včetně výjimek)
-        sluzby = Sluzba.query.filter(
+        # 1. Služby zaměstnance v období
+        sluzby = db.session.query(
+            Sluzba.id, Sluzba.datum, Sluzba.typ, Sluzba.hodina_od, Sluzba.hodina_do
+        ).filter(
             Sluzba.datum >= start_date,
             Sluzba.datum <= end_date,
             Sluzba.zamestnanec_id == zamestnanec_id
         ).all()
         
-        # Získej výjimky, kde je zaměstnanec náhradník
-        vynimky = SluzbaVynimka.query.filter(
-            SluzbaVynimka.datum >= start_date,
-            SluzbaVynimka.datum <= end_date,
-            SluzbaVynimka.zamestnanec_id == zamestnanec_id,
-            SluzbaVynimka.aktivni == True
+        # 2. Aktivní výjimky - na služby zaměstnance i ty, kde je zaměstnanec náhradník
+        vynimky = db.session.query(
+            SluzbaVynimka.sluzba_id, SluzbaVynimka.datum, SluzbaVynimka.zamestnanec_id,
+            SluzbaVynimka.hodina_od, SluzbaVynimka.hodina_do, Sluzba.typ
+        ).join(
+            Sluzba, SluzbaVynimka.sluzba_id == Sluzba.id
+        ).filter(
+            SluzbaVynimka.aktivni == True,
+            or_(
+                SluzbaVynimka.sluzba_id.in_([s.id for s in sluzby]),
+                (SluzbaVynimka.zamestnanec_id == zamestnanec_id) &
+                (SluzbaVynimka.datum >= start_date) &
+                (SluzbaVynimka.datum <= end_date)
+            )
         ).all()
         
-        def pocet_hodin(hodina_od: str, hodina_do: str) -> float:
-            """Vypočítá počet hodin mezi dvěma časy"""
-            try:
-                from datetime import datetime
-                od = datetime.strptime(hodina_od, '%H:%M')
-                do = datetime.strptime(hodina_do, '%H:%M')
-                diff = do - od
-                return diff.total_seconds() / 3600.0
-            except:
-                return 0.0
-        
-        # Statistiky podle typu
-        statistiky = {
-            'fixni': {'tyden': 0, 'mesic': 0, 'rok': 0, 'pocet': 0},
-            'rotujici': {'tyden': 0, 'mesic': 0, 'rok': 0, 'pocet': 0},
-            'nedele': {'tyden': 0, 'mesic': 0, 'rok': 0, 'pocet': 0},
-            'celkem': {'tyden': 0, 'mesic': 0, 'rok': 0, 'pocet': 0}
-        }
+        # Služby s aktivní výjimkou se nepočítají - za výjimku se počítá náhradník
+        # (stejně jako v get_sluzby_pro_zamestnance)
+        sluzby_s_vynimkou = {v.sluzba_id for v in vynimky}
         
-        # Aktuální týden a měsíc
+        minuty = ServicesExecutor._cas_na_minuty
+        datumy = []
+        typy = []
+        delky = []
+        for sluzba in sluzby:
+            if sluzba.id not in sluzby_s_vynimkou:
+                datumy.append(sluzba.datum.toordinal())
+                typy.append(sluzba.typ)
+                delky.append(minuty(sluzba.hodina_do) - minuty(sluzba.hodina_od))
+        for vynimka in vynimky:
+            if vynimka.zamestnanec_id == zamestnanec_id and start_date <= vynimka.datum <= end_date:
+                datumy.append(vynimka.datum.toordinal())
+                typy.append(vynimka.typ)
+                delky.append(minuty(vynimka.hodina_do) - minuty(vynimka.hodina_od))
+        
+        # Aktuální týden a měsíc (mimo období se bere 1. leden prvního roku)
         today = date.today()
-        if today.year != rok:
-            today = date(rok, 1, 1)
+        if not start_date <= today <= end_date:
+            today = start_date
         
-        # Začátek aktuálního týdne (pondělí)
-        days_since_monday = today.weekday()
-        week_start = today - timedelta(days=days_since_monday)
+        week_start = today - timedelta(days=today.weekday())
         week_end = week_start + timedelta(days=6)
-        
-        # Aktuální měsíc
         month_start = date(today.year, today.month, 1)
-        days_in_month = monthrange(today.year, today.month)[1]
-        month_end = date(today.year, today.month, days_in_month)
+        month_end = date(today.year, today.month, monthrange(today.year, today.month)[1])
         
-        # Zpracuj služby
-        for sluzba in sluzby:
-            # Zkontroluj, zda není výjimka
-            vynimka = SluzbaVynimka.query.filter_by(sluzba_id=sluzba.id, aktivni=True).first()
-            if vynimka:
-                # Pokud je výjimka, použij data z výjimky
-                hodiny = pocet_hodin(vynimka.hodina_od, vynimka.hodina_do)
-            else:
-                hodiny = pocet_hodin(sluzba.hodina_od, sluzba.hodina_do)
-            
-            typ = sluzba.typ
-            if typ not in statistiky:
-                typ = 'celkem'
-            
-            statistiky[typ]['rok'] += hodiny
-            statistiky[typ]['pocet'] += 1
-            statistiky['celkem']['rok'] += hodiny
-            statistiky['celkem']['pocet'] += 1
-            
-            # Týden
-            if week_start <= sluzba.datum <= week_end:
-                statistiky[typ]['tyden'] += hodiny
-                statistiky['celkem']['tyden'] += hodiny
-            
-            # Měsíc
-            if month_start <= sluzba.datum <= month_end:
-                statistiky[typ]['mesic'] += hodiny
-                statistiky['celkem']['mesic'] += hodiny
-        
-        # Zpracuj výjimky (kde je zaměstnanec náhradník)
-        for vynimka in vynimky:
-            hodiny = pocet_hodin(vynimka.hodina_od, vynimka.hodina_do)
-            
-            # Zjisti typ služby
-            sluzba = Sluzba.query.get(vynimka.sluzba_id)
-            if sluzba:
-                typ = sluzba.typ
-                if typ not in statistiky:
-                    typ = 'celkem'
-                
-                statistiky[typ]['rok'] += hodiny
-                statistiky[typ]['pocet'] += 1
-                statistiky['celkem']['rok'] += hodiny
-                statistiky['celkem']['pocet'] += 1
-                
-                # Týden
-                if week_start <= vynimka.datum <= week_end:
-                    statistiky[typ]['tyden'] += hodiny
-                    statistiky['celkem']['tyden'] += hodiny
-                
-                # Měsíc
-                if month_start <= vynimka.datum <= month_end:
-                    statistiky[typ]['mesic'] += hodiny
-                    statistiky['celkem']['mesic'] += hodiny
+        tyden_od, tyden_do = week_start.toordinal(), week_end.toordinal()
+        mesic_od, mesic_do = month_start.toordinal(), month_end.toordinal()
+        v_tydnu = [tyden_od <= d <= tyden_do for d in datumy]
+        v_mesici = [mesic_od <= d <= mesic_do for d in datumy]
+        
+        def soucty(maska: List[bool]) -> Dict:
+            """Součty hodin, počet a týden/měsíc pro služby vybrané maskou"""
+            return {
+                'tyden': sum(m for m, vyber, t in zip(delky, maska, v_tydnu) if vyber and t) / 60.0,
+                'mesic': sum(m for m, vyber, t in zip(delky, maska, v_mesici) if vyber and t) / 60.0,
+                'rok': sum(m for m, vyber in zip(delky, maska) if vyber) / 60.0,
+                'pocet': sum(maska)
+            }
+        
+        # Neznámé typy se započítají jen do celku
+        statistiky = {
+            typ: soucty([t == typ for t in typy])
+            for typ in ('fixni', 'rotujici', 'nedele')
+        }
+        statistiky['celkem'] = soucty([True] * len(typy))
         
         return statistiky
     
     @staticmethod
-    def get_sluzby_pro_zamestnance(zamestnanec_id: int, rok: int = 2026) -> List[Dict]:
-        """Vrátí všechny služby zaměstnance (včetně výjimek)"""
+    def get_sluzby_pro_zamestnance(zamestnanec_id: int, rok: int = 2026, do_roku: int = None) -> List[Dict]:
+        """Vrátí všechny služby zaměstnance (včetně výjimek) za rok, případně za roky rok..do_roku"""
+        from sqlalchemy.orm import joinedload
+        
         start_date = date(rok, 1, 1)
-        end_date = date(rok, 12, 31)
+        end_date = date(do_roku or rok, 12, 31)
         
         # Získej služby, kde je zaměstnanec přiřazen
         sluzby = Sluzba.query.filter(
@@ -789,8 +918,20 @@ class ServicesExecutor:
             Sluzba.zamestnanec_id == zamestnanec_id
         ).order_by(Sluzba.datum.asc()).all()
         
-        # Získej výjimky, kde je zaměstnanec náhradník
-        vynimky = SluzbaVynimka.query.filter(
+        # Služby zaměstnance, které mají aktivní výjimku - jedním dotazem
+        sluzby_s_vynimkou = set()
+        if sluzby:
+            sluzby_s_vynimkou = {
+                sluzba_id for (sluzba_id,) in db.session.query(SluzbaVynimka.sluzba_id).filter(
+                    SluzbaVynimka.sluzba_id.in_([s.id for s in sluzby]),
+                    SluzbaVynimka.aktivni == True
+                )
+            }
+        
+        # Získej výjimky, kde je zaměstnanec náhradník (i s původní službou)
+        vynimky = SluzbaVynimka.query.options(
+            joinedload(SluzbaVynimka.sluzba)
+        ).filter(
             SluzbaVynimka.datum >= start_date,
             SluzbaVynimka.datum <= end_date,
             SluzbaVynimka.zamestnanec_id == zamestnanec_id,
@@ -801,10 +942,7 @@ class ServicesExecutor:
         
         # Přidej služby
         for sluzba in sluzby:
-            # Zkontroluj, zda není výjimka
-            vynimka = SluzbaVynimka.query.filter_by(sluzba_id=sluzba.id, aktivni=True).first()
-            
-            if not vynimka:  # Pouze pokud není výjimka (výjimky přidáme zvlášť)
+            if sluzba.id not in sluzby_s_vynimkou:  # Pouze pokud není výjimka (výjimky přidáme zvlášť)
                 result.append({
                     "id": sluzba.id,
                     "datum": sluzba.datum.isoformat(),
@@ -818,18 +956,14 @@ class ServicesExecutor:
                 })
         
         # Přidej výjimky
+        dny = ['Pondělí', 'Úterý', 'Středa', 'Čtvrtek', 'Pátek', 'Sobota', 'Neděle']
         for vynimka in vynimky:
-            sluzba = Sluzba.query.get(vynimka.sluzba_id)
-            # Získej název dne v týdnu
-            den_nazev = ''
-            if vynimka.datum:
-                dny = ['Pondělí', 'Úterý', 'Středa', 'Čtvrtek', 'Pátek', 'Sobota', 'Neděle']
-                den_nazev = dny[vynimka.datum.weekday()] if 0 <= vynimka.datum.weekday() < 7 else ''
+            sluzba = vynimka.sluzba
             
             result.append({
                 "id": vynimka.sluzba_id,
                 "datum": vynimka.datum.isoformat() if vynimka.datum else '',
-                "den_nazev": den_nazev,
+                "den_nazev": dny[vynimka.datum.weekday()] if vynimka.datum else '',
                 "oddeleni": vynimka.oddeleni,
                 "hodina_od": vynimka.hodina_od,
                 "hodina_do": vynimka.hodina_do,
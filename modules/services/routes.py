@@ -12,6 +12,14 @@ from .executor import ServicesExecutor
 services_bp = Blueprint('services', __name__, url_prefix='/sluzby')
 
 
+@services_bp.after_request
+def invalidovat_kalendar(response):
+    """Po zápisu (POST) zahoď cache kalendáře - routy upravují služby i přímo"""
+    if request.method == 'POST' and response.status_code < 400:
+        ServicesExecutor.invalidate_kalendar_cache()
+    return response
+
+
 @services_bp.route('/')
 def index():
     """Hlavní stránka - kalendář služeb od dneška rok dopředu"""
@@ -19,12 +27,9 @@ def index():
     start_date = dnes
     end_date = dnes + timedelta(days=365)  # Rok dopředu
     
-    # Získej služby od dneška rok dopředu
-    mesice = ServicesExecutor.get_sluzby_od_do(start_date, end_date)
-    
-    # Získej seznam zaměstnanců pro formuláře
-    from modules.personnel.models import ZamestnanecAOON
-    zamestnanci = ZamestnanecAOON.query.filter_by(aktivni=True).order_by(ZamestnanecAOON.prijmeni).all()
+    # Získej služby od dneška rok dopředu a přehled hodin (z cache kalendáře)
+    kalendar = ServicesExecutor.get_kalendar(start_date, end_date)
+    mesice = kalendar['mesice']
     
     # Názvy měsíců
     nazvy_mesicu = [
@@ -61,50 +66,6 @@ def index():
     # Přehled služeb pro aktuální měsíc
     aktualni_mesic = dnes.month
     aktualni_rok = dnes.year
-    mesic_key = f'{aktualni_rok}-{aktualni_mesic:02d}'
-    sluzby_aktualni_mesic = mesice.get(mesic_key, [])
-    
-    # Funkce pro výpočet hodin z časů
-    def vypocitej_hodiny(hodina_od_str, hodina_do_str):
-        """Vypočítá počet hodin mezi dvěma časy"""
-        try:
-            from datetime import datetime
-            if not hodina_od_str or not hodina_do_str:
-                return 0.0
-            od = datetime.strptime(hodina_od_str, '%H:%M')
-            do = datetime.strptime(hodina_do_str, '%H:%M')
-            rozdil = do - od
-            hodiny = rozdil.total_seconds() / 3600
-            return max(0.0, hodiny)
-        except:
-            return 0.0
-    
-    # Spočítej hodiny podle typu a zaměstnance
-    from collections import defaultdict
-    prehled_sluzeb = defaultdict(lambda: {'fixni': 0.0, 'rotujici': 0.0, 'nedele': 0.0})
-    
-    for sluzba in sluzby_aktualni_mesic:
-        if sluzba.get('zamestnanec_id'):
-            zam_id = sluzba['zamestnanec_id']
-            typ = sluzba.get('typ', '')
-            if typ in ['fixni', 'rotujici', 'nedele']:
-                hodina_od = sluzba.get('hodina_od', '08:00')
-                hodina_do = sluzba.get('hodina_do', '16:00')
-                hodiny = vypocitej_hodiny(hodina_od, hodina_do)
-                prehled_sluzeb[zam_id][typ] += hodiny
-    
-    # Získej všechny zaměstnance, kteří mají nějaké služby (včetně těch s nedělními)
-    prehled_sluzeb_jmena = {}
-    for zam_id, hours in prehled_sluzeb.items():
-        zamestnanec = ZamestnanecAOON.query.get(zam_id)
-        if zamestnanec:
-            prehled_sluzeb_jmena[zam_id] = {
-                'jmeno': zamestnanec.jmeno_plne,
-                'hours': hours
-            }
-    
-    # Seřaď podle jména
-    prehled_sluzeb_jmena = dict(sorted(prehled_sluzeb_jmena.items(), key=lambda x: x[1]['jmeno']))
     
     return render_template(
         'services/index.html',
@@ -114,7 +75,7 @@ def index():
         mesice=mesice,
         mesice_k_zobrazeni=mesice_k_zobrazeni,
         nazvy_mesicu=nazvy_mesicu,
-        prehled_sluzeb=prehled_sluzeb_jmena,
+        prehled_sluzeb=kalendar['prehled_sluzeb'],
         aktualni_mesic=nazvy_mesicu[aktualni_mesic - 1],
         aktualni_rok=aktualni_rok,
         date=date,
@@ -124,6 +85,12 @@ def index():
     )
 
 
+@services_bp.route('/api/cache-stats')
+def api_cache_stats():
+    """API: počítadla cache kalendáře"""
+    return jsonify(ServicesExecutor.get_kalendar_cache_stats())
+
+
 @services_bp.route('/spravce')
 def spravce():
     """Správce služeb - hlavní stránka"""
@@ -156,10 +123,31 @@ def spravce():
         'services/spravce.html',
         fixni=fixni,
         rotujici=rotujici,
-        nedelni=nedelni
+        nedelni=nedelni,
+        aktualni_rok=date.today().year
     )
 
 
+@services_bp.route('/spravce/regenerovat', methods=['POST'])
+def regenerovat_sluzby():
+    """Doplnění chybějících služeb roku ze šablon - náhled (dry run) nebo provedení"""
+    try:
+        rok = int(request.form.get('rok', date.today().year))
+    except ValueError:
+        flash('Neplatný rok', 'danger')
+        return redirect(url_for('services.spravce'))
+    
+    nahled = request.form.get('akce') != 'provest'
+    result = ServicesExecutor.regenerovat_sluzby_roku(rok, dry_run=nahled)
+    
+    if result['success']:
+        flash(result['message'], 'info' if nahled else 'success')
+    else:
+        flash(f"Chyba: {result['error']}", 'danger')
+    
+    return redirect(url_for('services.spravce'))
+
+
 @services_bp.route('/novy/fixni', methods=['GET', 'POST'])
 def novy_fixni():
     """Vytvoření nové fixní služby s možností více zaměstnanců"""
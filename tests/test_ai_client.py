@@ -0,0 +1,191 @@
+"""
+Testy HTTP klienta Claude API proti lokálnímu stub serveru
+
+Stub server (http.server na náhodném portu) vrací předem připravené
+odpovědi a zaznamenává přijaté požadavky. Čekání mezi pokusy je nahrazeno
+záznamem do seznamu, takže testy neběží déle než je nutné.
+
+Spuštění:
+    $ python -m pytest tests
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules.ai.client import ClaudeClient, CircuitBreaker, ClaudeAPIError, CircuitOpenError
+
+
+class StubServer:
+    """Lokální HTTP server s frontou připravených odpovědí (status, hlavičky, tělo)"""
+    
+    def __init__(self):
+        self.odpovedi = []
+        self.pozadavky = []
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                delka = int(self.headers.get('content-length', 0))
+                stub.pozadavky.append((self.path, json.loads(self.rfile.read(delka) or b'{}')))
+                status, hlavicky, telo = stub.odpovedi.pop(0) if stub.odpovedi else (500, {}, b'')
+                if isinstance(telo, (dict, list)):
+                    telo = json.dumps(telo).encode('utf-8')
+                self.send_response(status)
+                for nazev, hodnota in hlavicky.items():
+                    self.send_header(nazev, hodnota)
+                self.send_header('content-length', str(len(telo)))
+                self.end_headers()
+                self.wfile.write(telo)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.vlakno = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.vlakno.start()
+    
+    def zastav(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+ODPOVED_OK = {"content": [{"type": "text", "text": "Ahoj"}], "usage": {"input_tokens": 3, "output_tokens": 1}}
+
+
+class ClientTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.stub = StubServer()
+        self.cekani = []
+        self.klient = self._klient()
+    
+    def tearDown(self):
+        self.klient.session.close()
+        self.stub.zastav()
+    
+    def _klient(self, **kwargs) -> ClaudeClient:
+        kwargs.setdefault('max_retries', 3)
+        klient = ClaudeClient(base_url=self.stub.url, connect_timeout=2.0, read_timeout=5.0, **kwargs)
+        klient.spanek = self.cekani.append
+        return klient
+
+
+class TestOpakovani(ClientTestCase):
+    
+    def test_uspech_vrati_json(self):
+        self.stub.odpovedi = [(200, {}, ODPOVED_OK)]
+        self.assertEqual(self.klient.messages({"model": "m"}, 'klic'), ODPOVED_OK)
+        self.assertEqual(len(self.stub.pozadavky), 1)
+        self.assertEqual(self.stub.pozadavky[0][0], '/v1/messages')
+    
+    def test_opakuje_429_a_503_podle_retry_after(self):
+        self.stub.odpovedi = [
+            (429, {'retry-after': '2'}, {"error": {"message": "rate limit"}}),
+            (503, {'retry-after': '0.5'}, b'nedostupne'),
+            (200, {}, ODPOVED_OK),
+        ]
+        self.assertEqual(self.klient.messages({}, 'klic'), ODPOVED_OK)
+        self.assertEqual(len(self.stub.pozadavky), 3)
+        self.assertEqual(self.cekani, [2.0, 0.5])
+        self.assertEqual(self.klient.breaker.stav, 'closed')
+    
+    def test_retry_after_omezeno_backoff_max(self):
+        self.klient = self._klient(backoff_max=5.0)
+        self.stub.odpovedi = [(429, {'retry-after': '120'}, b''), (200, {}, ODPOVED_OK)]
+        self.klient.messages({}, 'klic')
+        self.assertEqual(self.cekani, [5.0])
+    
+    def test_po_vycerpani_pokusu_vyhodi_posledni_chybu(self):
+        self.stub.odpovedi = [(503, {}, b'')] * 4
+        with self.assertRaises(ClaudeAPIError) as ctx:
+            self.klient.messages({}, 'klic')
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(len(self.stub.pozadavky), 4)
+        self.assertEqual(len(self.cekani), 3)
+    
+    def test_400_neopakuje(self):
+        self.stub.odpovedi = [(400, {}, {"error": {"message": "spatny pozadavek"}})]
+        with self.assertRaises(ClaudeAPIError) as ctx:
+            self.klient.messages({}, 'klic')
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(ctx.exception.detail, 'spatny pozadavek')
+        self.assertEqual(len(self.stub.pozadavky), 1)
+        self.assertEqual(self.cekani, [])
+        self.assertEqual(self.klient.breaker.stav, 'closed')
+    
+    def test_telo_bez_json_vyhodi_claude_api_error(self):
+        self.stub.odpovedi = [(200, {}, b'<html>proxy</html>')]
+        with self.assertRaises(ClaudeAPIError) as ctx:
+            self.klient.messages({}, 'klic')
+        self.assertEqual(ctx.exception.status_code, 200)
+        self.assertIn('proxy', ctx.exception.detail)
+
+
+class TestJistic(ClientTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.klient = self._klient(max_retries=0, breaker=CircuitBreaker(prah=2, doba_rozpojeni=0.2))
+    
+    def _selze(self, pocet: int):
+        self.stub.odpovedi += [(503, {}, b'')] * pocet
+        for _ in range(pocet):
+            with self.assertRaises(ClaudeAPIError):
+                self.klient.messages({}, 'klic')
+    
+    def test_rozpoji_se_po_prahu_a_odmita(self):
+        self._selze(1)
+        self.assertEqual(self.klient.breaker.stav, 'closed')
+        self._selze(1)
+        self.assertEqual(self.klient.breaker.stav, 'open')
+        
+        with self.assertRaises(CircuitOpenError):
+            self.klient.messages({}, 'klic')
+        # Rozpojený jistič na server vůbec nejde
+        self.assertEqual(len(self.stub.pozadavky), 2)
+    
+    def test_zkouska_uspeje_a_jistic_sepne(self):
+        self._selze(2)
+        time.sleep(0.25)
+        self.assertEqual(self.klient.breaker.stav, 'half-open')
+        
+        self.stub.odpovedi = [(200, {}, ODPOVED_OK)]
+        self.assertEqual(self.klient.messages({}, 'klic'), ODPOVED_OK)
+        self.assertEqual(self.klient.breaker.stav, 'closed')
+    
+    def test_zkouska_selze_a_jistic_se_znovu_rozpoji(self):
+        self._selze(2)
+        time.sleep(0.25)
+        self._selze(1)
+        self.assertEqual(self.klient.breaker.stav, 'open')
+        with self.assertRaises(CircuitOpenError):
+            self.klient.messages({}, 'klic')
+    
+    def test_soubezne_bezi_jen_jedna_zkouska(self):
+        self._selze(2)
+        time.sleep(0.25)
+        self.assertTrue(self.klient.breaker.povol())
+        self.assertFalse(self.klient.breaker.povol())
+    
+    def test_chyba_pozadavku_uvolni_zkousku(self):
+        self._selze(2)
+        time.sleep(0.25)
+        # Neplatná adresa - requests vyhodí InvalidURL (ne chybu spojení)
+        self.klient.base_url = 'http://'
+        with self.assertRaises(ClaudeAPIError):
+            self.klient.messages({}, 'klic')
+        self.assertEqual(self.klient.breaker.stav, 'open')
+        
+        time.sleep(0.25)
+        self.klient.base_url = self.stub.url
+        self.stub.odpovedi = [(200, {}, ODPOVED_OK)]
+        self.klient.messages({}, 'klic')
+        self.assertEqual(self.klient.breaker.stav, 'closed')
+
+
+if __name__ == '__main__':
+    unittest.main()
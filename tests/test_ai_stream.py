@@ -0,0 +1,239 @@
+"""
+Testy streamované odpovědi AI asistenta proti lokálnímu falešnému SSE serveru
+
+Falešný server (http.server na náhodném portu) posílá připravené události
+po kouscích (chunked), takže klient je čte, jak přicházejí. Událost None
+server zastaví - stream zůstane otevřený, dokud test neskončí (přerušení
+uprostřed odpovědi).
+
+Routa /ai/send-message/stream běží na malé aplikaci s databází v paměti;
+sestavení požadavku (_priprav_pozadavek) je nahrazeno hotovým tělem.
+
+Spuštění:
+    $ python -m pytest tests
+"""
+
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from flask import Flask
+
+from core import db
+from core.config import config
+from modules.ai.client import ClaudeClient, ClaudeAPIError
+from modules.ai.models import AISession, AIUsage
+from modules.ai.routes import ai_bp, AIAssistantService
+from modules.ai.usage import usage_ledger
+
+
+def udalost(data: dict, nazev: str = None) -> str:
+    """Jedna SSE událost - JSON rozdělený do více řádků `data:` (jak to SSE dovoluje)"""
+    radky = json.dumps(data, indent=1).split('\n')
+    hlavicka = f"event: {nazev or data['type']}\n"
+    return hlavicka + ''.join(f"data: {radek}\n" for radek in radky) + "\n"
+
+
+ZACATEK = {"type": "message_start", "message": {"usage": {"input_tokens": 42, "output_tokens": 1}}}
+KONEC = {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 7}}
+
+
+def delta(text: str) -> dict:
+    return {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}}
+
+
+class FakeSSEServer:
+    """Lokální server, který na POST /v1/messages streamuje připravené události"""
+    
+    def __init__(self):
+        self.udalosti = []
+        self.pozadavky = []
+        self.uvolni = threading.Event()
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_POST(self):
+                delka = int(self.headers.get('content-length', 0))
+                stub.pozadavky.append(json.loads(self.rfile.read(delka) or b'{}'))
+                self.send_response(200)
+                self.send_header('content-type', 'text/event-stream')
+                self.send_header('transfer-encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for kus in stub.udalosti:
+                        if kus is None:
+                            # Stream zůstane viset - klient ho musí zavřít sám
+                            stub.uvolni.wait(5)
+                            return
+                        data = kus.encode('utf-8')
+                        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except OSError:
+                    pass
+                self.close_connection = True
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.vlakno = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.vlakno.start()
+    
+    def zastav(self):
+        self.uvolni.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StreamTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.stub = FakeSSEServer()
+        self.klient = ClaudeClient(base_url=self.stub.url, connect_timeout=2.0, read_timeout=5.0, max_retries=0)
+    
+    def tearDown(self):
+        self.klient.session.close()
+        self.stub.zastav()
+
+
+class TestMessagesStream(StreamTestCase):
+    
+    def test_viceradkove_data_a_delty(self):
+        self.stub.udalosti = [
+            ": komentář se ignoruje\n\n",
+            udalost(ZACATEK),
+            udalost(delta("Dobrý ")),
+            udalost(delta("den")),
+            udalost({"type": "ping"}),
+            udalost(KONEC),
+            udalost({"type": "message_stop"}),
+        ]
+        udalosti = list(self.klient.messages_stream({"model": "m"}, 'klic'))
+        
+        self.assertEqual([u['type'] for u in udalosti], [
+            'message_start', 'content_block_delta', 'content_block_delta', 'ping', 'message_delta', 'message_stop'
+        ])
+        self.assertEqual(udalosti[1]['delta']['text'], "Dobrý ")
+        self.assertEqual(udalosti[0]['message']['usage']['input_tokens'], 42)
+        # Požadavek jde ve streamovacím režimu
+        self.assertTrue(self.stub.pozadavky[0]['stream'])
+    
+    def test_udalost_error_vyhodi_claude_api_error(self):
+        self.stub.udalosti = [
+            udalost(ZACATEK),
+            udalost(delta("Část")),
+            udalost({"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}),
+        ]
+        prijato = []
+        with self.assertRaises(ClaudeAPIError) as ctx:
+            for u in self.klient.messages_stream({}, 'klic'):
+                prijato.append(u['type'])
+        self.assertIn('overloaded_error', str(ctx.exception))
+        self.assertEqual(ctx.exception.detail, 'Overloaded')
+        self.assertEqual(prijato, ['message_start', 'content_block_delta'])
+
+
+class TestStreamRoute(StreamTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.app = Flask(__name__)
+        self.app.config.from_object(config['testing'])
+        self.app.config['AI_RESPONSE_CACHE_ENABLED'] = False
+        db.init_app(self.app)
+        usage_ledger.init_app(self.app)
+        self.app.register_blueprint(ai_bp)
+        
+        with self.app.app_context():
+            db.create_all()
+            relace = AISession(employee_id=1, title='Test')
+            db.session.add(relace)
+            db.session.commit()
+            self.session_id = relace.id
+        
+        self.patche = [
+            mock.patch.dict(os.environ, {'ANTHROPIC_API_KEY': 'klic'}),
+            mock.patch('modules.ai.routes.get_client', return_value=self.klient),
+            mock.patch.object(AIAssistantService, '_priprav_pozadavek', self._priprav_pozadavek),
+        ]
+        for patch in self.patche:
+            patch.start()
+        self.ulozene = mock.Mock()
+        patch = mock.patch.object(AIAssistantService, 'save_message_pair', self.ulozene)
+        patch.start()
+        self.patche.append(patch)
+    
+    def tearDown(self):
+        for patch in reversed(self.patche):
+            patch.stop()
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        super().tearDown()
+    
+    @staticmethod
+    def _priprav_pozadavek(service, employee_id, session_id, user_message, bez_cache=False):
+        return {
+            "session": db.session.get(AISession, session_id),
+            "klic_cache": None,
+            "data": {"model": "m", "max_tokens": 100, "messages": [{"role": "user", "content": user_message}]},
+            "okno_info": {"tokenu": 10, "tokenu_bez_okna": 10, "souhrn": None},
+        }
+    
+    def _odesli(self):
+        return self.app.test_client().post(
+            '/ai/send-message/stream', json={'message': 'Ahoj', 'session_id': self.session_id}, buffered=False
+        )
+    
+    @staticmethod
+    def _sse(kus: bytes):
+        udalost, data = kus.decode('utf-8').strip().split('\n')
+        return udalost[len('event: '):], json.loads(data[len('data: '):])
+    
+    def _zaznamy(self):
+        with self.app.app_context():
+            return [(u.kanal, u.input_tokens, u.output_tokens) for u in AIUsage.query.all()]
+    
+    def test_dokonceny_stream_ulozi_zpravy_jednou(self):
+        self.stub.udalosti = [udalost(ZACATEK), udalost(delta("Dobrý ")), udalost(delta("den")), udalost(KONEC)]
+        odpoved = self._odesli()
+        udalosti = [self._sse(kus) for kus in odpoved.response]
+        odpoved.close()
+        
+        self.assertEqual([u for u, _ in udalosti], ['start', 'delta', 'delta', 'done'])
+        self.assertEqual(udalosti[-1][1], {'tokens_used': 49})
+        self.ulozene.assert_called_once_with(self.session_id, 'Ahoj', 'Dobrý den', 49)
+        self.assertEqual(self._zaznamy(), [('stream', 42, 7)])
+    
+    def test_preruseny_stream_ulozi_cast_a_zapise_spotrebu(self):
+        self.stub.udalosti = [udalost(ZACATEK), udalost(delta("Dobrý ")), udalost(delta("den")), None]
+        odpoved = self._odesli()
+        proud = iter(odpoved.response)
+        self.assertEqual(self._sse(next(proud))[0], 'start')
+        self.assertEqual(self._sse(next(proud)), ('delta', {'text': 'Dobrý '}))
+        self.assertEqual(self._sse(next(proud)), ('delta', {'text': 'den'}))
+        # Prohlížeč se odpojí uprostřed odpovědi
+        odpoved.close()
+        
+        self.ulozene.assert_called_once_with(
+            self.session_id, 'Ahoj', "Dobrý den\n\n(odpověď přerušena)", None
+        )
+        # Bez message_delta se výstup odhadne z přijatého textu
+        zaznamy = self._zaznamy()
+        self.assertEqual(len(zaznamy), 1)
+        kanal, vstup, vystup = zaznamy[0]
+        self.assertEqual((kanal, vstup), ('stream', 42))
+        self.assertGreater(vystup, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()